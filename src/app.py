@@ -1,60 +1,128 @@
+import asyncio
 import json
+from typing import AsyncIterator
 from services.openai_service import OpenAIService
 from prompts.plan import plan_prompt
-from config.jira_config import DISCORD_USERS, EPICS, STATUSES
-from services.task_service import TaskService
+from prompts.planner_tools import planner_tools, planner_tools_prompt
+from config.bot_config import (
+    ANSWER_CONTEXT_TOKENS, METRICS_HOST, METRICS_PORT, PLAN_CONTEXT_TOKENS, PLANNER_MODE, STREAM_ANSWERS,
+    TOKENIZER_WARMUP
+)
+from config.jira_config import DISCORD_USERS, EPICS, STATUSES, TASK_TYPES, USERS
+from services.conversation_store import ConversationStore
+from services.service_registry import ServiceRegistry
 from services.discord_service import DiscordService, MessageObserver, MentionObserver
+from services.metrics_service import metrics, start_metrics_server
 from prompts.answer import answer_prompt
+from prompts.context import ConversationContext, conversation_context, documents_context
+from prompts.template import RenderedPrompt, report_token_split
+from services.text_service import TextService, warm_up_tokenizers
+from services.token_budget import TokenBudgetExceeded, guild_scope
+from services.tracing_service import get_logger, span
 from discord import Message
-from datetime import datetime, timedelta, timezone
 
-from custom_types.models import Conversation
+from custom_types.models import Conversation, Document
 
+logger = get_logger("app")
 
 
 class AIDiscordBot(MessageObserver, MentionObserver):
     """
     Implementuje oba protokoły: MessageObserver i MentionObserver
     """
-    def __init__(self):
-        self.discord_service = DiscordService()
-        self.openai_service = OpenAIService()
+    def __init__(self, discord_service: DiscordService | None = None,
+                 openai_service: OpenAIService | None = None,
+                 services: ServiceRegistry | None = None):
+        """
+        Args:
+            discord_service: Serwis Discorda (domyślnie nowy, z tokenem z .env)
+            openai_service: Serwis OpenAI
+            services: Rejestr serwisów projektów (domyślnie tworzy JiraService z danymi z .env)
+        """
+        self.discord_service = discord_service or DiscordService()
+        self.openai_service = openai_service or OpenAIService()
+        self.text_service = TextService()
+        if TOKENIZER_WARMUP:
+            warm_up_tokenizers([self.text_service.state.model_name])
+        self.services = services or ServiceRegistry(self.openai_service)
         self.project_key = "SOET"
         
         # Rejestracja observerów
         self.discord_service.attach_message_observer(self)
         self.discord_service.attach_mention_observer(self)
-        self.conversations = []
+        self.conversations = ConversationStore()
+        self._register_metrics()
+        self.metrics_server: asyncio.AbstractServer | None = None
+        if METRICS_PORT:
+            self.discord_service.add_startup_hook(self.start_metrics_server)
+        self.discord_service.add_shutdown_hook(self.shutdown)
+
+    def _register_metrics(self) -> None:
+        """Rejestruje metryki obliczane dopiero przy odczycie - nie kosztują nic w trakcie obsługi wzmianek"""
+        dispatcher = self.discord_service.mention_dispatcher
+        metrics.gauge("mention_queue_depth", "Wzmianki czekające w kolejkach kanałów",
+                      lambda: dispatcher.stats().queued)
+        metrics.gauge("mentions_in_progress", "Wzmianki obsługiwane w tej chwili",
+                      lambda: dispatcher.stats().running)
+        metrics.gauge("mentions_shed_total", "Wzmianki odrzucone przy pełnej kolejce kanału",
+                      lambda: dispatcher.stats().shed, kind="counter")
+        metrics.gauge("mentions_failed_total", "Wzmianki zakończone błędem lub przekroczeniem czasu",
+                      lambda: dispatcher.stats().failed, kind="counter")
+        metrics.gauge("conversations_active", "Aktywne konwersacje", lambda: self.conversations.stats()["live"])
+        metrics.gauge("cache_hit_ratio", "Odsetek trafień cache",
+                      lambda: {key: stats["hit_ratio"] for key, stats in self.services.cache_stats().items()},
+                      labelnames=("cache", "project"))
+
+    async def start_metrics_server(self) -> None:
+        """Uruchamia endpoint metryk w pętli zdarzeń bota"""
+        self.metrics_server = await start_metrics_server(METRICS_PORT, METRICS_HOST)
+        logger.info("Metryki dostępne pod http://%s:%d/metrics", METRICS_HOST, METRICS_PORT)
+
+    async def shutdown(self) -> None:
+        """Zapisuje niezapisane tłumaczenia JQL, zamyka wspólnego klienta OpenAI i serwer metryk"""
+        await self.services.translation_cache.flush()
+        await OpenAIService.close()
+        if self.metrics_server is not None:
+            self.metrics_server.close()
+            await self.metrics_server.wait_closed()
+            self.metrics_server = None
 
     async def on_message(self, subject: DiscordService, message: Message) -> None:
         """
         Implementacja MessageObserver.on_message
         Wywoływana dla każdej wiadomości (która nie jest wzmianką)
         """
-        print(f"Otrzymano nową wiadomość: {message.content}")
-        print(f"Autor wiadomości: {message.author.name}")
-        print(f"Kanał: {message.channel.name}")
-        print(f"ID kanału: {message.channel.id}")
-        print(f"ID wiadomości: {message.id}")
-        print(f"ID autora: {message.author.id}")
-        print(f"Treść wiadomości: {message.content}")
-        print(f"Czas wysłania: {message.created_at}")
-        print(f"Referencja: {message.reference}")
+        # Argumenty są formatowane dopiero, gdy poziom DEBUG jest włączony
+        logger.debug(
+            "Wiadomość %s od %s (%s) na kanale %s (%s), wysłana %s, referencja %s: %s",
+            message.id, message.author.name, message.author.id, message.channel.name,
+            message.channel.id, message.created_at, message.reference, message.content
+        )
 
     async def on_mention(self, subject: DiscordService, message: Message, cleaned_content: str) -> None:
         """
         Implementacja MentionObserver.on_mention
         Wywoływana tylko gdy bot jest wspomniany w wiadomości
         """
-        # Sprawdzenie czy wiadomość jest odpowiedzią
+        guild_id = message.guild.id if message.guild else 0
+        # Span całej wzmianki - etapy, wywołania JIRA i wysyłki na Discord są jego potomkami.
+        # Wszystkie zapytania do modelu w trakcie obsługi liczą się do limitu tokenów serwera.
+        with span("mention", guild=guild_id, channel=message.channel.id), guild_scope(guild_id):
+            try:
+                await self._handle_mention(subject, message, cleaned_content)
+            except TokenBudgetExceeded as e:
+                logger.warning("Mention %s rejected: %s", message.id, e)
+                await subject.send_message(message.channel.id, self._budget_reply(e), mention_users=[message.author])
+
+    async def _handle_mention(self, subject: DiscordService, message: Message, cleaned_content: str) -> None:
+        channel_id = message.channel.id
+
+        # Sprawdzenie czy wiadomość jest odpowiedzią - pobranie oryginału i odpowiedź idą w tle
         reference = message.reference
         if reference and reference.message_id:
-            original_message = await message.channel.fetch_message(reference.message_id)
-            print(f"Ta wiadomość jest odpowiedzią na: {original_message.content}")
-            print(f"Autor oryginalnej wiadomości: {original_message.author.name}")
-            
-            await subject.send_message(
-                message.channel.id,
+            original_message = asyncio.create_task(self._fetch_referenced(message))
+            subject.queue_message(
+                channel_id,
                 "Widzę, że odpowiadasz na wcześniejszą wiadomość!",
                 reply_to_message=original_message
             )
@@ -62,7 +130,7 @@ class AIDiscordBot(MessageObserver, MentionObserver):
         # Get Jira username from Discord username
         discord_name = message.author.name.lower()
         if discord_name not in DISCORD_USERS:
-            print(f"\033[91mWarning: User {discord_name} not found in DISCORD_USERS dictionary\033[0m")
+            logger.warning("User %s not found in DISCORD_USERS dictionary", discord_name)
             jira_username = "Unknown User"
         else:
             jira_username = DISCORD_USERS[discord_name]
@@ -71,81 +139,190 @@ class AIDiscordBot(MessageObserver, MentionObserver):
         
         conversation = self.get_conversation(
             message.guild.id if message.guild else 0,
-            message.channel.id
+            channel_id
         )   
-        # Pierwsza odpowiedź - thinking
-        await subject.send_message(
-            message.channel.id,
-            "*Thinking...*"
-        )
+        # Pierwsza odpowiedź - thinking (wysyłana w tle, równolegle z planowaniem)
+        subject.queue_message(channel_id, "*Thinking...*")
         
-        # Planowanie akcji
-        actions = await self.plan(formatted_msg, conversation)
+        async with subject.typing(channel_id):
+            # Planowanie akcji
+            actions = await self.plan(formatted_msg, conversation)
 
-        conversation.add_message(jira_username, formatted_msg, message.created_at)
+            conversation.add_message(jira_username, formatted_msg, message.created_at)
 
+            actions_dict = json.loads(actions)
+            
+            # Druga odpowiedź - thinking details, w tle, równolegle z wykonaniem akcji
+            subject.queue_message(channel_id, f"*{actions_dict['_thinking']}*")
+            
+            # Wykonanie akcji
+            context = await self.execute(actions)
+            logger.debug("Kontekst akcji: %s", context)
 
-        actions_dict = json.loads(actions)
-        
-        # Druga odpowiedź - thinking details
-        await subject.send_message(
-            message.channel.id,
-            f"*{actions_dict['_thinking']}*"
-        )
+            if not STREAM_ANSWERS:
+                ai_message = await self.answer(formatted_msg, jira_username, actions, context, conversation)
         
-        # Wykonanie akcji
-        context = await self.execute(actions)
-        print(context)
-        
-        # Finalna odpowiedź
-        ai_message = await self.answer(formatted_msg,jira_username, actions, context, conversation)
-        await subject.send_message(
-            message.channel.id,
-            ai_message,
-            mention_users=[message.author]
-        )
+        # Finalna odpowiedź - send_message i stream_message czekają na zakolejkowane wiadomości kanału
+        if STREAM_ANSWERS:
+            with span("answer", stream=True):
+                # Limity tokenów są sprawdzane tutaj, zanim na kanale pojawi się zaślepka odpowiedzi
+                chunks = await self.answer_stream(formatted_msg, jira_username, actions, context, conversation)
+                ai_message = await subject.stream_message(
+                    channel_id,
+                    chunks,
+                    mention_users=[message.author],
+                    error_reply=self._error_reply
+                )
+        else:
+            await subject.send_message(
+                channel_id,
+                ai_message,
+                mention_users=[message.author]
+            )
 
         # Dodaj wiadomość do konwersacji
         conversation.add_message("ai", ai_message, message.created_at)
+
+    @classmethod
+    def _error_reply(cls, error: Exception) -> str:
+        """Treść, którą zastępowana jest przerwana strumieniowana odpowiedź"""
+        if isinstance(error, TokenBudgetExceeded):
+            return cls._budget_reply(error)
+        return "Nie udało się przygotować odpowiedzi. Spróbuj ponownie za chwilę."
+
+    @staticmethod
+    def _budget_reply(error: TokenBudgetExceeded) -> str:
+        if error.scope == "guild":
+            minutes = max(1, round((error.retry_after or 0) / 60))
+            return f"Ten serwer wykorzystał limit zapytań do modelu. Spróbuj ponownie za około {minutes} min."
+        return "Ta prośba jest zbyt obszerna, żebym mógł ją obsłużyć. Spróbuj ją skrócić lub podzielić na mniejsze części."
+
+    @staticmethod
+    async def _fetch_referenced(message: Message) -> Message:
+        """Zwraca wiadomość, na którą odpowiada message - z cache gatewaya, jeśli jest dostępna"""
+        original_message = message.reference.resolved
+        if not isinstance(original_message, Message):
+            original_message = await message.channel.fetch_message(message.reference.message_id)
+        logger.debug("Ta wiadomość jest odpowiedzią na wiadomość %s: %s",
+                     original_message.author.name, original_message.content)
+        return original_message
         
 
     async def plan(self, query: str, conversation: Conversation):
-        prompt = plan_prompt(self.project_key, EPICS, STATUSES, conversation)
+        with span("plan", mode=PLANNER_MODE):
+            if PLANNER_MODE == "tools":
+                return await self.plan_tools(query, conversation)
+            context = await self.build_context(conversation, PLAN_CONTEXT_TOKENS)
+            prompt = plan_prompt(self.project_key, EPICS, STATUSES, context)
+            report_token_split(prompt, self.text_service)
+            response = await self.openai_service.completion(
+                messages=[
+                    {"role": "system", "content": prompt.text},
+                    {"role": "user", "content": query}
+                ],
+                prompt_type=prompt.name
+            )
+            return response.choices[0].message.content
+
+    async def plan_tools(self, query: str, conversation: Conversation):
+        """
+        Planuje akcje jednym zapytaniem z wywołaniami narzędzi
+
+        Zwraca JSON w formacie planu: {"_thinking": ..., "tool_calls": [{"name": ..., "arguments": ...}]},
+        który TaskService.execute wykonuje bez dodatkowych zapytań do modelu.
+        """
+        context = await self.build_context(conversation, PLAN_CONTEXT_TOKENS)
+        prompt = planner_tools_prompt(self.project_key, TASK_TYPES, USERS, EPICS, STATUSES, context)
+        report_token_split(prompt, self.text_service)
         response = await self.openai_service.completion(
             messages=[
-                {"role": "system", "content": prompt},
+                {"role": "system", "content": prompt.text},
                 {"role": "user", "content": query}
-            ]
+            ],
+            prompt_type=prompt.name,
+            tools=planner_tools(self.project_key, TASK_TYPES, USERS, EPICS)
         )
-        return response.choices[0].message.content
+        message = response.choices[0].message
+        tool_calls = []
+        for tool_call in message.tool_calls or []:
+            try:
+                arguments = json.loads(tool_call.function.arguments or "{}")
+            except ValueError as e:
+                logger.warning("Invalid arguments for tool %s: %s", tool_call.function.name, e)
+                continue
+            tool_calls.append({"name": tool_call.function.name, "arguments": arguments})
+        # Model nie zawsze dopisuje komentarz do wywołań - wtedy pokazujemy same nazwy narzędzi
+        thinking = message.content or ", ".join(call["name"] for call in tool_calls) or "..."
+        return json.dumps({"_thinking": thinking, "tool_calls": tool_calls}, ensure_ascii=False)
 
     async def execute(self, query: str):
-        task_service = TaskService(self.project_key)
-        return await task_service.execute(query)
+        with span("execute"):
+            task_service = await self.services.get_task_service(self.project_key)
+            return await task_service.execute(query)
 
     async def answer(self, formatted_msg, jira_username, actions, context, conversation: Conversation):
-        prompt = answer_prompt(jira_username, actions, context, conversation)
-        response = await self.openai_service.completion(
+        with span("answer", stream=False):
+            prompt, prompt_tokens = await self.build_answer_prompt(formatted_msg, jira_username, actions, context,
+                                                                   conversation)
+            response = await self.openai_service.completion(
+                messages=[
+                    {"role": "system", "content": prompt.text},
+                    {"role": "user", "content": formatted_msg}
+                ],
+                prompt_type=prompt.name,
+                prompt_tokens=prompt_tokens
+            )
+            return response.choices[0].message.content
+
+    async def answer_stream(self, formatted_msg, jira_username, actions, context,
+                            conversation: Conversation) -> AsyncIterator[str]:
+        """Zwraca strumień odpowiedzi; TokenBudgetExceeded leci już tutaj, przed pierwszym fragmentem"""
+        prompt, prompt_tokens = await self.build_answer_prompt(formatted_msg, jira_username, actions, context,
+                                                               conversation)
+        return await self.openai_service.completion_stream(
             messages=[
-                {"role": "system", "content": prompt},
+                {"role": "system", "content": prompt.text},
                 {"role": "user", "content": formatted_msg}
-            ]
+            ],
+            prompt_type=prompt.name,
+            prompt_tokens=prompt_tokens
         )
-        return response.choices[0].message.content
+
+    async def build_answer_prompt(self, formatted_msg, jira_username, actions, documents: list[Document],
+                                  conversation: Conversation) -> tuple[RenderedPrompt, int]:
+        """
+        Składa prompt odpowiedzi, przycinając dokumenty do miejsca, które zostaje w limicie promptu
+
+        Długie wyniki (np. lista wszystkich otwartych zadań) są skracane zamiast odrzucać całe zapytanie -
+        TokenBudgetExceeded poleci dopiero, gdy limit przekracza sama reszta promptu.
+
+        Returns:
+            tuple: (prompt, liczba tokenów zapytania - reszta promptu i dokumenty liczone po jednym razie)
+        """
+        conversation_ctx = await self.build_context(conversation, ANSWER_CONTEXT_TOKENS)
+        room, fixed_tokens = await self.openai_service.prompt_room([
+            {"role": "system", "content": answer_prompt(jira_username, actions, "", conversation_ctx).text},
+            {"role": "user", "content": formatted_msg}
+        ])
+        documents_ctx = documents_context(documents, await self.text_service.token_counter(), room)
+        if documents_ctx.dropped:
+            logger.info("Pominięto %d z %d dokumentów w prompcie odpowiedzi (limit promptu)",
+                        documents_ctx.dropped, len(documents))
+        prompt = answer_prompt(jira_username, actions, documents_ctx.text, conversation_ctx)
+        report_token_split(prompt, self.text_service)
+        return prompt, fixed_tokens + documents_ctx.tokens
+
+    async def build_context(self, conversation: Conversation, max_tokens: int) -> ConversationContext:
+        # Bez kodowania modelu (np. brak sieci przy pierwszym pobraniu) tokeny są szacowane
+        count_tokens = await self.text_service.token_counter()
+        context = conversation_context(conversation, count_tokens, max_tokens)
+        if context.dropped:
+            logger.debug("Pominięto %d starszych wiadomości z kontekstu konwersacji (%d tokenów)",
+                         context.dropped, context.tokens)
+        return context
 
     def get_conversation(self, server_id: int, channel_id: int) -> Conversation:
-        # Szukaj istniejącej aktywnej konwersacji
-        for conv in self.conversations:
-            if (conv.server_id == server_id and 
-                conv.channel_id == channel_id and 
-                conv.last_message_time and 
-                datetime.now(timezone.utc) - conv.last_message_time < timedelta(minutes=5)):
-                return conv
-        
-        # Jeśli nie znaleziono aktywnej konwersacji, utwórz nową
-        new_conv = Conversation(server_id, channel_id)
-        self.conversations.append(new_conv)
-        return new_conv
+        return self.conversations.get(server_id, channel_id)
 
 if __name__ == "__main__":
     bot = AIDiscordBot()
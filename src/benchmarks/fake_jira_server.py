@@ -0,0 +1,926 @@
+"""
+Lokalna atrapa serwera JIRA (REST API 2/3 i Agile 1.0) do testów obciążeniowych i regresyjnych JiraService.
+
+Serwer odpowiada prawdziwemu klientowi jira.JIRA na zapytania, których używa bot: wyszukiwanie
+(search i search/jql), pobieranie, tworzenie (także bulk), zmiana i usuwanie zgłoszeń, tablice,
+sprinty, backlog, użytkownicy, statusy i pola. Zgłoszenia są generowane z numeru przy odczycie,
+więc projekt ze 100 tys. zgłoszeń nie zajmuje pamięci - przechowywane są tylko utworzone i zmienione.
+
+Każde zapytanie czeka latency sekund (± jitter), a po przekroczeniu limitu (kubełek tokenów,
+jak w Jira Cloud) dostaje 429 z nagłówkiem Retry-After. Liczniki zapytań: GET /_fake/stats.
+
+Uruchomienie (z katalogu src):
+    python -m benchmarks.fake_jira_server --port 8080 --issues 100000 --latency 0.05 --rate-limit 50
+
+Bot łączy się z atrapą przez JIRA_URL=http://127.0.0.1:8080 (login i token mogą być dowolne).
+"""
+import argparse
+import base64
+import json
+import math
+import random
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable
+from urllib.parse import parse_qs, urlsplit
+
+from config.jira_config import EPICS, PROJECTS, STATUSES, TASK_TYPES, USERS
+
+# Limity jak w JIRA: wyniki wyszukiwania na stronę i zgłoszenia w jednym bulk-create
+MAX_SEARCH_RESULTS = 100
+BULK_CREATE_LIMIT = 50
+SEARCH_CACHE_SIZE = 64
+
+PRIORITIES = ["Highest", "High", "Medium", "Low", "Lowest"]
+ISSUE_TYPES = {name: str(10000 + i) for i, name in enumerate(TASK_TYPES)}
+EPIC_TYPE = "Epik"
+SPRINT_FIELD = "customfield_10020"
+CREATED_AT = datetime(2024, 1, 1, tzinfo=timezone.utc)
+# Konto, na które "zalogowany" jest klient (currentUser() w JQL, /myself)
+CURRENT_USER = next(iter(USERS))
+
+# Typy generowanych zgłoszeń (poza epikami), przypisanie i sprint zależą od numeru zgłoszenia
+_GENERATED_TYPES = [name for name in TASK_TYPES if name not in (EPIC_TYPE, "Podzadanie")]
+_ACCOUNTS = list(USERS)
+_DISPLAY_NAMES = {name.lower(): account_id for account_id, name in USERS.items()}
+
+
+class JiraError(Exception):
+    """Błąd zwracany klientowi w formacie JIRA ({"errorMessages": [...], "errors": {...}})"""
+    def __init__(self, status: int, message: str | None = None, errors: dict | None = None):
+        super().__init__(message)
+        self.status = status
+        self.body = {"errorMessages": [message] if message else [], "errors": errors or {}}
+
+
+class RateLimiter:
+    """
+    Kubełek tokenów współdzielony przez wszystkie zapytania
+
+    Args:
+        rate: Liczba tokenów dodawanych na sekundę (0 = bez limitu)
+        burst: Pojemność kubełka, czyli ile zapytań może przyjść naraz
+    """
+    def __init__(self, rate: float, burst: int | None = None):
+        self.rate = rate
+        self.burst = burst or max(1, math.ceil(rate))
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Pobiera token. Zwraca 0, gdy zapytanie może przejść, w przeciwnym razie czas do kolejnego tokenu."""
+        if not self.rate:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+
+class FakeProject:
+    """
+    Zgłoszenia, tablica i sprinty jednego projektu
+
+    Zgłoszenie numer N (1..size) jest wyliczane z numeru przy każdym odczycie. Zgłoszenia utworzone,
+    zmienione i usunięte przez API są zapisywane w słownikach nadpisań.
+    """
+    def __init__(self, key: str, project_id: int, board_id: int, size: int):
+        self.key = key
+        self.id = str(project_id)
+        self.name = PROJECTS.get(key, key)
+        self.board_id = board_id
+        # Zamknięty sprint pozwala sprawdzić obsługę nieaktualnego ID sprintu w cache
+        self.sprints = {
+            board_id * 10 + 1: {"name": f"{key} Sprint 1", "state": "closed"},
+            board_id * 10 + 2: {"name": f"{key} Sprint 2", "state": "active"},
+            board_id * 10 + 3: {"name": f"{key} Sprint 3", "state": "future"},
+        }
+        self.active_sprint = board_id * 10 + 2
+        self.epics = {
+            int(epic_key.split("-")[1]): name
+            for epic_key, name in EPICS.items()
+            if epic_key.startswith(f"{key}-") and int(epic_key.split("-")[1]) <= size
+        }
+        self._last = size
+        self._overrides: dict[int, dict] = {}
+        self._deleted: set[int] = set()
+        self._lock = threading.Lock()
+        # Wyniki JQL (listy numerów) - czyszczone po każdej zmianie zgłoszeń
+        self._search_cache: OrderedDict[str, list[int]] = OrderedDict()
+
+    def exists(self, number: int) -> bool:
+        return 1 <= number <= self._last and number not in self._deleted
+
+    def field(self, number: int, name: str) -> Any:
+        """Zwraca jedno pole zgłoszenia bez budowania całego rekordu (na potrzeby filtrowania)"""
+        override = self._overrides.get(number)
+        if override is not None:
+            return override[name]
+        if name == "summary":
+            return self.epics.get(number) or f"Zadanie testowe {number}"
+        if name == "description":
+            return f"Opis zadania {number}"
+        if name == "status":
+            return STATUSES[number % len(STATUSES)]
+        if name == "issuetype":
+            return EPIC_TYPE if number in self.epics else _GENERATED_TYPES[number % len(_GENERATED_TYPES)]
+        if name == "priority":
+            return PRIORITIES[number % len(PRIORITIES)]
+        if name == "assignee":
+            return None if number % 7 == 0 else _ACCOUNTS[number % len(_ACCOUNTS)]
+        if name in ("created", "updated"):
+            return CREATED_AT + timedelta(minutes=number * 7)
+        if name == "parent":
+            return None
+        if name == "sprint":
+            return self.active_sprint if number % 4 == 0 else None
+        raise KeyError(name)
+
+    def record(self, number: int) -> dict:
+        return {name: self.field(number, name) for name in (
+            "summary", "description", "status", "issuetype", "priority",
+            "assignee", "created", "updated", "parent", "sprint",
+        )}
+
+    def create(self, fields: dict) -> int:
+        now = datetime.now(timezone.utc)
+        record = {
+            "summary": fields["summary"],
+            "description": fields.get("description"),
+            "status": "To Do",
+            "issuetype": fields["issuetype"],
+            "priority": fields.get("priority", "Medium"),
+            "assignee": fields.get("assignee"),
+            "created": now,
+            "updated": now,
+            "parent": fields.get("parent"),
+            "sprint": None,
+        }
+        with self._lock:
+            # Rekord musi istnieć, zanim numer stanie się widoczny dla czytających bez blokady
+            number = self._last + 1
+            self._overrides[number] = record
+            self._last = number
+            self._search_cache.clear()
+            return number
+
+    def update(self, number: int, fields: dict) -> None:
+        with self._lock:
+            record = self._overrides.get(number) or self.record(number)
+            record.update(fields)
+            record["updated"] = datetime.now(timezone.utc)
+            self._overrides[number] = record
+            self._search_cache.clear()
+
+    def delete(self, number: int) -> None:
+        with self._lock:
+            self._deleted.add(number)
+            self._overrides.pop(number, None)
+            self._search_cache.clear()
+
+    def search(self, query: "JqlQuery") -> list[int]:
+        """Zwraca numery zgłoszeń pasujących do zapytania, w kolejności ORDER BY"""
+        with self._lock:
+            cached = self._search_cache.get(query.text)
+            if cached is not None:
+                self._search_cache.move_to_end(query.text)
+                return cached
+
+        if query.keys is not None:
+            candidates = sorted(number for key, number in query.keys if key == self.key)
+        else:
+            candidates = range(1, self._last + 1)
+        matches = [number for number in candidates if self.exists(number) and query.matches(self, number)]
+        if query.descending:
+            matches.reverse()
+
+        with self._lock:
+            self._search_cache[query.text] = matches
+            if len(self._search_cache) > SEARCH_CACHE_SIZE:
+                self._search_cache.popitem(last=False)
+        return matches
+
+
+class JqlQuery:
+    """
+    Podzbiór JQL wystarczający do zapytań bota
+
+    Obsługiwane są warunki połączone przez AND na polach project, key, status, issuetype, priority,
+    assignee, parent, sprint (=, !=, in, not in, is, is not), summary/text (~) oraz ORDER BY
+    created/key (ASC, DESC). Nierozpoznane warunki są pomijane i liczone w statystykach serwera.
+    """
+    _CLAUSE = re.compile(r'^\s*("[^"]+"|[\w.]+)\s+(not\s+in|in|is\s+not|is|!=|=|~)\s*(.+?)\s*$', re.I)
+    _ORDER = re.compile(r'\s+order\s+by\s+(.+)$', re.I)
+    _FIELD_ALIASES = {"issuekey": "key", "type": "issuetype", "text": "summary", "\"epic link\"": "parent"}
+
+    def __init__(self, text: str):
+        self.text = re.sub(r"\s+", " ", text or "").strip()
+        self.projects: set[str] | None = None
+        self.keys: list[tuple[str, int]] | None = None
+        self.descending = False
+        self.ignored: list[str] = []
+        self._filters: list[Callable[[FakeProject, int], bool]] = []
+
+        where = self.text
+        order = self._ORDER.search(" " + where)
+        if order:
+            where = (" " + where)[:order.start()].strip()
+            self.descending = order.group(1).split(",")[0].strip().lower().endswith("desc")
+        for clause in re.split(r"\s+and\s+", where, flags=re.I) if where else []:
+            if not self._add_clause(self._balance(clause.strip())):
+                self.ignored.append(clause)
+
+    def matches(self, project: FakeProject, number: int) -> bool:
+        return all(check(project, number) for check in self._filters)
+
+    @staticmethod
+    def _balance(clause: str) -> str:
+        """Usuwa nawiasy grupujące, które po podziale na warunki zostały bez pary"""
+        while clause.startswith("(") and clause.count("(") > clause.count(")"):
+            clause = clause[1:].strip()
+        while clause.endswith(")") and clause.count(")") > clause.count("("):
+            clause = clause[:-1].strip()
+        return clause
+
+    def _add_clause(self, clause: str) -> bool:
+        parsed = self._CLAUSE.match(clause)
+        if not parsed:
+            return False
+        name, operator, raw_value = parsed.groups()
+        name = self._FIELD_ALIASES.get(name.lower(), name.lower())
+        operator = " ".join(operator.lower().split())
+        values = self._values(raw_value)
+        negate = operator in ("!=", "not in", "is not")
+
+        if name == "project":
+            projects = {value.upper() for value in values if value}
+            self.projects = projects if not negate else None
+            return not negate
+        if name == "key" and operator in ("=", "in"):
+            self.keys = [
+                (value.rsplit("-", 1)[0].upper(), int(value.rsplit("-", 1)[1]))
+                for value in values if value and re.fullmatch(r"[A-Za-z0-9]+-\d+", value)
+            ]
+            return True
+        if name == "summary" and operator == "~":
+            needle = (values[0] or "").lower()
+            self._filters.append(lambda project, number: needle in project.field(number, "summary").lower())
+            return True
+        if name == "sprint":
+            wanted = {self._sprint_value(value) for value in values}
+            open_sprints = "open" in wanted
+
+            def in_sprint(project: FakeProject, number: int) -> bool:
+                sprint = project.field(number, "sprint")
+                return (sprint in wanted or open_sprints and sprint == project.active_sprint) != negate
+
+            self._filters.append(in_sprint)
+            return True
+        if name in ("status", "issuetype", "priority", "assignee", "parent"):
+            wanted = {self._field_value(name, value) for value in values}
+            self._filters.append(
+                lambda project, number: (self._normalize(project.field(number, name)) in wanted) != negate
+            )
+            return True
+        return False
+
+    @staticmethod
+    def _values(raw_value: str) -> list[str | None]:
+        raw_value = raw_value.strip()
+        if raw_value.startswith("(") and raw_value.endswith(")"):
+            parts = re.findall(r'"[^"]*"|\'[^\']*\'|[^,\s][^,]*', raw_value[1:-1])
+        else:
+            parts = [raw_value]
+        values = []
+        for part in parts:
+            part = part.strip().strip("\"'")
+            values.append(None if part.upper() in ("EMPTY", "NULL") else part)
+        return values
+
+    @staticmethod
+    def _normalize(value: Any) -> Any:
+        return value.lower() if isinstance(value, str) else value
+
+    def _field_value(self, name: str, value: str | None) -> Any:
+        if value is None:
+            return None
+        if name == "issuetype" and value.lower() == "epic":
+            # Nazwa systemowego typu epiku działa w JQL także w polskiej instancji
+            return EPIC_TYPE.lower()
+        if name == "assignee":
+            if value.lower() == "currentuser()":
+                return CURRENT_USER.lower()
+            return _DISPLAY_NAMES.get(value.lower(), value).lower()
+        return value.lower()
+
+    @staticmethod
+    def _sprint_value(value: str | None) -> Any:
+        if value is None:
+            return None
+        if value.lower() == "opensprints()":
+            return "open"
+        return int(value) if value.isdigit() else value
+
+
+class FakeJiraServer(ThreadingHTTPServer):
+    """
+    Serwer HTTP atrapy JIRA
+
+    Można go uruchomić z linii poleceń albo w tym samym procesie (start/stop), np. w benchmarku.
+
+    Args:
+        address: Adres i port nasłuchiwania (port 0 = dowolny wolny)
+        projects: Klucze projektów dostępnych na serwerze
+        issues: Liczba wygenerowanych zgłoszeń w każdym projekcie
+        latency: Opóźnienie każdej odpowiedzi w sekundach
+        jitter: Losowe odchylenie opóźnienia (ułamek latency)
+        rate_limit: Dopuszczalna liczba zapytań na sekundę (0 = bez limitu)
+        burst: Liczba zapytań, które mogą przyjść naraz mimo limitu
+        deployment: "server" (wyszukiwanie przez startAt) lub "cloud" (search/jql z nextPageToken)
+        seed: Ziarno generatora opóźnień
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address: tuple[str, int] = ("127.0.0.1", 0), projects: list[str] | None = None,
+                 issues: int = 1000, latency: float = 0.0, jitter: float = 0.2, rate_limit: float = 0,
+                 burst: int | None = None, deployment: str = "server", seed: int = 0, verbose: bool = False):
+        super().__init__(address, _Handler)
+        self.latency = latency
+        self.jitter = jitter
+        self.deployment = deployment
+        self.verbose = verbose
+        self.limiter = RateLimiter(rate_limit, burst)
+        self.projects: dict[str, FakeProject] = {}
+        for i, key in enumerate(projects or list(PROJECTS)):
+            self.projects[key.upper()] = FakeProject(key.upper(), 10000 + i, i + 1, issues)
+        self.stats: Counter = Counter()
+        self._rng = random.Random(seed)
+        self._stats_lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeJiraServer":
+        """Uruchamia serwer w wątku w tle"""
+        self._thread = threading.Thread(target=self.serve_forever, name="fake-jira", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def count(self, name: str, amount: int = 1) -> None:
+        with self._stats_lock:
+            self.stats[name] += amount
+
+    def delay(self) -> float:
+        if not self.latency:
+            return 0.0
+        with self._stats_lock:
+            return self.latency * self._rng.uniform(1 - self.jitter, 1 + self.jitter)
+
+    # --- Dane ---
+
+    def project(self, key_or_id: str) -> FakeProject:
+        for project in self.projects.values():
+            if key_or_id.upper() in (project.key, project.id):
+                return project
+        raise JiraError(404, f"No project could be found with key '{key_or_id}'.")
+
+    def locate(self, id_or_key: str) -> tuple[FakeProject, int]:
+        """Znajduje zgłoszenie po kluczu (SOET-12) lub ID (projekt * 10^7 + numer)"""
+        if id_or_key.isdigit():
+            project_id, number = divmod(int(id_or_key), 10 ** 7)
+            project = next((p for p in self.projects.values() if p.id == str(project_id)), None)
+        else:
+            key, _, number = id_or_key.upper().rpartition("-")
+            project, number = self.projects.get(key), int(number) if number.isdigit() else 0
+        if project is None or not project.exists(number):
+            raise JiraError(404, "Issue does not exist or you do not have permission to see it.")
+        return project, number
+
+    def sprint(self, sprint_id: int) -> tuple[FakeProject, dict]:
+        for project in self.projects.values():
+            if sprint_id in project.sprints:
+                return project, project.sprints[sprint_id]
+        raise JiraError(404, f"Sprint with id {sprint_id} does not exist")
+
+    @staticmethod
+    def issue_id(project: FakeProject, number: int) -> str:
+        return str(int(project.id) * 10 ** 7 + number)
+
+    def render_issue(self, base: str, project: FakeProject, number: int, fields: set[str] | None) -> dict:
+        record = project.record(number)
+        issue_id = self.issue_id(project, number)
+        rendered = {
+            "summary": record["summary"],
+            "description": record["description"],
+            "status": _status(base, record["status"]),
+            "created": _timestamp(record["created"]),
+            "updated": _timestamp(record["updated"]),
+            "assignee": _user(base, record["assignee"]) if record["assignee"] else None,
+            "issuetype": {
+                "self": f"{base}/rest/api/2/issuetype/{ISSUE_TYPES.get(record['issuetype'], '10000')}",
+                "id": ISSUE_TYPES.get(record["issuetype"], "10000"),
+                "name": record["issuetype"],
+                "subtask": record["issuetype"] == "Podzadanie",
+            },
+            "priority": {"self": f"{base}/rest/api/2/priority/{PRIORITIES.index(record['priority']) + 1}",
+                         "id": str(PRIORITIES.index(record["priority"]) + 1), "name": record["priority"]},
+            "project": {"self": f"{base}/rest/api/2/project/{project.id}", "id": project.id,
+                        "key": project.key, "name": project.name},
+            "parent": {"key": record["parent"]} if record["parent"] else None,
+            SPRINT_FIELD: [_sprint(base, record["sprint"], project.sprints[record["sprint"]])]
+            if record["sprint"] else None,
+        }
+        if fields is not None:
+            rendered = {name: value for name, value in rendered.items() if name in fields}
+        return {
+            "expand": "renderedFields,names,schema,operations,editmeta,changelog,versionedRepresentations",
+            "id": issue_id,
+            "self": f"{base}/rest/api/2/issue/{issue_id}",
+            "key": f"{project.key}-{number}",
+            "fields": rendered,
+        }
+
+    def parse_fields(self, fields: dict, partial: bool = False) -> dict:
+        """
+        Waliduje pola zgłoszenia z zapytania create/update i zamienia je na wartości rekordu
+
+        Raises:
+            JiraError: Z błędami poszczególnych pól (jak JIRA: {"errors": {"pole": "komunikat"}})
+        """
+        errors, parsed = {}, {}
+        if "summary" in fields or not partial:
+            summary = fields.get("summary")
+            if not summary or not isinstance(summary, str):
+                errors["summary"] = "You must specify a summary of the issue."
+            elif "\n" in summary:
+                errors["summary"] = "The summary is invalid because it contains newline characters."
+            else:
+                parsed["summary"] = summary
+        if "issuetype" in fields or not partial:
+            issuetype = fields.get("issuetype")
+            if not isinstance(issuetype, dict):
+                errors["issuetype"] = "Could not find valid 'id' or 'name' in issuetype object."
+            else:
+                name = issuetype.get("name") or next(
+                    (name for name, type_id in ISSUE_TYPES.items() if type_id == str(issuetype.get("id"))), None
+                )
+                if name not in ISSUE_TYPES:
+                    errors["issuetype"] = "Specify a valid issue type"
+                else:
+                    parsed["issuetype"] = name
+        if "priority" in fields:
+            # Jak w JIRA: pola obiektowe podane jako zwykły napis są odrzucane
+            priority = fields["priority"]
+            if not isinstance(priority, dict):
+                errors["priority"] = "Could not find valid 'id' or 'name' in priority object."
+            elif priority.get("name") not in PRIORITIES:
+                errors["priority"] = f"Specify a valid priority: {priority.get('name')}"
+            else:
+                parsed["priority"] = priority["name"]
+        if "assignee" in fields:
+            assignee = fields["assignee"] or {}
+            if not isinstance(assignee, dict):
+                errors["assignee"] = "expected Object containing a 'accountId' property"
+            else:
+                account_id = assignee.get("accountId") or _DISPLAY_NAMES.get(str(assignee.get("name", "")).lower())
+                if assignee and account_id not in USERS:
+                    errors["assignee"] = f"User '{assignee.get('accountId') or assignee.get('name')}' does not exist."
+                else:
+                    parsed["assignee"] = account_id
+        if "description" in fields:
+            parsed["description"] = fields["description"]
+        if "parent" in fields:
+            parent = fields["parent"]
+            if not isinstance(parent, dict):
+                errors["parent"] = "Could not find valid 'id' or 'key' in parent object."
+            else:
+                try:
+                    project, number = self.locate(str(parent.get("key") or parent.get("id")))
+                    parsed["parent"] = f"{project.key}-{number}"
+                except JiraError:
+                    errors["parent"] = f"Could not find issue by id or key: {parent.get('key') or parent.get('id')}"
+        if errors:
+            raise JiraError(400, errors=errors)
+        return parsed
+
+    # --- Endpointy ---
+
+    def server_info(self, request: "_Request") -> dict:
+        cloud = self.deployment == "cloud"
+        return {
+            "baseUrl": request.base,
+            "version": "1001.0.0-SNAPSHOT" if cloud else "9.12.0",
+            "versionNumbers": [1001, 0, 0] if cloud else [9, 12, 0],
+            "deploymentType": "Cloud" if cloud else "Server",
+            "buildNumber": 100000,
+            "serverTitle": "Fake Jira",
+        }
+
+    def myself(self, request: "_Request") -> dict:
+        return _user(request.base, CURRENT_USER)
+
+    def list_fields(self, request: "_Request") -> list:
+        fields = [
+            {"id": name, "key": name, "name": name.capitalize(), "custom": False,
+             "navigable": True, "searchable": True, "clauseNames": [name]}
+            for name in ("summary", "description", "status", "created", "updated",
+                         "assignee", "issuetype", "priority", "project", "parent")
+        ]
+        fields.append({
+            "id": SPRINT_FIELD, "key": SPRINT_FIELD, "name": "Sprint", "custom": True,
+            "navigable": True, "searchable": True, "clauseNames": ["cf[10020]", "Sprint", "sprint"],
+            "schema": {"type": "array", "items": "json", "customId": 10020,
+                       "custom": "com.pyxis.greenhopper.jira:gh-sprint"},
+        })
+        return fields
+
+    def list_projects(self, request: "_Request") -> list:
+        return [self.get_project(request, project.key) for project in self.projects.values()]
+
+    def get_project(self, request: "_Request", key: str) -> dict:
+        project = self.project(key)
+        return {
+            "self": f"{request.base}/rest/api/2/project/{project.id}",
+            "id": project.id,
+            "key": project.key,
+            "name": project.name,
+            "projectTypeKey": "software",
+            "issueTypes": [
+                {"self": f"{request.base}/rest/api/2/issuetype/{type_id}", "id": type_id, "name": name,
+                 "description": TASK_TYPES[name], "subtask": name == "Podzadanie"}
+                for name, type_id in ISSUE_TYPES.items()
+            ],
+        }
+
+    def statuses(self, request: "_Request") -> list:
+        return [_status(request.base, name) for name in STATUSES]
+
+    def assignable_users(self, request: "_Request") -> list:
+        for key in request.param("projectKeys", "").split(","):
+            if key:
+                self.project(key)
+        start, limit = request.int_param("startAt", 0), request.int_param("maxResults", 50)
+        return [_user(request.base, account_id) for account_id in _ACCOUNTS[start:start + limit]]
+
+    def search(self, request: "_Request") -> dict:
+        if self.deployment == "cloud":
+            raise JiraError(410, "The requested API has been removed. Please use /rest/api/3/search/jql.")
+        query, fields = self._query(request)
+        start = request.int_param("startAt", 0)
+        limit = min(request.int_param("maxResults", 50), MAX_SEARCH_RESULTS)
+        matches = self._matches(query)
+        return {
+            "expand": "schema,names",
+            "startAt": start,
+            "maxResults": limit,
+            "total": len(matches),
+            "issues": [self.render_issue(request.base, project, number, fields)
+                       for project, number in matches[start:start + limit]],
+        }
+
+    def search_jql(self, request: "_Request") -> dict:
+        if self.deployment != "cloud":
+            raise JiraError(404, "null for uri: /rest/api/2/search/jql")
+        query, fields = self._query(request)
+        token = request.param("nextPageToken")
+        start = int(base64.urlsafe_b64decode(token).decode()) if token else 0
+        limit = min(request.int_param("maxResults", 50), MAX_SEARCH_RESULTS)
+        matches = self._matches(query)
+        page = matches[start:start + limit]
+        result = {
+            "issues": [self.render_issue(request.base, project, number, fields) for project, number in page],
+            "isLast": start + limit >= len(matches),
+        }
+        if not result["isLast"]:
+            result["nextPageToken"] = base64.urlsafe_b64encode(str(start + limit).encode()).decode()
+        return result
+
+    def _query(self, request: "_Request") -> tuple[JqlQuery, set[str] | None]:
+        query = JqlQuery(request.param("jql", ""))
+        if query.ignored:
+            self.count("jql_ignored_clauses", len(query.ignored))
+        names = request.list_param("fields")
+        fields = None if not names or {"*all", "*navigable"} & set(names) else set(names)
+        return query, fields
+
+    def _matches(self, query: JqlQuery) -> list[tuple[FakeProject, int]]:
+        projects = [self.projects[key] for key in query.projects if key in self.projects] \
+            if query.projects is not None else list(self.projects.values())
+        if query.keys is not None:
+            wanted = {key for key, _ in query.keys}
+            projects = [project for project in projects if project.key in wanted]
+        return [(project, number) for project in projects for number in project.search(query)]
+
+    def get_issue(self, request: "_Request", id_or_key: str) -> dict:
+        project, number = self.locate(id_or_key)
+        names = request.list_param("fields")
+        fields = None if not names or {"*all", "*navigable"} & set(names) else set(names)
+        return self.render_issue(request.base, project, number, fields)
+
+    def create_issue(self, request: "_Request") -> tuple[int, dict]:
+        return 201, self._create(request.base, request.body.get("fields") or {})
+
+    def create_issues(self, request: "_Request") -> tuple[int, dict]:
+        updates = request.body.get("issueUpdates") or []
+        if len(updates) > BULK_CREATE_LIMIT:
+            raise JiraError(400, f"The number of issues to be created exceeds the limit of {BULK_CREATE_LIMIT}.")
+        issues, errors = [], []
+        for index, update in enumerate(updates):
+            try:
+                issues.append(self._create(request.base, update.get("fields") or {}))
+            except JiraError as e:
+                errors.append({"status": e.status, "elementErrors": e.body, "failedElementNumber": index})
+        # Jak JIRA: 400, gdy nie udało się utworzyć żadnego zgłoszenia, 201 przy częściowym sukcesie
+        return (400 if updates and not issues else 201), {"issues": issues, "errors": errors}
+
+    def _create(self, base: str, fields: dict) -> dict:
+        project_ref = fields.get("project") or {}
+        try:
+            project = self.project(str(project_ref.get("key") or project_ref.get("id") or ""))
+        except JiraError:
+            raise JiraError(400, errors={"project": "valid project is required"}) from None
+        number = project.create(self.parse_fields(fields))
+        issue_id = self.issue_id(project, number)
+        return {"id": issue_id, "key": f"{project.key}-{number}", "self": f"{base}/rest/api/2/issue/{issue_id}"}
+
+    def update_issue(self, request: "_Request", id_or_key: str) -> tuple[int, None]:
+        project, number = self.locate(id_or_key)
+        project.update(number, self.parse_fields(request.body.get("fields") or {}, partial=True))
+        return 204, None
+
+    def delete_issue(self, request: "_Request", id_or_key: str) -> tuple[int, None]:
+        project, number = self.locate(id_or_key)
+        project.delete(number)
+        return 204, None
+
+    def boards(self, request: "_Request") -> dict:
+        key = request.param("projectKeyOrId")
+        projects = [self.project(key)] if key else list(self.projects.values())
+        values = [
+            {"id": project.board_id, "self": f"{request.base}/rest/agile/1.0/board/{project.board_id}",
+             "name": f"{project.key} board", "type": "scrum",
+             "location": {"projectId": int(project.id), "projectKey": project.key, "name": project.name}}
+            for project in projects
+        ]
+        return _page(request, values)
+
+    def board_sprints(self, request: "_Request", board_id: str) -> dict:
+        project = next((p for p in self.projects.values() if p.board_id == int(board_id)), None)
+        if project is None:
+            raise JiraError(404, f"Board {board_id} does not exist or you do not have permission to see it.")
+        states = set(filter(None, request.param("state", "").split(",")))
+        values = [
+            _sprint(request.base, sprint_id, sprint, board_id=project.board_id)
+            for sprint_id, sprint in project.sprints.items()
+            if not states or sprint["state"] in states
+        ]
+        return _page(request, values)
+
+    def add_to_sprint(self, request: "_Request", sprint_id: str) -> tuple[int, None]:
+        project, sprint = self.sprint(int(sprint_id))
+        if sprint["state"] == "closed":
+            raise JiraError(400, "Cannot add issues to a closed sprint")
+        for key in request.body.get("issues") or []:
+            issue_project, number = self.locate(key)
+            issue_project.update(number, {"sprint": int(sprint_id)})
+        return 204, None
+
+    def move_to_backlog(self, request: "_Request") -> tuple[int, None]:
+        for key in request.body.get("issues") or []:
+            project, number = self.locate(key)
+            project.update(number, {"sprint": None})
+        return 204, None
+
+    def fake_stats(self, request: "_Request") -> dict:
+        with self._stats_lock:
+            return dict(self.stats)
+
+
+def _page(request: "_Request", values: list) -> dict:
+    """Strona wyników w formacie Agile API (values, isLast)"""
+    start, limit = request.int_param("startAt", 0), request.int_param("maxResults", 50)
+    page = values[start:start + limit]
+    return {"maxResults": limit, "startAt": start, "total": len(values),
+            "isLast": start + limit >= len(values), "values": page}
+
+
+def _timestamp(value: datetime) -> str:
+    return value.strftime("%Y-%m-%dT%H:%M:%S.") + f"{value.microsecond // 1000:03d}+0000"
+
+
+def _user(base: str, account_id: str) -> dict:
+    return {
+        "self": f"{base}/rest/api/2/user?accountId={account_id}",
+        "accountId": account_id,
+        "name": USERS[account_id],
+        "displayName": USERS[account_id],
+        "active": True,
+        "accountType": "atlassian",
+    }
+
+
+def _status(base: str, name: str) -> dict:
+    status_id = str(STATUSES.index(name) + 1) if name in STATUSES else "1"
+    category = ("done", "Done") if name == "Done" else ("new", "To Do") if name == "To Do" \
+        else ("indeterminate", "In Progress")
+    return {
+        "self": f"{base}/rest/api/2/status/{status_id}",
+        "id": status_id,
+        "name": name,
+        "statusCategory": {"key": category[0], "name": category[1]},
+    }
+
+
+def _sprint(base: str, sprint_id: int, sprint: dict, board_id: int | None = None) -> dict:
+    result = {"id": sprint_id, "self": f"{base}/rest/agile/1.0/sprint/{sprint_id}",
+              "state": sprint["state"], "name": sprint["name"]}
+    if board_id is not None:
+        result["originBoardId"] = board_id
+    return result
+
+
+class _Request:
+    """Zapytanie HTTP przekazywane do endpointów: parametry (z query stringa lub ciała POST) i ciało JSON"""
+    def __init__(self, base: str, query: dict[str, list[str]], body: Any):
+        self.base = base
+        self.body = body if isinstance(body, dict) else {}
+        self._params = dict(query)
+        # POST /search i /search/jql przyjmują parametry w ciele zapytania
+        for name, value in self.body.items():
+            self._params.setdefault(name, value if isinstance(value, list) else [value])
+
+    def param(self, name: str, default: Any = None) -> Any:
+        values = self._params.get(name)
+        return str(values[0]) if values else default
+
+    def int_param(self, name: str, default: int) -> int:
+        value = self.param(name)
+        return int(value) if value not in (None, "") else default
+
+    def list_param(self, name: str) -> list[str]:
+        return [part for value in self._params.get(name, []) for part in str(value).split(",") if part]
+
+
+_API = r"/rest/api/[23]"
+_AGILE = r"/rest/agile/1\.0"
+ROUTES: list[tuple[str, re.Pattern, Callable]] = [
+    (method, re.compile(f"^{pattern}$"), handler)
+    for method, pattern, handler in [
+        ("GET", f"{_API}/serverInfo", FakeJiraServer.server_info),
+        ("GET", f"{_API}/myself", FakeJiraServer.myself),
+        ("GET", f"{_API}/field", FakeJiraServer.list_fields),
+        ("GET", f"{_API}/project", FakeJiraServer.list_projects),
+        ("GET", f"{_API}/project/([^/]+)", FakeJiraServer.get_project),
+        ("GET", f"{_API}/status", FakeJiraServer.statuses),
+        ("GET", f"{_API}/user/assignable/multiProjectSearch", FakeJiraServer.assignable_users),
+        ("GET", f"{_API}/search", FakeJiraServer.search),
+        ("POST", f"{_API}/search", FakeJiraServer.search),
+        ("GET", f"{_API}/search/jql", FakeJiraServer.search_jql),
+        ("POST", f"{_API}/search/jql", FakeJiraServer.search_jql),
+        ("POST", f"{_API}/issue", FakeJiraServer.create_issue),
+        ("POST", f"{_API}/issue/bulk", FakeJiraServer.create_issues),
+        ("GET", f"{_API}/issue/([^/]+)", FakeJiraServer.get_issue),
+        ("PUT", f"{_API}/issue/([^/]+)", FakeJiraServer.update_issue),
+        ("DELETE", f"{_API}/issue/([^/]+)", FakeJiraServer.delete_issue),
+        ("GET", f"{_AGILE}/board", FakeJiraServer.boards),
+        ("GET", f"{_AGILE}/board/(\\d+)/sprint", FakeJiraServer.board_sprints),
+        ("POST", f"{_AGILE}/sprint/(\\d+)/issue", FakeJiraServer.add_to_sprint),
+        ("POST", f"{_AGILE}/backlog/issue", FakeJiraServer.move_to_backlog),
+        ("GET", "/_fake/stats", FakeJiraServer.fake_stats),
+    ]
+]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: FakeJiraServer
+    # Keep-alive, jak w prawdziwej JIRA - klient jira.JIRA używa puli połączeń requests
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self) -> None:
+        self._dispatch("GET")
+
+    def do_POST(self) -> None:
+        self._dispatch("POST")
+
+    def do_PUT(self) -> None:
+        self._dispatch("PUT")
+
+    def do_DELETE(self) -> None:
+        self._dispatch("DELETE")
+
+    def _dispatch(self, method: str) -> None:
+        # Ciało trzeba odczytać zawsze, także przy 429, żeby połączenie nadawało się do ponownego użycia
+        length = int(self.headers.get("Content-Length") or 0)
+        raw_body = self.rfile.read(length) if length else b""
+        url = urlsplit(self.path)
+
+        handler, args = None, ()
+        for route_method, pattern, route_handler in ROUTES:
+            matched = pattern.match(url.path)
+            if matched and route_method == method:
+                handler, args = route_handler, matched.groups()
+                break
+        route = f"{method} {handler.__name__}" if handler else f"{method} unknown"
+
+        if handler is not FakeJiraServer.fake_stats:
+            retry_after = self.server.limiter.acquire()
+            if retry_after:
+                self.server.count("rate_limited")
+                self._respond(429, {"errorMessages": ["Rate limit exceeded."], "errors": {}}, {
+                    "Retry-After": str(max(1, math.ceil(retry_after))),
+                    "X-RateLimit-Limit": str(self.server.limiter.burst),
+                    "X-RateLimit-FillRate": str(self.server.limiter.rate),
+                    "X-RateLimit-Interval-Seconds": "1",
+                })
+                return
+            self.server.count("requests")
+            self.server.count(route)
+            delay = self.server.delay()
+            if delay:
+                time.sleep(delay)
+
+        if handler is None:
+            self._respond(404, {"errorMessages": [f"null for uri: {url.path}"], "errors": {}})
+            return
+        try:
+            body = json.loads(raw_body) if raw_body else {}
+            host = self.headers.get("Host")
+            request = _Request(f"http://{host}" if host else self.server.url, parse_qs(url.query), body)
+            result = handler(self.server, request, *args)
+            status, payload = result if isinstance(result, tuple) else (200, result)
+        except JiraError as e:
+            status, payload = e.status, e.body
+        except (ValueError, KeyError, TypeError) as e:
+            status, payload = 400, {"errorMessages": [f"Invalid request: {e}"], "errors": {}}
+        except Exception as e:
+            print(f"\033[91mWarning: Fake Jira failed on {method} {url.path}: {e}\033[0m")
+            status, payload = 500, {"errorMessages": [f"Internal server error: {e}"], "errors": {}}
+        if status >= 400:
+            self.server.count(f"status_{status}")
+        self._respond(status, payload)
+
+    def _respond(self, status: int, payload: Any, headers: dict | None = None) -> None:
+        body = json.dumps(payload, ensure_ascii=False).encode() if payload is not None else b""
+        self.send_response(status)
+        if body:
+            self.send_header("Content-Type", "application/json;charset=UTF-8")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--projects", default=",".join(PROJECTS), help="klucze projektów oddzielone przecinkami")
+    parser.add_argument("--issues", type=int, default=100_000, help="liczba zgłoszeń w każdym projekcie")
+    parser.add_argument("--latency", type=float, default=0.05, help="opóźnienie odpowiedzi w sekundach")
+    parser.add_argument("--jitter", type=float, default=0.2, help="losowe odchylenie opóźnienia (ułamek)")
+    parser.add_argument("--rate-limit", type=float, default=0, help="zapytania na sekundę (0 = bez limitu)")
+    parser.add_argument("--burst", type=int, default=None, help="pojemność kubełka limitu (domyślnie rate-limit)")
+    parser.add_argument("--deployment", choices=("server", "cloud"), default="server")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--verbose", action="store_true", help="loguj każde zapytanie")
+    args = parser.parse_args()
+
+    server = FakeJiraServer(
+        (args.host, args.port), projects=args.projects.split(","), issues=args.issues,
+        latency=args.latency, jitter=args.jitter, rate_limit=args.rate_limit, burst=args.burst,
+        deployment=args.deployment, seed=args.seed, verbose=args.verbose,
+    )
+    print(f"Atrapa JIRA ({args.deployment}) na {server.url}: {len(server.projects)} projektów "
+          f"po {args.issues} zgłoszeń")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(json.dumps(dict(server.stats), indent=2, ensure_ascii=False))
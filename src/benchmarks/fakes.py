@@ -0,0 +1,303 @@
+"""
+Atrapy zewnętrznych usług (OpenAI, JIRA, Discord) do benchmarków uruchamianych bez kont i sieci.
+
+Atrapy odtwarzają tylko tę część interfejsów, której używa bot, z konfigurowalnym opóźnieniem.
+"""
+import asyncio
+import itertools
+import json
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+from config.jira_config import EPICS, STATUSES, TASK_TYPES, USERS
+
+# Przykładowe treści wzmianek dla każdego scenariusza ruchu
+SCENARIOS = {
+    "add": "dodaj zadanie: ekran logowania przez firebase, przypisz do Marceli",
+    "update": "przypisz SOET-12 do Marceli i zmień priorytet na wysoki",
+    "list": "pokaż zadania w toku",
+    "mixed": "dodaj zadanie: poprawić crash przy powiadomieniach i pokaż moje zadania",
+}
+
+
+def _intents(text: str) -> dict:
+    """Rozpoznaje intencje po słowach kluczowych scenariuszy"""
+    text = text.lower()
+    return {
+        "add": "dodaj" in text,
+        "update": "przypisz" in text,
+        "list": "pokaż" in text,
+    }
+
+
+class FakeOpenAIClient:
+    """
+    Atrapa AsyncOpenAI: chat.completions.create zwraca gotowe odpowiedzi dla każdego promptu bota
+
+    Rodzaj promptu jest rozpoznawany po treści wiadomości systemowej, plan po słowach kluczowych
+    wzmianki (SCENARIOS). Opóźnienie to latency ± jitter (ułamek), dla strumienia - czas do
+    pierwszego fragmentu, a kolejne fragmenty przychodzą co chunk_interval sekund.
+    """
+    def __init__(self, latency: float = 0.5, jitter: float = 0.2, chunk_interval: float = 0.01, seed: int = 0):
+        self.latency = latency
+        self.jitter = jitter
+        self.chunk_interval = chunk_interval
+        self.rng = random.Random(seed)
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def _delay(self) -> float:
+        return self.latency * self.rng.uniform(1 - self.jitter, 1 + self.jitter)
+
+    async def create(self, model: str, messages: list, stream: bool = False, tools: list | None = None, **kwargs):
+        self.calls += 1
+        system = messages[0]["content"]
+        query = messages[-1]["content"]
+        usage = SimpleNamespace(
+            prompt_tokens=sum(len(message["content"]) for message in messages) // 4,
+            completion_tokens=0,
+            prompt_tokens_details=SimpleNamespace(cached_tokens=0),
+        )
+        await asyncio.sleep(self._delay())
+
+        if stream:
+            return self._stream(self._answer(query), usage)
+
+        tool_calls = None
+        if tools:
+            content, tool_calls = self._tool_plan(query)
+        elif "analyzing messages to perform Jira-specific operations" in system:
+            content = self._plan(query)
+        elif "specialized in task creation" in system:
+            content = json.dumps({"_thinking": "fake", "add": [{
+                "summary": query[-60:], "issuetype": "Zadanie", "priority": {"name": "Medium"},
+                "parent": {"key": next(iter(EPICS))}, "add_to_sprint": True,
+            }]})
+        elif "specialized in task updates" in system:
+            content = json.dumps({"_thinking": "fake", "diff": [
+                {"task_id": "SOET-12", "assignee": "Marceli Lenart", "priority": "High"}
+            ]})
+        elif "specialized in searching tasks" in system:
+            content = json.dumps({"_thinking": "fake", "jql": f'project = SOET AND status = "{STATUSES[2]}"'})
+        else:
+            content = self._answer(query)
+
+        usage.completion_tokens = len(content or "") // 4
+        message = SimpleNamespace(content=content, tool_calls=tool_calls)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage)
+
+    def _plan(self, query: str) -> str:
+        intents = _intents(query)
+        return json.dumps({
+            "_thinking": "Planuję akcje dla wiadomości.",
+            "add": f"Requester: {query}" if intents["add"] else None,
+            "update": f"Requester: {query}" if intents["update"] else None,
+            "list": f"Requester: {query}" if intents["list"] else None,
+        })
+
+    def _tool_plan(self, query: str) -> tuple[str, list]:
+        intents = _intents(query)
+        calls = []
+        if intents["add"]:
+            calls.append(("create_issues", {"issues": [{
+                "summary": query[-60:], "issuetype": "Zadanie", "priority": "Medium",
+                "parent": next(iter(EPICS)), "add_to_sprint": True,
+            }]}))
+        if intents["update"]:
+            calls.append(("update_issues", {"updates": [{"task_id": "SOET-12", "assignee": "Marceli Lenart"}]}))
+        if intents["list"]:
+            calls.append(("search_jql", {"jql": f'project = SOET AND status = "{STATUSES[2]}"'}))
+        tool_calls = [
+            SimpleNamespace(function=SimpleNamespace(name=name, arguments=json.dumps(arguments)))
+            for name, arguments in calls
+        ]
+        return "Wykonuję akcje w Jirze.", tool_calls
+
+    @staticmethod
+    def _answer(query: str) -> str:
+        return "Gotowe! " + " ".join(["Zadania zostały obsłużone zgodnie z prośbą."] * 8)
+
+    async def _stream(self, text: str, usage):
+        words = text.split(" ")
+        for i, word in enumerate(words):
+            if i:
+                await asyncio.sleep(self.chunk_interval)
+            yield SimpleNamespace(
+                choices=[SimpleNamespace(delta=SimpleNamespace(content=word + " "))], usage=None
+            )
+        usage.completion_tokens = len(text) // 4
+        yield SimpleNamespace(choices=[], usage=usage)
+
+
+class _ResultList(list):
+    """Lista wyników wyszukiwania z łączną liczbą trafień, jak jira.client.ResultList"""
+    def __init__(self, items, total: int):
+        super().__init__(items)
+        self.total = total
+
+
+class FakeJira:
+    """
+    Atrapa klienta jira.JIRA (wariant Server - stronicowanie przez startAt) z danymi w pamięci
+
+    Każde wywołanie blokuje wątek na latency sekund, jak zapytanie HTTP.
+    Wyszukiwanie rozpoznaje tylko "key in (...)" i "status = ...", pozostałe warunki są pomijane.
+    """
+    def __init__(self, project_key: str = "SOET", issues: int = 1000, latency: float = 0.1):
+        self.project_key = project_key
+        self.latency = latency
+        self.calls = 0
+        self._lock = threading.Lock()
+        self._next_id = itertools.count(issues + 1)
+        self._issue_types = [SimpleNamespace(name=name, id=str(10000 + i)) for i, name in enumerate(TASK_TYPES)]
+        self._users = list(USERS.values())
+        self._issues = {}
+        for number in range(1, issues + 1):
+            issue = self._make_issue(number, f"Zadanie testowe {number}", status=STATUSES[number % len(STATUSES)])
+            self._issues[issue.key] = issue
+
+    def _wait(self) -> None:
+        with self._lock:
+            self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _make_issue(self, number: int, summary: str, status: str = "To Do",
+                    issuetype: str | None = None, assignee: str | None = None):
+        now = datetime.now(timezone.utc).isoformat()
+        fields = SimpleNamespace(
+            summary=summary,
+            description=f"Opis zadania {number}",
+            status=SimpleNamespace(name=status),
+            created=now,
+            updated=now,
+            assignee=SimpleNamespace(displayName=assignee or self._users[number % len(self._users)]),
+            issuetype=SimpleNamespace(name=issuetype or self._issue_types[0].name),
+            priority=SimpleNamespace(name="Medium"),
+        )
+        issue = SimpleNamespace(key=f"{self.project_key}-{number}", id=str(number), fields=fields)
+        issue.update = lambda fields=None, **kwargs: self._update(issue, fields or {})
+        return issue
+
+    def _update(self, issue, fields: dict) -> None:
+        self._wait()
+        if "summary" in fields:
+            issue.fields.summary = fields["summary"]
+        if "priority" in fields:
+            issue.fields.priority = SimpleNamespace(name=fields["priority"].get("name", "Medium"))
+
+    def project(self, key: str):
+        self._wait()
+        return SimpleNamespace(id="10001", key=key, issueTypes=self._issue_types)
+
+    def issue(self, key: str, fields=None):
+        self._wait()
+        return self._issues[key]
+
+    def search_issues(self, jql_str: str, startAt: int = 0, maxResults: int = 50, fields=None, **kwargs):
+        self._wait()
+        if "key in (" in jql_str:
+            keys = jql_str.split("key in (", 1)[1].split(")", 1)[0].replace(" ", "").split(",")
+            matches = [self._issues[key] for key in keys if key in self._issues]
+        elif "status = " in jql_str:
+            status = jql_str.split("status = ", 1)[1].split(" ")[0].strip('"')
+            matches = [issue for issue in self._issues.values() if issue.fields.status.name == status]
+        else:
+            matches = list(self._issues.values())
+        return _ResultList(matches[startAt:startAt + maxResults], len(matches))
+
+    def create_issue(self, fields: dict, prefetch: bool = True):
+        self._wait()
+        return self._create(fields)
+
+    def create_issues(self, field_list: list[dict], prefetch: bool = True):
+        self._wait()
+        return [{"status": "Success", "issue": self._create(fields), "error": None} for fields in field_list]
+
+    def _create(self, fields: dict):
+        number = next(self._next_id)
+        issue = self._make_issue(number, fields["summary"])
+        with self._lock:
+            self._issues[issue.key] = issue
+        return issue
+
+    def boards(self, projectKeyOrID=None, **kwargs):
+        self._wait()
+        return [SimpleNamespace(id=1, name=f"{self.project_key} board")]
+
+    def sprints(self, board_id: int, state=None, **kwargs):
+        self._wait()
+        return [SimpleNamespace(id=1, name="Sprint 1", state="active")]
+
+    def add_issues_to_sprint(self, sprint_id: int, issue_keys: list[str]):
+        self._wait()
+
+    def move_to_backlog(self, issue_keys: list[str]):
+        self._wait()
+
+
+class FakeMessage:
+    """Wiadomość Discorda wysłana przez atrapę kanału"""
+    def __init__(self, channel, content: str):
+        self.channel = channel
+        self.content = content
+
+    async def edit(self, content: str) -> None:
+        await self.channel.api_call()
+        self.content = content
+
+    async def reply(self, content: str):
+        return await self.channel.send(content)
+
+
+class _FakeTyping:
+    def __init__(self, channel):
+        self.channel = channel
+
+    async def __aenter__(self):
+        await self.channel.api_call()
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+
+class FakeChannel:
+    """Atrapa kanału Discorda - każde wywołanie API (wysyłka, edycja, typing) trwa latency sekund"""
+    def __init__(self, channel_id: int, guild_id: int, latency: float = 0.15):
+        self.id = channel_id
+        self.name = f"channel-{channel_id}"
+        self.guild = SimpleNamespace(id=guild_id)
+        self.latency = latency
+        self.sent = 0
+
+    async def api_call(self) -> None:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    async def send(self, content: str) -> FakeMessage:
+        await self.api_call()
+        self.sent += 1
+        return FakeMessage(self, content)
+
+    def typing(self) -> _FakeTyping:
+        return _FakeTyping(self)
+
+    async def fetch_message(self, message_id: int):
+        await self.api_call()
+        raise LookupError(f"Message {message_id} not found")
+
+
+def fake_mention(channel: FakeChannel, message_id: int, author: str, content: str):
+    """Buduje wzmiankę (discord.Message) na kanale atrapy"""
+    return SimpleNamespace(
+        id=message_id,
+        channel=channel,
+        guild=channel.guild,
+        author=SimpleNamespace(name=author, id=hash(author) & 0xFFFFFFFF, mention=f"<@{author}>"),
+        content=content,
+        reference=None,
+        created_at=datetime.now(timezone.utc),
+    )
@@ -0,0 +1,170 @@
+"""
+Benchmark całego potoku obsługi wzmianek (AIDiscordBot.on_mention) bez Discorda, OpenAI i JIRA.
+
+Wzmianki trafiają do prawdziwego DiscordService (dyspozytor, kolejki kanałów, wysyłki w tle),
+ale kanały, klient OpenAI i klient JIRA to atrapy z benchmarks.fakes o zadanym opóźnieniu.
+Z --jira http bot używa prawdziwego klienta jira.JIRA połączonego z lokalną atrapą serwera
+(benchmarks.fake_jira_server). Czasy etapów są zbierane ze spanów (services.tracing_service).
+
+Uruchomienie (z katalogu src):
+    python -m benchmarks.pipeline_benchmark --mentions 200 --channels 20 --guilds 4
+"""
+import argparse
+import asyncio
+import os
+import resource
+import time
+from collections import defaultdict
+
+SCENARIO_MIX = ("list", "add", "list", "update", "mixed")
+
+
+def percentile(values: list[float], q: float) -> float:
+    """Percentyl metodą najbliższej rangi"""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = max(0, min(len(ordered) - 1, round(q * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+def stage_name(span) -> str:
+    # Zapytania do modelu i wywołania JIRA rozbijamy na rodzaj promptu i metodę
+    if span.name == "openai":
+        return f"openai:{span.attributes.get('prompt_type')}"
+    if span.name == "jira":
+        return f"jira:{span.attributes.get('method')}"
+    return span.name
+
+
+async def drive(args) -> None:
+    # Konfiguracja jest czytana przy imporcie modułów bota, więc importujemy je po ustawieniu zmiennych
+    from app import AIDiscordBot
+    from benchmarks.fakes import SCENARIOS, FakeChannel, FakeJira, FakeOpenAIClient, fake_mention
+    from services.discord_service import DiscordService
+    from services.jira_service import JiraService
+    from services.openai_service import OpenAIService
+    from services.service_registry import ServiceRegistry
+    from services.text_service import use_estimated_encoding
+    from services.tracing_service import add_span_sink, remove_span_sink
+
+    if args.tokenizer == "estimate":
+        # Bez pobierania plików BPE tiktoken - benchmark działa bez dostępu do sieci
+        use_estimated_encoding()
+    openai_client = FakeOpenAIClient(latency=args.llm_latency, seed=args.seed)
+    fake_jiras = []
+    jira_server = None
+
+    if args.jira == "http":
+        from jira import JIRA
+        from benchmarks.fake_jira_server import FakeJiraServer
+
+        jira_server = FakeJiraServer(issues=args.issues, latency=args.jira_latency,
+                                     rate_limit=args.jira_rate_limit, seed=args.seed).start()
+
+        def jira_factory(project_key: str) -> JiraService:
+            return JiraService(project_key, jira=JIRA(server=jira_server.url, basic_auth=("benchmark", "benchmark")))
+    else:
+        def jira_factory(project_key: str) -> JiraService:
+            fake = FakeJira(project_key, issues=args.issues, latency=args.jira_latency)
+            fake_jiras.append(fake)
+            return JiraService(project_key, jira=fake)
+
+    channels = {
+        channel_id: FakeChannel(channel_id, guild_id=channel_id % args.guilds, latency=args.discord_latency)
+        for channel_id in range(1, args.channels + 1)
+    }
+    discord_service = DiscordService()
+    discord_service.bot.get_channel = channels.get
+    openai_service = OpenAIService(client=openai_client)
+    bot = AIDiscordBot(
+        discord_service=discord_service,
+        openai_service=openai_service,
+        services=ServiceRegistry(openai_service, jira_factory=jira_factory),
+    )
+    await bot.text_service.initialize_tokenizer()
+
+    durations: dict[str, list[float]] = defaultdict(list)
+    sink = lambda finished: durations[stage_name(finished)].append(finished.duration)
+    add_span_sink(sink)
+
+    authors = ["hessbrees", "netherman2440", "rizzinmyveins", "sylwesterorlos"]
+    interval = 1 / args.rate if args.rate else 0
+    started = time.perf_counter()
+    try:
+        for number in range(args.mentions):
+            channel = channels[number % args.channels + 1]
+            scenario = SCENARIO_MIX[number % len(SCENARIO_MIX)]
+            message = fake_mention(channel, number, authors[number % len(authors)], SCENARIOS[scenario])
+            discord_service.dispatch_mention(message, message.content)
+            if interval:
+                await asyncio.sleep(interval)
+        # Czekamy także na wysyłki w tle, które mogą trwać po zakończeniu obsługi wzmianek
+        await discord_service.drain()
+    finally:
+        remove_span_sink(sink)
+        if jira_server is not None:
+            jira_server.stop()
+    elapsed = time.perf_counter() - started
+
+    stats = discord_service.mention_dispatcher.stats()
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"Wzmianki: {args.mentions} na {args.channels} kanałach w {args.guilds} serwerach, "
+          f"tryb planera: {args.planner_mode}, strumieniowanie: {'tak' if args.stream else 'nie'}, "
+          f"tokenizer: {args.tokenizer}")
+    print(f"Czas: {elapsed:.2f} s, przepustowość: {stats.processed / elapsed:.2f} wzmianek/s, "
+          f"obsłużone: {stats.processed}, błędy: {stats.failed}, odrzucone: {stats.shed}")
+    jira_calls = jira_server.stats["requests"] if jira_server else sum(fake.calls for fake in fake_jiras)
+    print(f"Zapytania do modelu: {openai_client.calls}, wywołania JIRA: {jira_calls}, "
+          f"wiadomości Discord: {sum(channel.sent for channel in channels.values())}")
+    if jira_server is not None and jira_server.stats["rate_limited"]:
+        print(f"Odpowiedzi 429 z atrapy JIRA: {jira_server.stats['rate_limited']}")
+    print(f"Szczytowe RSS: {peak_rss_mb:.1f} MB")
+    print()
+    print(f"{'etap':<28}{'liczba':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name in sorted(durations, key=lambda stage: (stage != "mention", stage)):
+        values = durations[name]
+        print(f"{name:<28}{len(values):>8}"
+              f"{percentile(values, 0.50) * 1000:>10.1f}"
+              f"{percentile(values, 0.95) * 1000:>10.1f}"
+              f"{percentile(values, 0.99) * 1000:>10.1f}")
+
+
+def run(args) -> None:
+    os.environ.update({
+        "PLANNER_MODE": args.planner_mode,
+        "STREAM_ANSWERS": "true" if args.stream else "false",
+        "MENTION_MAX_CONCURRENCY": str(args.concurrency),
+        # Kolejki kanałów mieszczą cały ruch - benchmark mierzy przepustowość, nie odrzucanie
+        "MENTION_QUEUE_SIZE": str(args.mentions),
+        "DISCORD_EDIT_INTERVAL": "0.2",
+        "JQL_CACHE_PATH": "",
+        "TOKENIZER_WARMUP": "false",
+        "LOG_LEVEL": "WARNING",
+        "OPENAI_API_KEY": os.environ.get("OPENAI_API_KEY", "benchmark"),
+    })
+    asyncio.run(drive(args))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mentions", type=int, default=200, help="liczba wzmianek")
+    parser.add_argument("--channels", type=int, default=20, help="liczba kanałów")
+    parser.add_argument("--guilds", type=int, default=4, help="liczba serwerów, między które rozkładane są kanały")
+    parser.add_argument("--rate", type=float, default=0, help="wzmianki na sekundę (0 = wszystkie naraz)")
+    parser.add_argument("--concurrency", type=int, default=4, help="MENTION_MAX_CONCURRENCY")
+    parser.add_argument("--planner-mode", choices=("plan", "tools"), default="plan")
+    parser.add_argument("--stream", action=argparse.BooleanOptionalAction, default=True,
+                        help="strumieniowanie odpowiedzi")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="opóźnienie odpowiedzi modelu w sekundach")
+    parser.add_argument("--jira-latency", type=float, default=0.1, help="opóźnienie wywołania JIRA w sekundach")
+    parser.add_argument("--discord-latency", type=float, default=0.15, help="opóźnienie wywołania API Discorda")
+    parser.add_argument("--issues", type=int, default=1000, help="liczba zgłoszeń w atrapie JIRA")
+    parser.add_argument("--jira", choices=("memory", "http"), default="memory",
+                        help="atrapa klienta JIRA w pamięci albo klient jira.JIRA z lokalnym serwerem atrapy")
+    parser.add_argument("--jira-rate-limit", type=float, default=0,
+                        help="limit zapytań na sekundę serwera atrapy JIRA (tylko --jira http)")
+    parser.add_argument("--tokenizer", choices=("estimate", "tiktoken"), default="estimate",
+                        help="szacowanie tokenów z długości tekstu (offline) albo tiktoken (pobiera pliki BPE)")
+    parser.add_argument("--seed", type=int, default=0)
+    run(parser.parse_args())
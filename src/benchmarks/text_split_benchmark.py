@@ -0,0 +1,135 @@
+"""
+Benchmark podziału tekstu na fragmenty (TextService.split / get_chunk).
+
+Porównuje jednoprzebiegowy podział na pozycjach tokenów z dawnym wyszukiwaniem
+binarnym (każda próba tokenizowała text[start:mid] od nowa) na wygenerowanym
+dokumencie markdown o zadanym rozmiarze.
+
+Uruchomienie (z katalogu src):
+    python -m benchmarks.text_split_benchmark --size-mb 4 --limit 1000
+"""
+import argparse
+import asyncio
+import random
+import time
+from typing import Any, Dict
+
+from services.text_service import TextService
+
+WORDS = (
+    "jira sprint task epic backlog discord bot issue assignee priority status "
+    "firebase login notification tapper inventory vendor onboarding analytics "
+    "zadanie błąd historyjka podzadanie tablica przegląd wdrożenie"
+).split()
+
+
+def generate_markdown(size_bytes: int, seed: int = 0) -> str:
+    """Generuje markdown z nagłówkami, akapitami, listami, linkami i obrazkami"""
+    rng = random.Random(seed)
+    parts = []
+    length = 0
+    section = 0
+    while length < size_bytes:
+        section += 1
+        block = [f"{'#' * rng.randint(1, 4)} Section {section} {rng.choice(WORDS)}", ""]
+        for _ in range(rng.randint(2, 6)):
+            sentence = " ".join(rng.choice(WORDS) for _ in range(rng.randint(20, 80)))
+            block.append(sentence.capitalize() + ".")
+            if rng.random() < 0.3:
+                block.append(f"See [{rng.choice(WORDS)}](https://example.com/{section}/{rng.randint(0, 999)}).")
+            if rng.random() < 0.1:
+                block.append(f"![{rng.choice(WORDS)}](https://example.com/img/{section}.png)")
+            block.append("")
+        if rng.random() < 0.5:
+            block.extend(f"- {rng.choice(WORDS)} {rng.choice(WORDS)}" for _ in range(rng.randint(2, 8)))
+            block.append("")
+        text = "\n".join(block) + "\n"
+        parts.append(text)
+        length += len(text.encode("utf-8"))
+    return "".join(parts)
+
+
+def legacy_get_chunk(service: TextService, text: str, start: int, limit: int) -> Dict[str, Any]:
+    """Dawna implementacja get_chunk: wyszukiwanie binarne z tokenizacją przy każdej próbie"""
+    overhead = (service.count_tokens(service.format_for_tokenization("")) -
+                service.count_tokens(""))
+    max_pos = len(text)
+
+    low, high = start, max_pos
+    best_fit = start
+    while low <= high:
+        mid = (low + high) // 2
+        tokens = service.count_tokens(text[start:mid]) + overhead
+        if tokens <= limit:
+            best_fit = mid
+            low = mid + 1
+        else:
+            high = mid - 1
+
+    def try_adjust_boundary(pos: int) -> int:
+        next_newline = text.find('\n', pos)
+        if next_newline != -1 and next_newline < max_pos:
+            candidate = next_newline + 1
+            if service.count_tokens(text[start:candidate]) + overhead <= limit:
+                return candidate
+        prev_newline = text.rindex('\n', start, pos) if '\n' in text[start:pos] else -1
+        if prev_newline > start:
+            candidate = prev_newline + 1
+            if service.count_tokens(text[start:candidate]) + overhead <= limit:
+                return candidate
+        return pos
+
+    final_end = try_adjust_boundary(best_fit)
+    return {"chunk_text": text[start:final_end], "chunk_end": final_end}
+
+
+def boundaries(get_chunk, text: str) -> list[int]:
+    ends = []
+    position = 0
+    while position < len(text):
+        position = get_chunk(text, position)["chunk_end"]
+        ends.append(position)
+    return ends
+
+
+def run(size_mb: float, limit: int, legacy_kb: int, model: str) -> None:
+    service = TextService(model)
+    asyncio.run(service.initialize_tokenizer())
+    text = generate_markdown(int(size_mb * 1024 * 1024))
+    print(f"Dokument: {len(text.encode('utf-8')) / 1024 / 1024:.2f} MB, limit {limit} tokenów")
+
+    started = time.perf_counter()
+    documents = asyncio.run(service.split(text, limit))
+    elapsed = time.perf_counter() - started
+    print(f"split (jednoprzebiegowy):    {elapsed:8.2f} s, {len(documents)} fragmentów, "
+          f"{len(text) / elapsed / 1024 / 1024:.2f} MB/s")
+
+    # Dawny algorytm jest kwadratowy względem długości tekstu - mierzymy go na prefiksie
+    sample = text[:legacy_kb * 1024]
+    offsets = service.encode_offsets(sample)
+    overhead = service.formatting_overhead()
+
+    started = time.perf_counter()
+    new_ends = boundaries(lambda t, s: service.get_chunk(t, s, limit, offsets=offsets, overhead=overhead), sample)
+    new_elapsed = time.perf_counter() - started
+
+    started = time.perf_counter()
+    old_ends = boundaries(lambda t, s: legacy_get_chunk(service, t, s, limit), sample)
+    old_elapsed = time.perf_counter() - started
+
+    same = sum(1 for a, b in zip(new_ends, old_ends) if a == b)
+    print(f"prefiks {legacy_kb} KB - get_chunk jednoprzebiegowy: {new_elapsed:8.3f} s, {len(new_ends)} fragmentów")
+    print(f"prefiks {legacy_kb} KB - get_chunk binarny (dawny):   {old_elapsed:8.3f} s, {len(old_ends)} fragmentów")
+    print(f"przyspieszenie: {old_elapsed / new_elapsed:.1f}x, "
+          f"zgodne granice: {same}/{max(len(new_ends), len(old_ends))}"
+          f"{' (identyczny podział)' if new_ends == old_ends else ''}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=float, default=4.0, help="rozmiar generowanego dokumentu")
+    parser.add_argument("--limit", type=int, default=1000, help="limit tokenów na fragment")
+    parser.add_argument("--legacy-kb", type=int, default=256, help="rozmiar prefiksu dla dawnego algorytmu")
+    parser.add_argument("--model", default="gpt-4o")
+    args = parser.parse_args()
+    run(args.size_mb, args.limit, args.legacy_kb, args.model)
@@ -0,0 +1,62 @@
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# OpenAI
+OPENAI_MAX_CONCURRENCY = int(os.getenv("OPENAI_MAX_CONCURRENCY", "8"))
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "20"))
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "60"))
+# Limit tokenów promptu jednego zapytania - dokumenty w prompcie odpowiedzi są przycinane, większe prompty odrzucane (0 = bez limitu)
+OPENAI_MAX_PROMPT_TOKENS = int(os.getenv("OPENAI_MAX_PROMPT_TOKENS", "32000"))
+# Limit tokenów (prompt i odpowiedź) jednego serwera Discorda w oknie czasowym (0 = bez limitu)
+OPENAI_GUILD_TOKEN_BUDGET = int(os.getenv("OPENAI_GUILD_TOKEN_BUDGET", "0"))
+OPENAI_GUILD_BUDGET_WINDOW = float(os.getenv("OPENAI_GUILD_BUDGET_WINDOW", "3600"))
+
+# Jira
+JIRA_MAX_WORKERS = int(os.getenv("JIRA_MAX_WORKERS", "8"))
+JIRA_CALL_TIMEOUT = float(os.getenv("JIRA_CALL_TIMEOUT", "30"))
+JIRA_METADATA_TTL = float(os.getenv("JIRA_METADATA_TTL", "600"))
+JIRA_BULK_CREATE = os.getenv("JIRA_BULK_CREATE", "true").lower() == "true"
+JIRA_UPDATE_CONCURRENCY = int(os.getenv("JIRA_UPDATE_CONCURRENCY", "8"))
+JIRA_PAGE_SIZE = int(os.getenv("JIRA_PAGE_SIZE", "50"))
+JIRA_MAX_RESULTS = int(os.getenv("JIRA_MAX_RESULTS", "100"))
+JIRA_SEARCH_CACHE_TTL = float(os.getenv("JIRA_SEARCH_CACHE_TTL", "120"))
+JIRA_SEARCH_CACHE_SIZE = int(os.getenv("JIRA_SEARCH_CACHE_SIZE", "256"))
+# Pusta ścieżka wyłącza zapis tłumaczeń zapytań na JQL na dysk
+JQL_CACHE_PATH = os.getenv("JQL_CACHE_PATH", ".cache/jql_translations.json") or None
+JQL_CACHE_SIZE = int(os.getenv("JQL_CACHE_SIZE", "1000"))
+# Co ile sekund nowe tłumaczenia są zapisywane na dysk (zbiorczo, w tle)
+JQL_CACHE_SAVE_INTERVAL = float(os.getenv("JQL_CACHE_SAVE_INTERVAL", "30"))
+
+# Discord
+STREAM_ANSWERS = os.getenv("STREAM_ANSWERS", "true").lower() == "true"
+# Discord pozwala na ok. 5 edycji wiadomości na 5 sekund na kanał
+DISCORD_EDIT_INTERVAL = float(os.getenv("DISCORD_EDIT_INTERVAL", "1.0"))
+# Wzmianki czekające w kolejce jednego kanału, ponad limit bot odpowiada, że jest zajęty
+MENTION_QUEUE_SIZE = int(os.getenv("MENTION_QUEUE_SIZE", "5"))
+MENTION_MAX_CONCURRENCY = int(os.getenv("MENTION_MAX_CONCURRENCY", "4"))
+# Limity czasu obsługi zdarzenia przez jednego obserwatora w sekundach
+MESSAGE_OBSERVER_TIMEOUT = float(os.getenv("MESSAGE_OBSERVER_TIMEOUT", "10"))
+MENTION_OBSERVER_TIMEOUT = float(os.getenv("MENTION_OBSERVER_TIMEOUT", "180"))
+
+# Konwersacje
+CONVERSATION_IDLE_TTL = float(os.getenv("CONVERSATION_IDLE_TTL", "300"))
+CONVERSATION_MAX = int(os.getenv("CONVERSATION_MAX", "1000"))
+PLAN_CONTEXT_TOKENS = int(os.getenv("PLAN_CONTEXT_TOKENS", "1500"))
+ANSWER_CONTEXT_TOKENS = int(os.getenv("ANSWER_CONTEXT_TOKENS", "1500"))
+
+# Planer: "plan" - plan i osobne zapytania o akcje, "tools" - jedno zapytanie z wywołaniami narzędzi
+PLANNER_MODE = os.getenv("PLANNER_MODE", "plan").lower()
+
+# Tokenizer
+TOKENIZER_WARMUP = os.getenv("TOKENIZER_WARMUP", "true").lower() == "true"
+
+# Metryki - serwer HTTP z metrykami w formacie Prometheusa startuje tylko, gdy podano port
+METRICS_PORT = int(os.getenv("METRICS_PORT")) if os.getenv("METRICS_PORT") else None
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+
+# Logowanie i śledzenie
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# Część wzmianek, dla których zapisywane są spany etapów (0-1)
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0.1"))
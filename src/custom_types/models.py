@@ -1,6 +1,6 @@
 from __future__ import annotations
 from abc import ABC, abstractmethod
-from dataclasses import asdict, dataclass
+from dataclasses import asdict, dataclass, field
 from enum import Enum
 from typing import Dict, List, Literal, Optional, TypeVar, Generic
 
@@ -14,24 +14,26 @@ class IService(ABC):
 # Option 2: Using dataclass
 @dataclass
 class DocMetadata:
-    #tokens: int
     type: Literal['audio', 'text', 'image', 'document']
-    #content_type: Literal['chunk', 'complete']
     #source: Optional[str] = None
     #mimeType: Optional[str] = None
     name: Optional[str] = None
     description: Optional[str] = None
-    #source_uuid: Optional[str] = None
-    #conversation_uuid: Optional[str] = None
     uuid: Optional[str] = None
     #duration: Optional[float] = None
-    #headers: Optional[Dict[str, List[str]]] = None
     urls: Optional[List[str]] = None
-    #images: Optional[List[str]] = None
     #screenshots: Optional[List[str]] = None
-    #chunk_index: Optional[int] = None
-    #total_chunks: Optional[int] = None
     #urls: Optional[List[str]] = None
+    # Pola wypełniane przy dzieleniu tekstu na fragmenty (TextService.split). Poza repr, bo dokumenty
+    # trafiają do promptów przez repr, a puste pola fragmentów dokładały tokeny do każdego zgłoszenia.
+    tokens: Optional[int] = field(default=None, repr=False)
+    content_type: Optional[Literal['chunk', 'complete']] = field(default=None, repr=False)
+    source_uuid: Optional[str] = field(default=None, repr=False)
+    conversation_uuid: Optional[str] = field(default=None, repr=False)
+    headers: Optional[Dict[str, List[str]]] = field(default=None, repr=False)
+    images: Optional[List[str]] = field(default=None, repr=False)
+    chunk_index: Optional[int] = field(default=None, repr=False)
+    total_chunks: Optional[int] = field(default=None, repr=False)
     def dict(self) -> dict:
         return asdict(self)
 
@@ -91,6 +93,4 @@ class Conversation:
             "content": content,
             "timestamp": timestamp
         })
-
-        print(self.messages)
         self.last_message_time = timestamp
\ No newline at end of file
@@ -0,0 +1,47 @@
+import hashlib
+import json
+from dataclasses import MISSING, fields
+from typing import get_args, get_type_hints
+
+
+def stable_hash(*values) -> str:
+    """Zwraca stabilny (niezależny od procesu i kolejności kluczy) skrót wartości serializowalnych do JSON"""
+    payload = json.dumps(values, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def dataclass_json_schema(cls, exclude: tuple[str, ...] = (), enums: dict[str, list] | None = None,
+                          descriptions: dict[str, str] | None = None) -> dict:
+    """
+    Buduje JSON Schema obiektu na podstawie pól dataclass
+
+    Args:
+        cls: Klasa dataclass (np. AddIssueParams)
+        exclude: Pola pomijane w schemacie
+        enums: Dozwolone wartości pól {nazwa_pola: [wartości]}
+        descriptions: Opisy pól {nazwa_pola: opis}
+    """
+    enums = enums or {}
+    descriptions = descriptions or {}
+    hints = get_type_hints(cls)
+    properties = {}
+    required = []
+    for field in fields(cls):
+        if field.name in exclude:
+            continue
+        field_type = hints[field.name]
+        optional = type(None) in get_args(field_type)
+        if optional:
+            field_type = next(arg for arg in get_args(field_type) if arg is not type(None))
+        schema = {"type": _JSON_TYPES.get(field_type, "string")}
+        if field.name in enums:
+            schema["enum"] = list(enums[field.name])
+        if field.name in descriptions:
+            schema["description"] = descriptions[field.name]
+        properties[field.name] = schema
+        if not optional and field.default is MISSING and field.default_factory is MISSING:
+            required.append(field.name)
+    return {"type": "object", "properties": properties, "required": required}
+
+
+_JSON_TYPES = {str: "string", bool: "boolean", int: "integer", float: "number"}
@@ -1,18 +1,38 @@
-from custom_types.models import Conversation
+from prompts.context import ConversationContext
+from prompts.template import RenderedPrompt, static_section
 
 
-def answer_prompt( username: str, actions, documents: str, conversation: Conversation):
-    return f"""
+def answer_prompt( username: str, actions, documents: str, context: ConversationContext) -> RenderedPrompt:
+    # Zmienne sekcje (użytkownik, historia, akcje, dokumenty) stoją na końcu, za stałym prefiksem
+    static = static_section("answer", _render_static)
+    dynamic = f"""
+    <user>
+    {username}
+    </user>
 
-    From now on, you're speaking with the user named {username} using the fewest words possible while maintaining clarity and completeness. 
+    <conversation_context>
+{context.text}
+    </conversation_context>
+
+    <actions>
+    {actions}
+    </actions>
+
+    <documents>
+    {documents}
+    </documents>
+    """
+    return RenderedPrompt("answer", static, dynamic)
+
+
+def _render_static():
+    return """
+
+    From now on, you're speaking with the user named in the <user> section using the fewest words possible while maintaining clarity and completeness. 
     You are a Jira Assistant AI focused on creating, updating, and listing Jira tasks. This is your primary responsibility.
 
     Your primary goal is to provide accurate, concise yet comprehensive responses about Jira tasks based on the information available to you.
 
-    <conversation_context>
-{"\n".join([f"{msg['user']}: {msg['content']}" for msg in conversation.messages]) if conversation.messages else "No previous conversation history."}
-    </conversation_context>
-
     <prompt_rules>
 - Rely on all the information you already possess about Jira tasks and their status
 - ANSWER truthfully, using information from <documents> and <actions> sections
@@ -23,16 +43,9 @@ def answer_prompt( username: str, actions, documents: str, conversation: Convers
 - INFORM user if requested information unavailable
 - USE fewest words possible while maintaining clarity/completeness
 - Be AWARE your role is interpreting/presenting Jira results, not performing actions
+- Use the <conversation_context> section for the recent conversation in this channel
     </prompt_rules>
 
-    <actions>
-    {actions}
-    </actions>
-
-    <documents>
-    {documents}
-    </documents>
-
     <prompt_examples>
 User: "Show my tasks"
 Assistant: Here are your assigned tasks:
@@ -45,4 +58,4 @@ User: "Create a new task for implementing login feature"
 Assistant: Created task SOET-510: Login Implementation
 🔗 https://pixeltrapps.atlassian.net/browse/SOET-510
     </prompt_examples>
-    """
\ No newline at end of file
+"""
@@ -0,0 +1,89 @@
+from dataclasses import dataclass
+from typing import Callable
+
+from custom_types.models import Conversation, Document
+
+
+@dataclass
+class ConversationContext:
+    text: str
+    tokens: int
+    included: int
+    dropped: int
+
+
+@dataclass
+class DocumentsContext:
+    text: str
+    tokens: int
+    included: int
+    dropped: int
+
+
+def conversation_context(conversation: Conversation, count_tokens: Callable[[str], int],
+                         max_tokens: int) -> ConversationContext:
+    """
+    Buduje sekcję historii konwersacji mieszczącą się w budżecie tokenów.
+
+    Wiadomości są dobierane od najnowszej; starsze, które nie mieszczą się w budżecie,
+    są pomijane, a ich liczba trafia do pola dropped.
+    """
+    if not conversation.messages:
+        return ConversationContext("No previous conversation history.", 0, 0, 0)
+
+    lines = []
+    tokens = 0
+    for msg in reversed(conversation.messages):
+        line = f"{msg['user']}: {msg['content']}"
+        # Liczbę tokenów wiadomości liczymy raz i zapamiętujemy w samej wiadomości
+        if "tokens" not in msg:
+            msg["tokens"] = count_tokens(line + "\n")
+        if tokens + msg["tokens"] > max_tokens:
+            break
+        tokens += msg["tokens"]
+        lines.append(line)
+
+    lines.reverse()
+    dropped = len(conversation.messages) - len(lines)
+    if dropped:
+        lines.insert(0, f"({dropped} earlier messages omitted)")
+    return ConversationContext("\n".join(lines), tokens, len(lines) - (1 if dropped else 0), dropped)
+
+
+def documents_context(documents: list[Document], count_tokens: Callable[[str], int],
+                      max_tokens: int | None) -> DocumentsContext:
+    """
+    Buduje sekcję dokumentów (wyników akcji JIRA) mieszczącą się w budżecie tokenów.
+
+    Dokumenty są dobierane w kolejności wyników; te, które nie mieszczą się w budżecie,
+    są pomijane, a sekcja kończy się informacją, ile ich pominięto.
+    Bez budżetu (None) sekcja ma postać listy dokumentów, jak przy jej bezpośredniej interpolacji.
+    """
+    reprs = [repr(doc) for doc in documents]
+    text = f"[{', '.join(reprs)}]"
+    tokens = count_tokens(text)
+    if max_tokens is None or tokens <= max_tokens:
+        return DocumentsContext(text, tokens, len(reprs), 0)
+
+    # Miejsce na informację o pominiętych dokumentach rezerwujemy z góry
+    budget = max_tokens - count_tokens(_omitted_note(len(documents)))
+    included = 0
+    used = 0
+    for doc_text in reprs:
+        used += count_tokens(doc_text + ", ")
+        if used > budget:
+            break
+        included += 1
+
+    # Suma tokenów osobnych dokumentów może różnić się od tokenów całej sekcji - sprawdzamy ją jednym zliczeniem
+    while True:
+        dropped = len(documents) - included
+        text = f"[{', '.join(reprs[:included])}]{_omitted_note(dropped)}"
+        tokens = count_tokens(text)
+        if tokens <= max_tokens or not included:
+            return DocumentsContext(text, tokens, included, dropped)
+        included -= 1
+
+
+def _omitted_note(dropped: int) -> str:
+    return f"\n({dropped} more documents omitted to fit the prompt size limit)"
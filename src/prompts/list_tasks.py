@@ -1,4 +1,11 @@
-def list_tasks_prompt(project_key, task_types, users, epics, statuses):
+from prompts.template import RenderedPrompt, static_prompt
+
+
+def list_tasks_prompt(project_key, task_types, users, epics, statuses) -> RenderedPrompt:
+    return static_prompt("list_tasks", _render_static, project_key, task_types, users, epics, statuses)
+
+
+def _render_static(project_key, task_types, users, epics, statuses):
     return f'''From now on, you will act as a JIRA Query Assistant specialized in searching tasks. Your primary function is to interpret user requests about finding tasks and generate a structured JSON object containing JQL queries. Here are your guidelines:
 
 <prompt_objective>
@@ -1,7 +1,23 @@
-from custom_types.models import Conversation
+from prompts.context import ConversationContext
+from prompts.template import RenderedPrompt, static_section
+
+
+def plan_prompt(project_key, epics, statuses, context: ConversationContext) -> RenderedPrompt:
+    # Historia konwersacji stoi na końcu, za stałym prefiksem
+    static = static_section(
+        "plan",
+        lambda: _render_static(project_key, epics, statuses),
+        project_key, epics, statuses
+    )
+    dynamic = f"""
+<conversation_context>
+{context.text}
+</conversation_context>
+"""
+    return RenderedPrompt("plan", static, dynamic)
 
 
-def plan_prompt(project_key, epics, statuses, conversation: Conversation):
+def _render_static(project_key, epics, statuses):
     return f"""
 From now on, you will function as a Jira Assistant on {project_key} project, operating through Discord, analyzing messages to perform Jira-specific operations. Your role is to interpret user messages and convert them into specific Jira operations: creating tasks, updating them, or listing existing Jira issues.
 
@@ -15,15 +31,11 @@ Analyze Discord messages and convert them into Jira-specific operations. Each me
   * General inquiries about tasks should not include assignee filters
 - Map general inquiries about work/features to Jira issue listing queries
 - Consider context from EPICS and STATUSES when interpreting Jira queries
-- Focus primarily on the latest message while being aware of the conversation context
+- Focus primarily on the latest message while being aware of the conversation context from the <conversation_context> section
 - Preserve any explicit assignment information from the message
 </prompt_rules>
 
 
-  <conversation_context>
-{"\n".join([f"{msg['user']}: {msg['content']}" for msg in conversation.messages]) if conversation.messages else "No previous conversation history."}
-  </conversation_context>
-
 <jira_context>
 EPICS user might talk about:
 {[{"name": name} for name in epics]}
@@ -96,6 +108,5 @@ Output:
   "update": null,
   "list": "Requester: marceli - List tasks assigned to marceli with status 'W toku'"
 }}
-
-User
+</examples>
 """
@@ -0,0 +1,129 @@
+from custom_types.models import AddIssueParams, UpdateIssueParams
+from custom_types.utils import dataclass_json_schema, stable_hash
+from prompts.context import ConversationContext
+from prompts.template import RenderedPrompt, static_section
+
+PRIORITIES = ["Low", "Medium", "High"]
+
+# Definicje narzędzi, klucz = skrót projektu i konfiguracji
+_tools: dict[str, list[dict]] = {}
+
+
+def planner_tools(project_key, task_types, users, epics) -> list[dict]:
+    """
+    Zwraca definicje narzędzi planera (create_issues, update_issues, search_jql)
+
+    Schematy zadań są wyprowadzane z AddIssueParams i UpdateIssueParams, a dozwolone
+    wartości pól z konfiguracji projektu. Wynik jest budowany raz na wersję konfiguracji.
+    """
+    key = stable_hash(project_key, task_types, users, epics)
+    tools = _tools.get(key)
+    if tools is None:
+        tools = _tools[key] = _build_tools(project_key, task_types, users, epics)
+    return tools
+
+
+def _build_tools(project_key, task_types, users, epics) -> list[dict]:
+    enums = {
+        "issuetype": list(task_types),
+        "priority": PRIORITIES,
+        "assignee": list(users.values()),
+        "reporter": list(users.values()),
+        "parent": list(epics),
+    }
+    descriptions = {
+        "task_id": f"Key of the issue to update, e.g. {project_key}-123",
+        "summary": "Title of the issue",
+        "assignee": "Display name of the assignee",
+        "reporter": "Display name of the requester",
+        "parent": "Key of the parent epic",
+        "add_to_sprint": "true for work that should start in the active sprint, false for backlog",
+    }
+    issue_schema = dataclass_json_schema(AddIssueParams, enums=enums, descriptions=descriptions)
+    update_schema = dataclass_json_schema(UpdateIssueParams, exclude=("project",),
+                                          enums=enums, descriptions=descriptions)
+    return [
+        _function_tool(
+            "create_issues",
+            f"Create one or more new issues in the {project_key} project",
+            {"issues": {"type": "array", "items": issue_schema}},
+        ),
+        _function_tool(
+            "update_issues",
+            f"Update existing issues in the {project_key} project; pass only fields that change",
+            {"updates": {"type": "array", "items": update_schema}},
+        ),
+        _function_tool(
+            "search_jql",
+            f"Find issues in the {project_key} project with a JQL query",
+            {"jql": {"type": "string", "description": f"JQL query, always scoped with project = {project_key}"}},
+        ),
+    ]
+
+
+def _function_tool(name: str, description: str, properties: dict) -> dict:
+    return {
+        "type": "function",
+        "function": {
+            "name": name,
+            "description": description,
+            "parameters": {"type": "object", "properties": properties, "required": list(properties)},
+        },
+    }
+
+
+def planner_tools_prompt(project_key, task_types, users, epics, statuses,
+                         context: ConversationContext) -> RenderedPrompt:
+    # Historia konwersacji stoi na końcu, za stałym prefiksem
+    static = static_section(
+        "planner_tools",
+        lambda: _render_static(project_key, task_types, users, epics, statuses),
+        project_key, task_types, users, epics, statuses
+    )
+    dynamic = f"""
+<conversation_context>
+{context.text}
+</conversation_context>
+"""
+    return RenderedPrompt("planner_tools", static, dynamic)
+
+
+def _render_static(project_key, task_types, users, epics, statuses):
+    return f"""
+From now on, you will function as a Jira Assistant on {project_key} project, operating through Discord. Messages come in the format "Username: message". Your role is to perform the Jira operations the latest message asks for by calling the available tools directly.
+
+<prompt_objective>
+Convert Discord messages into Jira tool calls: create_issues for new tasks, update_issues for changes to existing tasks and search_jql for listing or finding tasks. A single message may require several tools.
+</prompt_objective>
+
+<prompt_rules>
+- Always start your reply with one short sentence explaining what you are going to do and how you identified the requester and assignee
+- Call every tool the message requires; call none if the message does not ask for a Jira operation
+- Focus primarily on the latest message while being aware of the conversation context from the <conversation_context> section
+- The requester is the username before the colon; resolve "me", "my" and "I" to the requester
+- General inquiries about tasks should not include assignee filters
+- Preserve any explicit assignment information from the message
+- Use only issue types, users, epics and statuses from <available_configuration>
+- ALWAYS try to assign a parent epic to new tasks - only skip if the task clearly doesn't fit any epic; epics have no parent
+- Set priority when it can be inferred from the context (default to Medium)
+- Set add_to_sprint to true for work that should start now and false for backlog items
+- In update_issues pass only the fields that change
+- Every JQL query must include project = {project_key}; use sprint in openSprints() for the active sprint
+</prompt_rules>
+
+<available_configuration>
+Project Key: {project_key}
+
+Available Issue Types:
+{[{"name": key, "description": desc} for key, desc in task_types.items()]}
+
+Available Users:
+{[{"name": name} for name in users.values()]}
+
+Available Epics:
+{[{"key": key, "summary": name} for key, name in epics.items()]}
+
+Available Statuses:
+{[{"name": name} for name in statuses]}
+</available_configuration>
+"""
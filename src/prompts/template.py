@@ -0,0 +1,93 @@
+from dataclasses import dataclass
+from typing import Callable
+
+from custom_types.utils import stable_hash
+from services.text_service import TextService
+from services.tracing_service import get_logger
+
+logger = get_logger("prompts")
+
+# Minimalna długość wspólnego prefiksu (w tokenach), od której OpenAI cache'uje prompt
+PROMPT_CACHE_MIN_TOKENS = 1024
+
+# Wyrenderowane części statyczne, klucz = (nazwa promptu, skrót projektu i konfiguracji)
+_static_sections: dict[tuple[str, str], str] = {}
+_static_tokens: dict[str, int] = {}
+_reported: set[tuple[str, str]] = set()
+
+
+@dataclass(frozen=True)
+class RenderedPrompt:
+    """
+    Prompt podzielony na stałą część statyczną (prefiks) i zmienną część dynamiczną.
+
+    Część dynamiczna zawsze stoi na końcu, żeby prefiks był identyczny między
+    zapytaniami i mógł trafić w cache promptów po stronie dostawcy.
+    """
+    name: str
+    static: str
+    dynamic: str = ""
+
+    @property
+    def text(self) -> str:
+        return self.static + self.dynamic
+
+    def token_split(self, text_service: TextService) -> dict:
+        """Zwraca liczbę tokenów części statycznej i dynamicznej"""
+        static_tokens = _static_tokens.get(self.static)
+        if static_tokens is None:
+            static_tokens = _static_tokens[self.static] = text_service.count_tokens(self.static)
+        return {
+            "static_tokens": static_tokens,
+            "dynamic_tokens": text_service.count_tokens(self.dynamic) if self.dynamic else 0,
+            "cache_eligible": static_tokens >= PROMPT_CACHE_MIN_TOKENS,
+        }
+
+
+def static_section(name: str, render: Callable[[], str], *config) -> str:
+    """
+    Zwraca statyczną część promptu, renderując ją tylko raz na projekt i wersję konfiguracji
+
+    Args:
+        name: Nazwa promptu
+        render: Funkcja renderująca część statyczną
+        config: Wartości, od których zależy część statyczna (klucz projektu, słowniki konfiguracji)
+    """
+    key = (name, stable_hash(*config))
+    section = _static_sections.get(key)
+    if section is None:
+        section = _static_sections[key] = render()
+    return section
+
+
+def static_prompt(name: str, render: Callable[..., str], *config) -> RenderedPrompt:
+    """
+    Zwraca prompt bez części zmiennych - całość jest renderowana raz na projekt i wersję konfiguracji
+
+    Args:
+        name: Nazwa promptu
+        render: Funkcja renderująca prompt, wywoływana z wartościami config
+        config: Wartości, od których zależy prompt (klucz projektu, słowniki konfiguracji)
+    """
+    return RenderedPrompt(name, static_section(name, lambda: render(*config), *config))
+
+
+def report_token_split(prompt: RenderedPrompt, text_service: TextService) -> None:
+    """
+    Wypisuje podział tokenów promptu przy pierwszym użyciu danej wersji części statycznej
+
+    Diagnostyka nigdy nie przerywa zapytania: bez załadowanego kodowania jest pomijana
+    (i wypisana przy kolejnym użyciu promptu), a błąd liczenia jest tylko wypisywany.
+    """
+    key = (prompt.name, prompt.static)
+    if key in _reported or not text_service.tokenizer_ready:
+        return
+    try:
+        split = prompt.token_split(text_service)
+    except Exception as e:
+        logger.warning("Could not count tokens of prompt %s: %s", prompt.name, e)
+        return
+    _reported.add(key)
+    logger.info("Prompt %s: %d tokenów statycznych, %d dynamicznych, cache prefiksu: %s",
+                prompt.name, split['static_tokens'], split['dynamic_tokens'],
+                'tak' if split['cache_eligible'] else 'nie')
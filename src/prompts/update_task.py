@@ -1,4 +1,11 @@
-def update_task_prompt(project_key, task_types, users, epics):
+from prompts.template import RenderedPrompt, static_prompt
+
+
+def update_task_prompt(project_key, task_types, users, epics) -> RenderedPrompt:
+    return static_prompt("update_task", _render_static, project_key, task_types, users, epics)
+
+
+def _render_static(project_key, task_types, users, epics):
     return f'''From now on, you will act as a JIRA Task Assistant specialized in task updates. Your primary function is to interpret user requests about modifying existing tasks and generate a structured JSON object for our JIRA API. Here are your guidelines:
 
 <prompt_objective>
@@ -0,0 +1,195 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Any, AsyncIterator, Callable
+
+from config.bot_config import JIRA_CALL_TIMEOUT, JIRA_MAX_RESULTS, JIRA_MAX_WORKERS, JIRA_PAGE_SIZE
+from custom_types.models import AddIssueParams, Document, UpdateIssueParams
+from services.jira_service import JiraService
+from services.metrics_service import metrics
+from services.tracing_service import span
+
+CALLS = metrics.counter("jira_calls_total", "Wywołania JiraService", ("method", "outcome"))
+CALL_LATENCY = metrics.histogram(
+    "jira_call_duration_seconds", "Czas wywołania JiraService, razem z czekaniem w kolejce puli", ("method",)
+)
+
+
+@dataclass
+class ExecutorStats:
+    max_workers: int
+    queued: int = 0
+    running: int = 0
+    completed: int = 0
+    failed: int = 0
+    timed_out: int = 0
+    max_queued: int = 0
+
+    def dict(self) -> dict:
+        return asdict(self)
+
+
+class AsyncJiraService:
+    """
+    Asynchroniczna fasada nad JiraService.
+
+    Każde wywołanie klienta JIRA trafia do dedykowanej puli wątków o ograniczonym
+    rozmiarze, więc wolne zapytania do Jiry nie blokują pętli zdarzeń Discorda.
+    """
+    def __init__(self, jira_service: JiraService,
+                 max_workers: int = JIRA_MAX_WORKERS,
+                 timeout: float | None = JIRA_CALL_TIMEOUT):
+        self.jira_service = jira_service
+        self.project_key = jira_service.project_key
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix=f"jira-{self.project_key}"
+        )
+        self._stats = ExecutorStats(max_workers=max_workers)
+        self._stats_lock = threading.Lock()
+
+    async def run(self, func: Callable, *args, timeout: float | None = None, **kwargs) -> Any:
+        """
+        Wykonuje synchroniczną funkcję w puli wątków Jiry
+
+        Args:
+            func: Funkcja do wykonania
+            timeout: Limit czasu w sekundach (None = domyślny limit serwisu)
+
+        Raises:
+            TimeoutError: Gdy wywołanie nie zakończy się w limicie czasu.
+                Wątek roboczy kończy wtedy zapytanie w tle, ale wynik jest porzucany.
+        """
+        with self._stats_lock:
+            self._stats.queued += 1
+            self._stats.max_queued = max(self._stats.max_queued, self._stats.queued)
+
+        method = getattr(func, '__name__', str(func))
+        outcome = "error"
+        started = time.perf_counter()
+        with span("jira", method=method):
+            future = self._executor.submit(self._call, func, args, kwargs)
+            future.add_done_callback(self._on_done)
+            try:
+                result = await asyncio.wait_for(asyncio.wrap_future(future), self.timeout if timeout is None else timeout)
+                outcome = "ok"
+                return result
+            except asyncio.TimeoutError:
+                outcome = "timeout"
+                with self._stats_lock:
+                    self._stats.timed_out += 1
+                raise TimeoutError(f"Jira call {method} timed out") from None
+            finally:
+                CALLS.labels(method, outcome).inc()
+                CALL_LATENCY.labels(method).observe(time.perf_counter() - started)
+
+    def _call(self, func: Callable, args: tuple, kwargs: dict) -> Any:
+        with self._stats_lock:
+            self._stats.queued -= 1
+            self._stats.running += 1
+        try:
+            return func(*args, **kwargs)
+        finally:
+            with self._stats_lock:
+                self._stats.running -= 1
+
+    def _on_done(self, future: Future) -> None:
+        with self._stats_lock:
+            if future.cancelled():
+                # Zadanie anulowane zanim wątek je podjął - wciąż liczyło się do kolejki
+                self._stats.queued -= 1
+            elif future.exception() is not None:
+                self._stats.failed += 1
+            else:
+                self._stats.completed += 1
+
+    def stats(self) -> dict:
+        """Zwraca migawkę metryk puli (głębokość kolejki, zadania w toku, błędy, timeouty)"""
+        with self._stats_lock:
+            return self._stats.dict()
+
+    def shutdown(self, wait: bool = False) -> None:
+        """Zamyka pulę wątków"""
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+    def create_error_document(self, summary: str, error) -> Document:
+        return self.jira_service.create_error_document(summary, error)
+
+    async def list_issues(self, query_jql: str,
+                          page_size: int = JIRA_PAGE_SIZE,
+                          max_results: int = JIRA_MAX_RESULTS,
+                          timeout: float | None = None) -> list[Document]:
+        return [doc async for doc in self.stream_issues(query_jql, page_size, max_results, timeout)]
+
+    async def stream_issues(self, query_jql: str,
+                            page_size: int = JIRA_PAGE_SIZE,
+                            max_results: int = JIRA_MAX_RESULTS,
+                            timeout: float | None = None) -> AsyncIterator[Document]:
+        """
+        Strumieniuje dokumenty zgłoszeń pasujących do JQL, strona po stronie
+        
+        Kolejna strona jest pobierana w tle, zanim wywołujący przetworzy bieżącą.
+        
+        Args:
+            query_jql: Zapytanie JQL
+            page_size: Liczba zgłoszeń pobieranych w jednym zapytaniu
+            max_results: Łączny limit zwróconych zgłoszeń
+            timeout: Limit czasu pojedynczej strony w sekundach
+        """
+        def fetch(cursor, returned):
+            return asyncio.ensure_future(self.run(
+                self.jira_service.search_page,
+                query_jql,
+                cursor,
+                min(page_size, max_results - returned),
+                timeout=timeout
+            ))
+
+        returned = 0
+        pending = fetch(None, 0)
+        try:
+            while pending is not None:
+                docs, cursor = await pending
+                pending = None
+                returned += len(docs)
+                if cursor is not None and docs and returned < max_results:
+                    pending = fetch(cursor, returned)
+                for doc in docs:
+                    yield doc
+        finally:
+            if pending is not None:
+                pending.cancel()
+
+    async def create_issue(self, params: AddIssueParams, timeout: float | None = None) -> Document:
+        return await self.run(self.jira_service.create_issue, params, timeout=timeout)
+
+    async def create_issues(self, params_list: list[AddIssueParams], timeout: float | None = None) -> list[Document]:
+        return await self.run(self.jira_service.create_issues, params_list, timeout=timeout)
+
+    async def update_issue(self, params: UpdateIssueParams, timeout: float | None = None) -> Document:
+        return await self.run(self.jira_service.update_issue, params, timeout=timeout)
+
+    async def delete_issue(self, issue_key: str, timeout: float | None = None) -> bool:
+        return await self.run(self.jira_service.delete_issue, issue_key, timeout=timeout)
+
+    async def boards(self, timeout: float | None = None) -> list:
+        return await self.run(
+            self.jira_service.jira.boards,
+            projectKeyOrID=self.project_key,
+            timeout=timeout
+        )
+
+    async def sprints(self, board_id: int, state: str | None = None, timeout: float | None = None) -> list:
+        return await self.run(self.jira_service.jira.sprints, board_id, state=state, timeout=timeout)
+
+    async def list_users(self, timeout: float | None = None) -> dict:
+        return await self.run(self.jira_service.list_users, timeout=timeout)
+
+    async def list_epics(self, max_results: int = 50, timeout: float | None = None) -> dict:
+        return await self.run(self.jira_service.list_epics, max_results, timeout=timeout)
+
+    async def list_statuses(self, timeout: float | None = None) -> list:
+        return await self.run(self.jira_service.list_statuses, timeout=timeout)
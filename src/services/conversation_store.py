@@ -0,0 +1,67 @@
+import time
+from collections import OrderedDict
+
+from config.bot_config import CONVERSATION_IDLE_TTL, CONVERSATION_MAX
+from custom_types.models import Conversation
+
+
+class ConversationStore:
+    """
+    Magazyn aktywnych konwersacji indeksowany po (server_id, channel_id).
+
+    Konwersacja nieużywana dłużej niż idle_ttl sekund wygasa, a po przekroczeniu
+    max_conversations usuwana jest najdawniej używana (LRU).
+    """
+    def __init__(self, idle_ttl: float = CONVERSATION_IDLE_TTL, max_conversations: int = CONVERSATION_MAX):
+        self.idle_ttl = idle_ttl
+        self.max_conversations = max_conversations
+        # Kolejność wpisów = kolejność użycia, od najdawniej używanego
+        self._conversations: OrderedDict[tuple[int, int], tuple[float, Conversation]] = OrderedDict()
+        self.created = 0
+        self.expired = 0
+        self.evicted = 0
+
+    def get(self, server_id: int, channel_id: int) -> Conversation:
+        """Zwraca aktywną konwersację dla kanału albo tworzy nową"""
+        now = time.monotonic()
+        self._expire(now)
+
+        key = (server_id, channel_id)
+        entry = self._conversations.get(key)
+        if entry is not None:
+            conversation = entry[1]
+            self._conversations[key] = (now, conversation)
+            self._conversations.move_to_end(key)
+            return conversation
+
+        conversation = Conversation(server_id, channel_id)
+        self._conversations[key] = (now, conversation)
+        self.created += 1
+        while len(self._conversations) > self.max_conversations:
+            self._conversations.popitem(last=False)
+            self.evicted += 1
+        return conversation
+
+    def _expire(self, now: float) -> None:
+        # Najdawniej używane wpisy są na początku, więc wystarczy zdejmować je z przodu
+        while self._conversations:
+            last_used, _ = next(iter(self._conversations.values()))
+            if now - last_used < self.idle_ttl:
+                break
+            self._conversations.popitem(last=False)
+            self.expired += 1
+
+    def __len__(self) -> int:
+        """Liczba aktywnych konwersacji - wygasłe są usuwane przed policzeniem"""
+        self._expire(time.monotonic())
+        return len(self._conversations)
+
+    def stats(self) -> dict:
+        """Zwraca liczniki konwersacji: aktywnych, utworzonych, wygasłych i usuniętych przez limit"""
+        self._expire(time.monotonic())
+        return {
+            "live": len(self._conversations),
+            "created": self.created,
+            "expired": self.expired,
+            "evicted": self.evicted,
+        }
@@ -1,9 +1,26 @@
 from __future__ import annotations
-from typing import Protocol, Set
+import asyncio
+import inspect
+import time
+from contextlib import aclosing, asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable, Protocol, Set
 from discord import Message, Intents
 from discord.ext import commands
 import os
 import dotenv
+from config.bot_config import DISCORD_EDIT_INTERVAL, MENTION_OBSERVER_TIMEOUT, MESSAGE_OBSERVER_TIMEOUT
+from services.mention_dispatcher import MentionDispatcher
+from services.metrics_service import metrics
+from services.tracing_service import get_logger, span
+
+# Maksymalna długość wiadomości na Discordzie
+MESSAGE_LIMIT = 2000
+logger = get_logger("discord")
+OBSERVER_LATENCY = metrics.histogram(
+    "discord_observer_duration_seconds", "Czas obsługi zdarzenia przez obserwatora", ("event", "observer")
+)
+BUSY_MESSAGE = "Mam teraz zbyt wiele zapytań na tym kanale, spróbuj ponownie za chwilę."
+STREAM_ERROR_MESSAGE = "Nie udało się dokończyć odpowiedzi. Spróbuj ponownie za chwilę."
 
 class MessageObserver(Protocol):
     async def on_message(self, subject: DiscordService, message: Message) -> None: ...
@@ -18,10 +35,23 @@ class DiscordService:
         self.token = os.getenv("DISCORD_TOKEN")
         self._message_observers: Set[MessageObserver] = set()
         self._mention_observers: Set[MentionObserver] = set()
+        # Ostatnia zakolejkowana wysyłka na kanale, klucz = ID kanału
+        self._channel_tails: dict[int, asyncio.Task] = {}
+        # Obsługa wzmianek trafia do kolejek kanałów zamiast blokować handler gatewaya
+        self.mention_dispatcher = MentionDispatcher(self._notify_mention_observers)
+        # Referencje do zadań obserwatorów wiadomości, żeby nie zostały usunięte przed zakończeniem
+        self._observer_tasks: Set[asyncio.Task] = set()
+        # Korutyny uruchamiane w pętli zdarzeń bota przed połączeniem z gatewayem
+        self._startup_hooks: list[Callable[[], Awaitable[None]]] = []
+        self.bot.setup_hook = self._run_startup_hooks
+        # Korutyny uruchamiane po rozłączeniu bota, zanim zamknie się jego pętla zdarzeń
+        self._shutdown_hooks: list[Callable[[], Awaitable[None]]] = []
+        self._close_bot = self.bot.close
+        self.bot.close = self._close
 
         @self.bot.event
         async def on_ready():
-            print(f'Bot zalogowany jako {self.bot.user}')
+            logger.info("Bot zalogowany jako %s", self.bot.user)
             
         @self.bot.event
         async def on_message(message):
@@ -35,10 +65,32 @@ class DiscordService:
             if self.bot.user in message.mentions:
                 cleaned_content = message.content.lower()
                 cleaned_content = cleaned_content.replace(f'<@{self.bot.user.id}>', '').strip()
-                await self._notify_mention_observers(message, cleaned_content)
+                self.dispatch_mention(message, cleaned_content)
 
             await self.bot.process_commands(message)
 
+    def add_startup_hook(self, hook: Callable[[], Awaitable[None]]) -> None:
+        """Dodaje korutynę wykonywaną przy starcie bota, w jego pętli zdarzeń"""
+        self._startup_hooks.append(hook)
+
+    async def _run_startup_hooks(self) -> None:
+        for hook in self._startup_hooks:
+            await hook()
+
+    def add_shutdown_hook(self, hook: Callable[[], Awaitable[None]]) -> None:
+        """Dodaje korutynę wykonywaną przy zamykaniu bota, po rozłączeniu z gatewayem"""
+        self._shutdown_hooks.append(hook)
+
+    async def _close(self) -> None:
+        await self._close_bot()
+        # Hooki uruchamiamy raz, choć discord.py może wywołać close kilka razy
+        hooks, self._shutdown_hooks = self._shutdown_hooks, []
+        for hook in hooks:
+            try:
+                await hook()
+            except Exception as e:
+                logger.warning("Shutdown hook %s failed: %s", getattr(hook, "__name__", hook), e)
+
     def attach_message_observer(self, observer: MessageObserver) -> None:
         """Dodaje obserwatora wiadomości"""
         self._message_observers.add(observer)
@@ -56,18 +108,75 @@ class DiscordService:
         self._mention_observers.discard(observer)
 
     async def _notify_message_observers(self, message: Message) -> None:
-        """Powiadamia wszystkich obserwatorów o nowej wiadomości"""
+        """
+        Powiadamia wszystkich obserwatorów o nowej wiadomości
+
+        Obserwatorzy działają w tle, więc handler gatewaya nie czeka na żadnego z nich.
+        """
         for observer in self._message_observers:
-            await observer.on_message(self, message)
+            task = asyncio.create_task(self._run_observer(
+                "message", observer, observer.on_message(self, message), MESSAGE_OBSERVER_TIMEOUT
+            ))
+            self._observer_tasks.add(task)
+            task.add_done_callback(self._observer_tasks.discard)
+
+    def dispatch_mention(self, message: Message, cleaned_content: str) -> None:
+        """
+        Kolejkuje obsługę wzmianki, a przy pełnej kolejce kanału odpowiada, że bot jest zajęty
+
+        Wywoływana przez handler gatewaya; benchmarki podają tu wzmianki bez połączenia z Discordem.
+        """
+        guild_id = message.guild.id if message.guild else 0
+        if not self.mention_dispatcher.submit(guild_id, message.channel.id, message, cleaned_content):
+            logger.warning("Mention queue full on channel %s, rejecting mention", message.channel.id)
+            self.queue_message(message.channel.id, BUSY_MESSAGE, reply_to_message=message)
+
+    async def drain(self) -> None:
+        """Czeka, aż zakolejkowane wzmianki zostaną obsłużone, a wiadomości wysyłane w tle trafią na kanały"""
+        await self.mention_dispatcher.join()
+        while self._channel_tails:
+            await asyncio.wait(list(self._channel_tails.values()))
+
+    async def _notify_mention_observers(self, message: Message, cleaned_content: str) -> bool:
+        """
+        Powiadamia wszystkich obserwatorów o wzmiance, równolegle
+
+        Returns:
+            bool: False, jeśli którykolwiek obserwator zgłosił błąd lub przekroczył czas
+        """
+        results = await asyncio.gather(*(
+            self._run_observer(
+                "mention", observer, observer.on_mention(self, message, cleaned_content), MENTION_OBSERVER_TIMEOUT
+            )
+            for observer in self._mention_observers
+        ))
+        return all(results)
 
-    async def _notify_mention_observers(self, message: Message, cleaned_content: str) -> None:
-        """Powiadamia wszystkich obserwatorów o wzmiance"""
-        for observer in self._mention_observers:
-            await observer.on_mention(self, message, cleaned_content)
+    async def _run_observer(self, kind: str, observer: object, call: Awaitable[None], timeout: float) -> bool:
+        """
+        Wykonuje wywołanie obserwatora z limitem czasu, mierząc jego czas trwania
+
+        Błąd lub przekroczenie czasu jednego obserwatora jest wypisywane i nie wpływa na pozostałych.
+
+        Returns:
+            bool: True, jeśli obserwator zakończył się bez błędu
+        """
+        name = type(observer).__name__
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(call, timeout)
+            return True
+        except asyncio.TimeoutError:
+            logger.warning("Observer %s timed out on %s after %ss", name, kind, timeout)
+        except Exception as e:
+            logger.warning("Observer %s failed on %s: %s", name, kind, e)
+        finally:
+            OBSERVER_LATENCY.labels(kind, name).observe(time.perf_counter() - start)
+        return False
 
     async def send_message(self, channel_id: int, content: str, 
                           reply_to_message: Message | None = None, 
-                          mention_users: list | None = None) -> None:
+                          mention_users: list | None = None) -> Message | None:
         """
         Wysyła wiadomość na określony kanał z dodatkowymi opcjami
         
@@ -76,26 +185,193 @@ class DiscordService:
             content: Treść wiadomości
             reply_to_message: Obiekt discord.Message na który chcemy odpowiedzieć
             mention_users: Lista obiektów discord.User lub ID użytkowników do oznaczenia
+        
+        Returns:
+            Message | None: Wysłana wiadomość lub None, jeśli kanał nie istnieje
+        """
+        # Wiadomości zakolejkowane wcześniej na tym kanale idą pierwsze
+        tail = self._channel_tails.get(channel_id)
+        if tail is not None and tail is not asyncio.current_task():
+            await asyncio.wait([tail])
+        return await self._send(channel_id, content, reply_to_message, mention_users)
+
+    def queue_message(self, channel_id: int, content: str,
+                      reply_to_message: Message | Awaitable[Message] | None = None,
+                      mention_users: list | None = None) -> asyncio.Task:
+        """
+        Wysyła wiadomość w tle, zachowując kolejność wiadomości na kanale
+
+        Wywołujący nie czeka na Discorda. Kolejne queue_message i send_message na tym
+        samym kanale zostaną wysłane dopiero po tej wiadomości. Błąd wysyłki jest
+        wypisywany i nie blokuje następnych wiadomości.
+
+        Args:
+            channel_id: ID kanału Discord
+            content: Treść wiadomości
+            reply_to_message: Wiadomość (lub zadanie, które ją zwróci), na którą odpowiadamy
+            mention_users: Lista użytkowników do oznaczenia
+
+        Returns:
+            asyncio.Task: Zadanie zwracające wysłaną wiadomość lub None
+        """
+        previous = self._channel_tails.get(channel_id)
+        task = asyncio.create_task(
+            self._send_after(previous, channel_id, content, reply_to_message, mention_users)
+        )
+        self._channel_tails[channel_id] = task
+
+        def release(done: asyncio.Task) -> None:
+            if self._channel_tails.get(channel_id) is done:
+                del self._channel_tails[channel_id]
+
+        task.add_done_callback(release)
+        return task
+
+    async def _send_after(self, previous: asyncio.Task | None, channel_id: int, content: str,
+                          reply_to_message: Message | Awaitable[Message] | None,
+                          mention_users: list | None) -> Message | None:
+        if previous is not None:
+            await asyncio.wait([previous])
+        try:
+            if inspect.isawaitable(reply_to_message):
+                reply_to_message = await reply_to_message
+            return await self._send(channel_id, content, reply_to_message, mention_users)
+        except Exception as e:
+            logger.warning("Could not send message to channel %s: %s", channel_id, e)
+            return None
+
+    @asynccontextmanager
+    async def typing(self, channel_id: int):
+        """
+        Pokazuje wskaźnik pisania na kanale przez czas trwania bloku
+
+        Wskaźnik jest wysyłany w tle, więc wejście do bloku nie czeka na Discorda.
         """
         channel = self.bot.get_channel(channel_id)
+        task = asyncio.create_task(self._keep_typing(channel)) if channel else None
+        try:
+            yield
+        finally:
+            if task is not None:
+                task.cancel()
+
+    @staticmethod
+    async def _keep_typing(channel) -> None:
+        try:
+            async with channel.typing():
+                await asyncio.Future()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning("Could not show typing indicator: %s", e)
+
+    async def _send(self, channel_id: int, content: str,
+                    reply_to_message: Message | None = None,
+                    mention_users: list | None = None) -> Message | None:
+        channel = self.bot.get_channel(channel_id)
         if not channel:
-            return
+            return None
         
         # Dodaj wzmianki użytkowników do treści
         if mention_users:
-            mentions = []
-            for user in mention_users:
-                if isinstance(user, int):
-                    mentions.append(f"<@{user}>")
-                else:
-                    mentions.append(user.mention)
-            content = f"{' '.join(mentions)} {content}"
+            content = f"{self._format_mentions(mention_users)} {content}"
         
         # Wyślij wiadomość
-        if reply_to_message:
-            await reply_to_message.reply(content)
-        else:
-            await channel.send(content)
+        with span("discord.send", channel=channel_id, reply=reply_to_message is not None):
+            if reply_to_message:
+                return await reply_to_message.reply(content)
+            return await channel.send(content)
+
+    async def stream_message(self, channel_id: int, chunks: AsyncIterator[str],
+                             mention_users: list | None = None,
+                             placeholder: str = "*...*",
+                             edit_interval: float = DISCORD_EDIT_INTERVAL,
+                             error_reply: Callable[[Exception], str] | None = None) -> str:
+        """
+        Wysyła wiadomość-zaślepkę i edytuje ją w miarę napływania kolejnych fragmentów tekstu
+        
+        Edycje są dławione do jednej na edit_interval sekund, żeby nie przekroczyć
+        limitów Discorda. Tekst dłuższy niż limit wiadomości trafia do kolejnych wiadomości.
+        Gdy strumień lub Discord zgłosi błąd, bieżąca wiadomość dostaje treść błędu zamiast
+        zostać z zaślepką, strumień jest zamykany od razu, a wyjątek przekazywany dalej.
+        
+        Args:
+            channel_id: ID kanału Discord
+            chunks: Asynchroniczny strumień fragmentów tekstu
+            mention_users: Lista użytkowników do oznaczenia w pierwszej wiadomości
+            placeholder: Treść wyświetlana do czasu nadejścia pierwszego fragmentu
+            edit_interval: Minimalny odstęp między edycjami w sekundach
+            error_reply: Zwraca treść pokazywaną po błędzie (domyślnie STREAM_ERROR_MESSAGE)
+        
+        Returns:
+            str: Pełny otrzymany tekst
+        """
+        # aclosing zamyka strumień (i zwalnia jego zasoby) od razu, także gdy przerwie go błąd Discorda
+        async with aclosing(chunks):
+            with span("discord.stream", channel=channel_id) as stream_span:
+                prefix = f"{self._format_mentions(mention_users)} " if mention_users else ""
+                message = await self.send_message(channel_id, placeholder, mention_users=mention_users)
+
+                text = ""
+                offset = 0  # początek tekstu bieżącej wiadomości
+                shown = None
+                last_edit = time.monotonic()
+                messages = 1
+
+                try:
+                    async for chunk in chunks:
+                        text += chunk
+                        if message is None:
+                            continue
+
+                        # Tekst nie mieści się w bieżącej wiadomości - domykamy ją i zaczynamy następną
+                        while len(prefix) + len(text) - offset > MESSAGE_LIMIT:
+                            room = MESSAGE_LIMIT - len(prefix)
+                            if text[offset:offset + room] != shown:
+                                await message.edit(content=prefix + text[offset:offset + room])
+                            offset += room
+                            prefix = ""
+                            message = await message.channel.send(text[offset:offset + MESSAGE_LIMIT])
+                            messages += 1
+                            shown = text[offset:offset + MESSAGE_LIMIT]
+                            last_edit = time.monotonic()
+
+                        if time.monotonic() - last_edit >= edit_interval and text[offset:] != shown:
+                            shown = text[offset:]
+                            await message.edit(content=prefix + shown)
+                            last_edit = time.monotonic()
+
+                    # Końcowa edycja z pełną treścią
+                    if message is not None and text[offset:] and text[offset:] != shown:
+                        await message.edit(content=prefix + text[offset:])
+                except Exception as e:
+                    logger.warning("Streaming to channel %s failed: %s", channel_id, e)
+                    if message is not None:
+                        await self._show_stream_error(message, prefix, shown or "",
+                                                      error_reply(e) if error_reply else STREAM_ERROR_MESSAGE)
+                    raise
+                stream_span.set(chars=len(text), messages=messages)
+                return text
+
+    @staticmethod
+    async def _show_stream_error(message: Message, prefix: str, shown: str, error: str) -> None:
+        """Zastępuje zaślepkę treścią błędu, a pokazany już fragment odpowiedzi uzupełnia o nią"""
+        error = f"*{error}*"
+        body = f"{shown[:MESSAGE_LIMIT - len(prefix) - len(error) - 2]}\n\n" if shown else ""
+        try:
+            await message.edit(content=prefix + body + error)
+        except Exception as e:
+            logger.warning("Could not show streaming error on channel %s: %s", message.channel.id, e)
+
+    @staticmethod
+    def _format_mentions(mention_users: list) -> str:
+        mentions = []
+        for user in mention_users:
+            if isinstance(user, int):
+                mentions.append(f"<@{user}>")
+            else:
+                mentions.append(user.mention)
+        return ' '.join(mentions)
 
     def run(self):
         """Uruchamia bota Discord"""
@@ -1,19 +1,42 @@
 import json
 import os
-from jira import JIRA, Issue
+import re
+import threading
+from typing import Any, Iterator
+from jira import JIRA, Issue, JIRAError
+from requests import RequestException
 from dotenv import load_dotenv
+from config.bot_config import (
+    JIRA_MAX_RESULTS, JIRA_METADATA_TTL, JIRA_PAGE_SIZE, JIRA_SEARCH_CACHE_SIZE, JIRA_SEARCH_CACHE_TTL
+)
 from config.jira_config import USERS
+from services.cache_service import TTLCache
 from services.document_service import DocumentService
 from custom_types.models import Document, UpdateIssueParams, AddIssueParams
+from services.tracing_service import get_logger
+
+logger = get_logger("jira")
+
+# Pola zgłoszenia potrzebne do zbudowania dokumentu (create_document)
+ISSUE_FIELDS = ["summary", "description", "status", "created", "updated", "assignee", "issuetype", "priority"]
+# Maksymalna liczba zgłoszeń w jednym zapytaniu bulk-create
+BULK_CREATE_LIMIT = 50
+
+
+def normalize_jql(query_jql: str) -> str:
+    """Normalizuje JQL na potrzeby klucza cache (zbędne białe znaki)"""
+    return re.sub(r'\s+', ' ', query_jql).strip()
 
 
 class JiraService():
-    def __init__(self, project_key: str):
+    def __init__(self, project_key: str, metadata_ttl: float = JIRA_METADATA_TTL, jira: JIRA | None = None):
         """
         Inicjalizuje serwis Jira dla konkretnego projektu
         
         Args:
             project_key: Klucz projektu (np. 'SOE', 'PMM', etc.)
+            metadata_ttl: Czas życia (w sekundach) zapamiętanego ID tablicy i aktywnego sprintu
+            jira: Gotowy klient JIRA (np. w benchmarkach); domyślnie tworzony z danych z .env
         """
                
         load_dotenv()
@@ -22,22 +45,97 @@ class JiraService():
         self.jira_username = os.getenv("JIRA_USERNAME")
         self.jira_api_token = os.getenv("JIRA_API_TOKEN")
         self.document_service = DocumentService()
-        self.jira = JIRA(
+        self.jira = jira or JIRA(
             server=self.jira_url,
             basic_auth=(self.jira_username, self.jira_api_token)
         )
         
         self.project_key = project_key
+        # Metadane projektu pobieramy raz i trzymamy w pamięci przez cały czas życia serwisu
         self.project = self.jira.project(project_key)
+        self.issue_type_ids = {issue_type.name: issue_type.id for issue_type in self.project.issueTypes}
+        self.metadata_cache = TTLCache(maxsize=8, ttl=metadata_ttl)
+        # Wyniki wyszukiwań JQL; czyszczone po każdej udanej zmianie zgłoszeń w projekcie
+        self.search_cache = TTLCache(maxsize=JIRA_SEARCH_CACHE_SIZE, ttl=JIRA_SEARCH_CACHE_TTL)
+        self._search_generation = 0
+        self._search_lock = threading.Lock()
+        
+    def list_issues(self, query_jql: str, page_size: int = JIRA_PAGE_SIZE,
+                    max_results: int = JIRA_MAX_RESULTS) -> list[Document]:
+        return list(self.iter_issues(query_jql, page_size, max_results))
+
+    def iter_issues(self, query_jql: str, page_size: int = JIRA_PAGE_SIZE,
+                    max_results: int = JIRA_MAX_RESULTS) -> Iterator[Document]:
+        """
+        Zwraca dokumenty zgłoszeń pasujących do JQL, pobierając je stronami
         
-    def list_issues(self, query_jql: str):
-        issues = self.jira.search_issues(query_jql)
+        Args:
+            query_jql: Zapytanie JQL
+            page_size: Liczba zgłoszeń pobieranych w jednym zapytaniu
+            max_results: Łączny limit zwróconych zgłoszeń
+        """
+        cursor = None
+        returned = 0
+        while returned < max_results:
+            docs, cursor = self.search_page(query_jql, cursor, min(page_size, max_results - returned))
+            yield from docs
+            returned += len(docs)
+            if cursor is None or not docs:
+                break
 
-        docs = []
-        for issue in issues:
-            docs.append(self.create_document(issue))
+    def search_page(self, query_jql: str, cursor=None, page_size: int = JIRA_PAGE_SIZE) -> tuple[list[Document], Any]:
+        """
+        Pobiera jedną stronę wyników JQL, tylko z polami potrzebnymi do dokumentu
+        
+        Args:
+            query_jql: Zapytanie JQL
+            cursor: Pozycja strony zwrócona przez poprzednie wywołanie (None = pierwsza strona)
+            page_size: Liczba zgłoszeń na stronie
+        
+        Returns:
+            tuple: (dokumenty ze strony, kursor następnej strony lub None, jeśli to ostatnia)
+        """
+        fields = list(ISSUE_FIELDS)
+        cache_key = (normalize_jql(query_jql), tuple(fields), cursor, page_size)
+        cached = self.search_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        generation = self._search_generation
 
-        return docs
+        if self._is_cloud():
+            # Jira Cloud stronicuje wyszukiwanie tokenem nextPageToken
+            page = self.jira.enhanced_search_issues(
+                query_jql,
+                nextPageToken=cursor,
+                maxResults=page_size,
+                fields=fields
+            )
+            next_cursor = page.nextPageToken
+        else:
+            start = cursor or 0
+            page = self.jira.search_issues(
+                query_jql,
+                startAt=start,
+                maxResults=page_size,
+                fields=fields
+            )
+            next_cursor = start + len(page) if page and start + len(page) < page.total else None
+
+        result = [self.create_document(issue) for issue in page], next_cursor
+        with self._search_lock:
+            # Nie zapisujemy wyniku, jeśli w trakcie wyszukiwania zgłoszenia zostały zmienione
+            if generation == self._search_generation:
+                self.search_cache.set(cache_key, result)
+        return result
+
+    def invalidate_search_cache(self) -> None:
+        """Czyści zapamiętane wyniki wyszukiwań projektu (po utworzeniu, zmianie lub usunięciu zgłoszenia)"""
+        with self._search_lock:
+            self._search_generation += 1
+            self.search_cache.clear()
+
+    def _is_cloud(self) -> bool:
+        return getattr(self.jira, '_is_cloud', False) and hasattr(self.jira, 'enhanced_search_issues')
 
     def update_issue(self, params: UpdateIssueParams):
         """
@@ -85,44 +183,138 @@ class JiraService():
             if account_id:
                 update_dict['assignee'] = {'accountId': account_id}
             else:
-                print(f"\033[91mWarning: Could not find account ID for user {params.assignee}\033[0m")
+                logger.warning("Could not find account ID for user %s", params.assignee)
             
         if params.parent:
             update_dict['parent'] = {'key': params.parent}
         
         if update_dict:
             issue.update(fields=update_dict)
+            self.invalidate_search_cache()
         
         # Handle sprint changes
         if params.add_to_sprint is not None:
-            boards = self.jira.boards(projectKeyOrID=self.project_key)
-            if boards:
-                board_id = boards[0].id
-                if params.add_to_sprint:
-                    # Add to active sprint
-                    active_sprints = self.jira.sprints(board_id, state='active')
-                    if active_sprints:
-                        sprint_id = active_sprints[0].id
-                        self.jira.add_issues_to_sprint(sprint_id, [params.task_id])
-                        print(f"Przeniesiono zgłoszenie {params.task_id} do aktywnego sprintu")
-                    else:
-                        print("Nie znaleziono aktywnego sprintu")
+            if params.add_to_sprint:
+                # Add to active sprint
+                if self.add_to_active_sprint([params.task_id]) is not None:
+                    logger.info("Przeniesiono zgłoszenie %s do aktywnego sprintu", params.task_id)
                 else:
-                    # Move to backlog
-                    self.jira.move_to_backlog([params.task_id])
-                    print(f"Przeniesiono zgłoszenie {params.task_id} do backlogu")
+                    logger.info("Nie znaleziono aktywnego sprintu")
+            else:
+                # Move to backlog
+                self.jira.move_to_backlog([params.task_id])
+                logger.info("Przeniesiono zgłoszenie %s do backlogu", params.task_id)
+            self.invalidate_search_cache()
         
-        print(f"Zaktualizowano zgłoszenie: {params.task_id}")
+        logger.info("Zaktualizowano zgłoszenie: %s", params.task_id)
         return self.create_document(issue)
 
     def create_issue(self, params: AddIssueParams):
         """Create a new issue in Jira"""
-        from config.jira_config import USERS  # Import at the top of the file if not already there
+        # Create the issue
+        new_issue = self.jira.create_issue(fields=self._build_issue_fields(params))
+        
+        # Cache czyścimy dopiero po dodaniu do sprintu - wcześniejsze wyszukiwanie zapamiętałoby stary skład sprintu
+        try:
+            if params.add_to_sprint:
+                if self.add_to_active_sprint([new_issue.key]) is not None:
+                    logger.info("Dodano zgłoszenie %s do aktywnego sprintu", new_issue.key)
+                else:
+                    logger.info("Nie znaleziono aktywnego sprintu")
+            else:
+                logger.info("Dodano zgłoszenie %s do backlogu", new_issue.key)
+        finally:
+            self.invalidate_search_cache()
         
+        return self.create_document(new_issue)
+
+    def create_issues(self, params_list: list[AddIssueParams]) -> list[Document]:
+        """
+        Tworzy wiele zgłoszeń przez endpoint bulk-create
+        
+        Args:
+            params_list: Parametry kolejnych zgłoszeń (AddIssueParams)
+        
+        Returns:
+            list[Document]: Dokument dla każdego zgłoszenia, w kolejności wejściowej.
+                Dla zgłoszeń, których nie udało się utworzyć (także całej nieudanej paczki), dokument opisuje błąd.
+        """
+        results = []
+        # Cache czyścimy po dodaniu do sprintu, także gdy któraś paczka się nie powiodła
+        try:
+            for start in range(0, len(params_list), BULK_CREATE_LIMIT):
+                batch = params_list[start:start + BULK_CREATE_LIMIT]
+                try:
+                    results.extend(self.jira.create_issues(
+                        field_list=[self._build_issue_fields(params) for params in batch],
+                        prefetch=False
+                    ))
+                except (JIRAError, RequestException) as e:
+                    # Zgłoszenia z wcześniejszych paczek już istnieją - nie porzucamy ich wyników
+                    error = getattr(e, 'text', None) or str(e)
+                    results.extend({'status': 'Error', 'error': error, 'issue': None} for _ in batch)
+
+            created_keys = [result['issue'].key for result in results if result['status'] == 'Success']
+            sprint_keys = [
+                result['issue'].key
+                for params, result in zip(params_list, results)
+                if result['status'] == 'Success' and params.add_to_sprint
+            ]
+
+            # Jedno wywołanie na sprint zamiast osobnego dla każdego zgłoszenia
+            if sprint_keys:
+                try:
+                    if self.add_to_active_sprint(sprint_keys) is not None:
+                        logger.info("Dodano zgłoszenia %s do aktywnego sprintu", ", ".join(sprint_keys))
+                    else:
+                        logger.info("Nie znaleziono aktywnego sprintu")
+                except JIRAError as e:
+                    logger.warning("Could not add issues to active sprint: %s", e.text)
+        finally:
+            self.invalidate_search_cache()
+
+        try:
+            issues = self._fetch_issues(created_keys)
+        except (JIRAError, RequestException) as e:
+            # Zgłoszenia już istnieją - zgłoszenie błędu skłoniłoby do ponowienia i utworzenia duplikatów
+            logger.warning("Could not fetch created issues %s: %s", ", ".join(created_keys),
+                           getattr(e, 'text', None) or e)
+            issues = {}
+
+        docs = []
+        for params, result in zip(params_list, results):
+            if result['status'] == 'Success':
+                issue = issues.get(result['issue'].key)
+                if issue is not None:
+                    docs.append(self.create_document(issue))
+                else:
+                    docs.append(self.create_created_document(result['issue'].key, params))
+            else:
+                logger.warning("Could not create issue '%s': %s", params.summary, result['error'])
+                docs.append(self.create_error_document(params.summary, result['error']))
+        return docs
+
+    def _fetch_issues(self, issue_keys: list[str]) -> dict[str, Issue]:
+        """Pobiera zgłoszenia jednym wyszukiwaniem, brakujące (np. jeszcze nie zindeksowane) dociąga pojedynczo"""
+        if not issue_keys:
+            return {}
+        found = self.jira.search_issues(
+            f"key in ({', '.join(issue_keys)})",
+            maxResults=len(issue_keys),
+            fields=list(ISSUE_FIELDS)
+        )
+        issues = {issue.key: issue for issue in found}
+        for key in issue_keys:
+            if key not in issues:
+                issues[key] = self.jira.issue(key)
+        return issues
+
+    def _build_issue_fields(self, params: AddIssueParams) -> dict:
+        # Projekt i typ zgłoszenia podajemy po ID, żeby klient JIRA nie dociągał ich przy każdym wywołaniu
         issue_dict = {
-            'project':  self.project_key,
+            'project': {'id': self.project.id},
             'summary': params.summary,
-            'issuetype': params.issuetype,
+            'issuetype': self._issue_type_field(params.issuetype),
         }
 
         if params.priority:
@@ -142,32 +334,86 @@ class JiraService():
             if account_id:
                 issue_dict['assignee'] = {'accountId': account_id}
             else:
-                print(f"\033[91mWarning: Could not find account ID for user {params.assignee}\033[0m")
+                logger.warning("Could not find account ID for user %s", params.assignee)
 
         if params.parent:
             issue_dict['parent'] = params.parent
 
-        # Create the issue
-        new_issue = self.jira.create_issue(fields=issue_dict)
-        
-        if params.add_to_sprint:
-            # Pobierz aktywny sprint
+        return issue_dict
+    
+    def get_board_id(self) -> int | None:
+        """Zwraca ID pierwszej tablicy projektu (z cache, jeśli jest aktualny)"""
+        board_id = self.metadata_cache.get("board_id")
+        if board_id is None:
             boards = self.jira.boards(projectKeyOrID=self.project_key)
-            if boards:
-                board_id = boards[0].id
+            if not boards:
+                return None
+            board_id = boards[0].id
+            self.metadata_cache.set("board_id", board_id)
+        return board_id
+
+    def get_active_sprint_id(self) -> int | None:
+        """Zwraca ID aktywnego sprintu na tablicy projektu (z cache, jeśli jest aktualny)"""
+        sprint_id = self.metadata_cache.get("active_sprint_id")
+        if sprint_id is None:
+            board_id = self.get_board_id()
+            if board_id is None:
+                return None
+            try:
                 active_sprints = self.jira.sprints(board_id, state='active')
-                if active_sprints:
-                    # Dodaj do pierwszego aktywnego sprintu
-                    sprint_id = active_sprints[0].id
-                    self.jira.add_issues_to_sprint(sprint_id, [new_issue.key])
-                    print(f"Dodano zgłoszenie {new_issue.key} do aktywnego sprintu")
-                else:
-                    print("Nie znaleziono aktywnego sprintu")
-        else:
-            print(f"Dodano zgłoszenie {new_issue.key} do backlogu")
+            except JIRAError as e:
+                if e.status_code != 404:
+                    raise
+                # Tablica z cache już nie istnieje
+                self.metadata_cache.delete("board_id")
+                return None
+            if not active_sprints:
+                return None
+            sprint_id = active_sprints[0].id
+            self.metadata_cache.set("active_sprint_id", sprint_id)
+        return sprint_id
+
+    def invalidate_sprint_cache(self) -> None:
+        """Usuwa zapamiętany aktywny sprint, np. po jego zamknięciu"""
+        self.metadata_cache.delete("active_sprint_id")
+
+    def add_to_active_sprint(self, issue_keys: list[str]) -> int | None:
+        """
+        Dodaje zgłoszenia do aktywnego sprintu
         
-        return self.create_document(new_issue)
-    
+        Args:
+            issue_keys: Klucze zgłoszeń (np. ['SOET-123'])
+        
+        Returns:
+            int | None: ID sprintu lub None, jeśli projekt nie ma aktywnego sprintu
+        """
+        sprint_id = self.get_active_sprint_id()
+        if sprint_id is None:
+            return None
+        try:
+            self.jira.add_issues_to_sprint(sprint_id, issue_keys)
+        except JIRAError as e:
+            if not self._is_stale_sprint_error(e):
+                raise
+            # Sprint z cache został zamknięty lub usunięty - odświeżamy i próbujemy jeszcze raz
+            self.invalidate_sprint_cache()
+            sprint_id = self.get_active_sprint_id()
+            if sprint_id is None:
+                return None
+            self.jira.add_issues_to_sprint(sprint_id, issue_keys)
+        return sprint_id
+
+    @staticmethod
+    def _is_stale_sprint_error(error: JIRAError) -> bool:
+        return error.status_code in (400, 404) and 'sprint' in (error.text or '').lower()
+
+    def _issue_type_field(self, issuetype):
+        if not isinstance(issuetype, str):
+            return issuetype
+        if issuetype in self.issue_type_ids:
+            return {'id': self.issue_type_ids[issuetype]}
+        return {'name': issuetype}
+
     def create_document(self, issue: Issue):
         # Tworzymy słownik tylko z potrzebnymi polami
         issue_dict = {
@@ -192,6 +438,34 @@ class JiraService():
         })
         return doc
 
+    def create_created_document(self, issue_key: str, params: AddIssueParams) -> Document:
+        """Tworzy dokument utworzonego zgłoszenia z samych parametrów tworzenia, gdy nie da się go pobrać"""
+        return self.document_service.create_document(params={
+            "text": json.dumps({
+                "key": issue_key,
+                "summary": params.summary,
+                "status": "created",
+                "issuetype": params.issuetype,
+                "assignee": params.assignee or 'Unassigned',
+            }),
+            "name": params.summary,
+            "description": "This is a document describing a created Jira issue whose details could not be fetched",
+            "type": "text",
+            "urls": [f"{self.jira_url}/browse/{issue_key}"],
+            "uuid": None
+        })
+
+    def create_error_document(self, summary: str, error) -> Document:
+        """Tworzy dokument opisujący nieudaną operację na zgłoszeniu"""
+        return self.document_service.create_document(params={
+            "text": json.dumps({"summary": summary, "status": "error", "error": error}),
+            "name": summary,
+            "description": "This is a document describing a failed Jira operation",
+            "type": "text",
+            "urls": [],
+            "uuid": None
+        })
+
     def delete_issue(self, issue_key: str) -> bool:
         """
         Usuwa zgłoszenie
@@ -201,7 +475,8 @@ class JiraService():
         """
         try:
             self.jira.issue(issue_key).delete()
-            print(f"Usunięto zgłoszenie: {issue_key}")
+            self.invalidate_search_cache()
+            logger.info("Usunięto zgłoszenie: %s", issue_key)
             return True
         except Exception as e:
             print(f"Nie można usunąć zgłoszenia {issue_key}: {str(e)}")
@@ -0,0 +1,162 @@
+from __future__ import annotations
+import asyncio
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Hashable
+
+from config.bot_config import MENTION_MAX_CONCURRENCY, MENTION_QUEUE_SIZE
+from services.tracing_service import get_logger
+
+logger = get_logger("dispatcher")
+
+
+class FairLimiter:
+    """
+    Globalny limit równoległych zadań, przydzielający zwolnione sloty po kolei każdej grupie (round-robin)
+
+    Zwykły semafor budzi oczekujących w kolejności przybycia, więc jedna grupa
+    (np. serwer Discord) z wieloma zadaniami mogłaby zająć wszystkie sloty.
+    """
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.active = 0
+        self._waiters: OrderedDict[Hashable, deque[asyncio.Future]] = OrderedDict()
+
+    @property
+    def waiting(self) -> int:
+        return sum(len(waiters) for waiters in self._waiters.values())
+
+    async def acquire(self, group: Hashable) -> None:
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(group, deque()).append(future)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Slot został już przekazany - oddajemy go następnemu
+                self.release()
+            else:
+                waiters = self._waiters.get(group)
+                if waiters is not None and future in waiters:
+                    waiters.remove(future)
+                    if not waiters:
+                        del self._waiters[group]
+            raise
+
+    def release(self) -> None:
+        # Slot przechodzi na pierwszą grupę w kolejce, która potem trafia na koniec
+        while self._waiters:
+            group, waiters = next(iter(self._waiters.items()))
+            future = waiters.popleft()
+            if waiters:
+                self._waiters.move_to_end(group)
+            else:
+                del self._waiters[group]
+            if not future.done():
+                future.set_result(None)
+                return
+        self.active -= 1
+
+
+@dataclass
+class DispatcherStats:
+    queued: int = 0
+    running: int = 0
+    channels: int = 0
+    processed: int = 0
+    failed: int = 0
+    shed: int = 0
+
+
+@dataclass
+class _ChannelQueue:
+    guild_id: int
+    items: deque = field(default_factory=deque)
+    worker: asyncio.Task | None = None
+
+
+class MentionDispatcher:
+    """
+    Kolejkuje obsługę wzmianek: osobna ograniczona kolejka i worker na każdy kanał,
+    globalny limit równoległych wzmianek i sprawiedliwy przydział slotów między serwerami.
+
+    Wzmianki z jednego kanału są obsługiwane po kolei, w kolejności przybycia.
+    Gdy kolejka kanału jest pełna, submit odrzuca wzmiankę, a wywołujący powinien
+    odpowiedzieć komunikatem o zajętości.
+    """
+    def __init__(self, handler: Callable[..., Awaitable[Any]],
+                 queue_size: int = MENTION_QUEUE_SIZE,
+                 max_concurrency: int = MENTION_MAX_CONCURRENCY):
+        """
+        Args:
+            handler: Korutyna obsługująca wzmiankę, wywoływana z argumentami przekazanymi do submit.
+                Wzmianka jest liczona jako nieudana, gdy handler zgłosi wyjątek lub zwróci False.
+            queue_size: Maksymalna liczba wzmianek czekających na jednym kanale
+            max_concurrency: Maksymalna liczba wzmianek obsługiwanych jednocześnie
+        """
+        self.handler = handler
+        self.queue_size = queue_size
+        self.limiter = FairLimiter(max_concurrency)
+        self._channels: dict[int, _ChannelQueue] = {}
+        self._stats = DispatcherStats()
+
+    def submit(self, guild_id: int, channel_id: int, *args) -> bool:
+        """
+        Dodaje wzmiankę do kolejki kanału
+
+        Returns:
+            bool: False, jeśli kolejka kanału jest pełna i wzmianka została odrzucona
+        """
+        channel = self._channels.get(channel_id)
+        if channel is None:
+            channel = self._channels[channel_id] = _ChannelQueue(guild_id)
+        if len(channel.items) >= self.queue_size:
+            self._stats.shed += 1
+            return False
+        channel.items.append(args)
+        if channel.worker is None:
+            channel.worker = asyncio.create_task(self._work(channel_id, channel))
+        return True
+
+    async def _work(self, channel_id: int, channel: _ChannelQueue) -> None:
+        # Worker kończy się, gdy kolejka kanału jest pusta - bezczynne kanały nie trzymają zadań
+        try:
+            while channel.items:
+                args = channel.items[0]
+                await self.limiter.acquire(channel.guild_id)
+                channel.items.popleft()
+                self._stats.running += 1
+                try:
+                    if await self.handler(*args) is False:
+                        self._stats.failed += 1
+                    else:
+                        self._stats.processed += 1
+                except Exception as e:
+                    self._stats.failed += 1
+                    logger.warning("Mention handler failed on channel %s: %s", channel_id, e)
+                finally:
+                    self._stats.running -= 1
+                    self.limiter.release()
+        finally:
+            del self._channels[channel_id]
+
+    async def join(self) -> None:
+        """Czeka, aż wszystkie zakolejkowane wzmianki zostaną obsłużone"""
+        while self._channels:
+            await asyncio.gather(
+                *(channel.worker for channel in list(self._channels.values()) if channel.worker),
+                return_exceptions=True
+            )
+
+    def stats(self) -> DispatcherStats:
+        return DispatcherStats(
+            queued=sum(len(channel.items) for channel in self._channels.values()),
+            running=self._stats.running,
+            channels=len(self._channels),
+            processed=self._stats.processed,
+            failed=self._stats.failed,
+            shed=self._stats.shed,
+        )
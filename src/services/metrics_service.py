@@ -0,0 +1,255 @@
+from __future__ import annotations
+import asyncio
+import threading
+from bisect import bisect_left
+from dataclasses import dataclass
+from typing import Any, Callable
+
+from services.tracing_service import get_logger
+
+logger = get_logger("metrics")
+
+# Domyślne granice przedziałów histogramu opóźnień w sekundach
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+@dataclass(frozen=True)
+class HistogramSnapshot:
+    buckets: tuple[float, ...]
+    counts: tuple[int, ...]  # liczba obserwacji w każdym przedziale, ostatni = powyżej najwyższej granicy
+    count: int
+    sum: float
+
+    def quantile(self, q: float) -> float:
+        """Szacuje kwantyl przez interpolację liniową wewnątrz przedziału"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, bucket_count in enumerate(self.counts):
+            if bucket_count and seen + bucket_count >= rank:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                if i == len(self.buckets):
+                    return lower
+                return lower + (self.buckets[i] - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+        return self.buckets[-1]
+
+
+class Histogram:
+    """
+    Histogram o stałych przedziałach (jak w Prometheusie), bezpieczny dla wątków
+
+    Zapis to jedno wyszukiwanie binarne i inkrementacja licznika, więc można go
+    używać na gorącej ścieżce.
+    """
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._count = 0
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._count += 1
+            self._sum += value
+
+    def snapshot(self) -> HistogramSnapshot:
+        with self._lock:
+            return HistogramSnapshot(self.buckets, tuple(self._counts), self._count, self._sum)
+
+
+class Counter:
+    """Licznik rosnący, bezpieczny dla wątków"""
+    def __init__(self):
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1) -> None:
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+
+class MetricFamily:
+    """
+    Metryka z etykietami - osobny licznik lub histogram dla każdej kombinacji wartości etykiet
+
+    Dzieci są tworzone przy pierwszym użyciu i zapamiętywane, więc kolejne labels()
+    to jedno wyszukiwanie w słowniku.
+    """
+    def __init__(self, name: str, help: str, kind: str, labelnames: tuple[str, ...],
+                 factory: Callable[[], Counter | Histogram]):
+        self.name = name
+        self.help = help
+        self.kind = kind
+        self.labelnames = labelnames
+        self._factory = factory
+        self._children: dict[tuple, Counter | Histogram] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values) -> Any:
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, self._factory())
+        return child
+
+    def children(self) -> list[tuple[tuple, Counter | Histogram]]:
+        with self._lock:
+            return list(self._children.items())
+
+
+@dataclass
+class _CallbackMetric:
+    name: str
+    help: str
+    kind: str
+    labelnames: tuple[str, ...]
+    collect: Callable[[], float | dict[tuple, float]]
+
+
+class MetricsRegistry:
+    """
+    Rejestr metryk renderowanych w formacie tekstowym Prometheusa
+
+    Liczniki i histogramy są aktualizowane na bieżąco. Metryki z funkcją zbierającą
+    (gauge) są obliczane dopiero przy odczycie, więc nie kosztują nic między odczytami.
+    """
+    def __init__(self):
+        self._families: dict[str, MetricFamily] = {}
+        self._callbacks: dict[str, _CallbackMetric] = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, help: str, labelnames: tuple[str, ...] = ()) -> MetricFamily:
+        return self._family(name, help, "counter", labelnames, Counter)
+
+    def histogram(self, name: str, help: str, labelnames: tuple[str, ...] = (),
+                  buckets: tuple[float, ...] = LATENCY_BUCKETS) -> MetricFamily:
+        return self._family(name, help, "histogram", labelnames, lambda: Histogram(buckets))
+
+    def _family(self, name, help, kind, labelnames, factory) -> MetricFamily:
+        # Ponowna rejestracja tej samej nazwy zwraca istniejącą metrykę
+        with self._lock:
+            family = self._families.get(name)
+            if family is None:
+                family = self._families[name] = MetricFamily(name, help, kind, tuple(labelnames), factory)
+            return family
+
+    def gauge(self, name: str, help: str, collect: Callable[[], float | dict[tuple, float]],
+              labelnames: tuple[str, ...] = (), kind: str = "gauge") -> None:
+        """
+        Rejestruje metrykę obliczaną przy odczycie
+
+        Args:
+            collect: Funkcja zwracająca wartość albo słownik {wartości etykiet: wartość}
+            kind: Typ w Prometheusie - "gauge" lub "counter" (dla liczników prowadzonych gdzie indziej)
+        """
+        with self._lock:
+            self._callbacks[name] = _CallbackMetric(name, help, kind, tuple(labelnames), collect)
+
+    def render(self) -> str:
+        lines: list[str] = []
+        with self._lock:
+            families = list(self._families.values())
+            callbacks = list(self._callbacks.values())
+
+        for family in families:
+            lines.append(f"# HELP {family.name} {family.help}")
+            lines.append(f"# TYPE {family.name} {family.kind}")
+            for values, child in family.children():
+                labels = dict(zip(family.labelnames, values))
+                if isinstance(child, Histogram):
+                    _render_histogram(lines, family.name, labels, child.snapshot())
+                else:
+                    lines.append(f"{family.name}{_format_labels(labels)} {_format_value(child.value)}")
+
+        for metric in callbacks:
+            try:
+                collected = metric.collect()
+            except Exception as e:
+                logger.warning("Could not collect metric %s: %s", metric.name, e)
+                continue
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            if not isinstance(collected, dict):
+                collected = {(): collected}
+            for values, value in collected.items():
+                labels = dict(zip(metric.labelnames, values))
+                lines.append(f"{metric.name}{_format_labels(labels)} {_format_value(value)}")
+
+        return "\n".join(lines) + "\n"
+
+
+def _render_histogram(lines: list[str], name: str, labels: dict, snapshot: HistogramSnapshot) -> None:
+    cumulative = 0
+    for bound, bucket_count in zip(snapshot.buckets, snapshot.counts):
+        cumulative += bucket_count
+        lines.append(f"{name}_bucket{_format_labels({**labels, 'le': _format_value(bound)})} {cumulative}")
+    lines.append(f"{name}_bucket{_format_labels({**labels, 'le': '+Inf'})} {snapshot.count}")
+    lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(snapshot.sum)}")
+    lines.append(f"{name}_count{_format_labels(labels)} {snapshot.count}")
+
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+# Wspólny rejestr procesu
+metrics = MetricsRegistry()
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# Czas (w sekundach) na przesłanie zapytania, po którym połączenie jest zamykane
+REQUEST_TIMEOUT = 5.0
+
+
+async def start_metrics_server(port: int, host: str = "127.0.0.1",
+                               registry: MetricsRegistry = metrics) -> asyncio.AbstractServer:
+    """
+    Uruchamia w bieżącej pętli zdarzeń serwer HTTP zwracający metryki (GET /metrics)
+
+    Serwer obsługuje tylko proste zapytania GET i zamyka połączenie po każdej odpowiedzi
+    (także gdy klient nie prześle zapytania w ciągu REQUEST_TIMEOUT sekund).
+    """
+    async def read_request(reader: asyncio.StreamReader) -> bytes:
+        request_line = await reader.readline()
+        # Nagłówki zapytania nie są potrzebne, ale trzeba je odczytać
+        while (await reader.readline()).strip():
+            pass
+        return request_line
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            request_line = await asyncio.wait_for(read_request(reader), REQUEST_TIMEOUT)
+            parts = request_line.decode("latin-1").split()
+            if len(parts) >= 2 and parts[0] == "GET" and parts[1].split("?")[0] in ("/", "/metrics"):
+                status, content_type, body = "200 OK", CONTENT_TYPE, registry.render().encode()
+            else:
+                status, content_type, body = "404 Not Found", "text/plain; charset=utf-8", b"Not Found\n"
+            writer.write(
+                f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body
+            )
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.TimeoutError):
+            pass
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(handle, host, port)
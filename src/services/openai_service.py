@@ -1,29 +1,348 @@
-import base64
+import asyncio
+import json
 import os
+import time
+from typing import AsyncIterator
 import dotenv
-from openai import OpenAI
+import httpx
+from openai import AsyncOpenAI
 from openai.types.chat import ChatCompletionMessageParam
+from config.bot_config import (
+    OPENAI_GUILD_BUDGET_WINDOW, OPENAI_GUILD_TOKEN_BUDGET, OPENAI_MAX_CONCURRENCY, OPENAI_MAX_CONNECTIONS,
+    OPENAI_MAX_PROMPT_TOKENS, OPENAI_TIMEOUT
+)
+from services.metrics_service import metrics
+from services.text_service import TextService
+from services.token_budget import GuildTokenBudget, Reservation, TokenBudgetExceeded, current_guild
+from services.tracing_service import Span, current_span, end_span, get_logger, span, start_span
+
+logger = get_logger("openai")
+
+# Tokeny formatu czatu: <|im_start|>rola ... <|im_end|> wokół każdej wiadomości i początek odpowiedzi
+MESSAGE_OVERHEAD_TOKENS = 4
+REPLY_OVERHEAD_TOKENS = 3
+
+REQUEST_LATENCY = metrics.histogram(
+    "openai_request_duration_seconds", "Czas zapytania do OpenAI (bez czekania na semafor)", ("model", "prompt_type")
+)
+PROMPT_TOKENS = metrics.counter("openai_prompt_tokens_total", "Tokeny promptów", ("model", "prompt_type"))
+CACHED_TOKENS = metrics.counter("openai_cached_tokens_total", "Tokeny promptów z cache prefiksu", ("model", "prompt_type"))
+COMPLETION_TOKENS = metrics.counter("openai_completion_tokens_total", "Tokeny odpowiedzi", ("model", "prompt_type"))
+GUILD_TOKENS = metrics.counter("openai_guild_tokens_total", "Tokeny (prompt i odpowiedź) zużyte przez serwer", ("guild",))
+BUDGET_REJECTIONS = metrics.counter(
+    "openai_budget_rejections_total", "Zapytania odrzucone przed wysłaniem przez limit tokenów", ("scope", "prompt_type")
+)
+TRIMMED_MESSAGES = metrics.counter(
+    "openai_trimmed_messages_total", "Wiadomości usunięte z promptów, żeby zmieściły się w limicie", ("prompt_type",)
+)
+
+
 class OpenAIService:
-    def __init__(self):
+    # Klient, pula połączeń HTTP, limit równoległych zapytań i limity tokenów serwerów są wspólne dla wszystkich instancji
+    _client: AsyncOpenAI | None = None
+    _semaphore: asyncio.Semaphore | None = None
+    _budget: GuildTokenBudget | None = None
+
+    def __init__(self, client: AsyncOpenAI | None = None,
+                 max_prompt_tokens: int = OPENAI_MAX_PROMPT_TOKENS,
+                 budget: GuildTokenBudget | None = None):
+        """
+        Args:
+            client: Własny klient (np. atrapa w benchmarkach) zamiast wspólnego
+            max_prompt_tokens: Limit tokenów promptu jednego zapytania (0 = bez limitu)
+            budget: Limity tokenów serwerów Discorda (domyślnie wspólne, z konfiguracji)
+        """
         dotenv.load_dotenv()
         self.api_key = os.getenv("OPENAI_API_KEY")
-        self.client = OpenAI(api_key=self.api_key)
+        self.client = client or self._get_client(self.api_key)
+        self.semaphore = self._get_semaphore()
+        self.max_prompt_tokens = max_prompt_tokens
+        self.budget = budget or self._get_budget()
+        self._text_services: dict[str, TextService] = {}
+
+    @classmethod
+    def _get_client(cls, api_key: str | None) -> AsyncOpenAI:
+        if cls._client is None:
+            http_client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=OPENAI_MAX_CONNECTIONS,
+                    max_keepalive_connections=OPENAI_MAX_CONNECTIONS
+                ),
+                timeout=OPENAI_TIMEOUT
+            )
+            cls._client = AsyncOpenAI(api_key=api_key, http_client=http_client)
+        return cls._client
+
+    @classmethod
+    def _get_semaphore(cls) -> asyncio.Semaphore:
+        if cls._semaphore is None:
+            cls._semaphore = asyncio.Semaphore(OPENAI_MAX_CONCURRENCY)
+        return cls._semaphore
+
+    @classmethod
+    def _get_budget(cls) -> GuildTokenBudget:
+        if cls._budget is None:
+            cls._budget = GuildTokenBudget(OPENAI_GUILD_TOKEN_BUDGET, OPENAI_GUILD_BUDGET_WINDOW)
+        return cls._budget
+
+    async def count_prompt_tokens(self, messages: list[ChatCompletionMessageParam], model: str = "gpt-4o",
+                                  tools: list[dict] | None = None) -> tuple[list[int], int]:
+        """
+        Liczy tokeny promptu przed wysłaniem zapytania
+
+        Gdy kodowania modelu nie da się załadować, liczba tokenów jest szacowana z długości tekstu.
+
+        Returns:
+            tuple: (tokeny każdej wiadomości, tokeny pozostałej części promptu - definicji narzędzi i odpowiedzi)
+        """
+        count = await self._token_counter(model)
+        counts = [MESSAGE_OVERHEAD_TOKENS + count(_message_text(message)) for message in messages]
+        extra = REPLY_OVERHEAD_TOKENS + (count(json.dumps(tools, ensure_ascii=False)) if tools else 0)
+        return counts, extra
+
+    async def prompt_room(self, messages: list[ChatCompletionMessageParam], model: str = "gpt-4o",
+                          tools: list[dict] | None = None) -> tuple[int | None, int]:
+        """
+        Zwraca, ile tokenów można jeszcze dodać do promptu, żeby zmieścił się w limicie zapytania
+
+        Pozwala przyciąć przycinalną część promptu (np. dokumenty w odpowiedzi) przed jego złożeniem.
+        Liczbę tokenów promptu wraz z dodaną częścią można potem przekazać do completion jako prompt_tokens,
+        żeby nie liczyć go drugi raz.
+
+        Returns:
+            tuple: (wolne tokeny - ujemne, gdy prompt już przekracza limit, lub None, gdy limitu nie ma;
+                    liczba tokenów promptu)
+        """
+        counts, extra = await self.count_prompt_tokens(messages, model, tools)
+        tokens = sum(counts) + extra
+        return (self.max_prompt_tokens - tokens if self.max_prompt_tokens else None), tokens
+
+    async def _token_counter(self, model: str):
+        return await self._text_services.setdefault(model, TextService(model)).token_counter()
+
+    async def fit_prompt(self, messages: list[ChatCompletionMessageParam], model: str = "gpt-4o",
+                         tools: list[dict] | None = None,
+                         prompt_type: str = "default") -> tuple[list[ChatCompletionMessageParam], int]:
+        """
+        Dopasowuje prompt do limitu tokenów pojedynczego zapytania
+
+        Gdy prompt jest za duży, usuwa najstarsze wiadomości rozmowy. Wiadomości systemowe
+        i ostatnia wiadomość (bieżące pytanie) zostają zawsze. Części promptu systemowego, które
+        można skrócić (dokumenty w odpowiedzi), wywołujący przycina wcześniej - patrz prompt_room.
+
+        Returns:
+            tuple: (wiadomości do wysłania, liczba tokenów promptu)
+
+        Raises:
+            TokenBudgetExceeded: Gdy prompt nie mieści się w limicie nawet po przycięciu
+        """
+        counts, extra = await self.count_prompt_tokens(messages, model, tools)
+        total = sum(counts) + extra
+        if not self.max_prompt_tokens or total <= self.max_prompt_tokens:
+            return messages, total
+
+        dropped = set()
+        for i, message in enumerate(messages[:-1]):
+            if total <= self.max_prompt_tokens:
+                break
+            if message.get("role") != "system":
+                dropped.add(i)
+                total -= counts[i]
+        self._check_prompt_limit(total, prompt_type)
 
+        TRIMMED_MESSAGES.labels(prompt_type).inc(len(dropped))
+        logger.info("Prompt %s przycięty o %d najstarszych wiadomości do %d tokenów", prompt_type, len(dropped), total)
+        return [message for i, message in enumerate(messages) if i not in dropped], total
+
+    async def _fitted(self, messages: list[ChatCompletionMessageParam], model: str, tools: list[dict] | None,
+                      prompt_type: str, prompt_tokens: int | None) -> tuple[list[ChatCompletionMessageParam], int]:
+        """Dopasowuje prompt do limitu, chyba że wywołujący podał już jego liczbę tokenów"""
+        if prompt_tokens is None:
+            return await self.fit_prompt(messages, model, tools, prompt_type)
+        self._check_prompt_limit(prompt_tokens, prompt_type)
+        return messages, prompt_tokens
+
+    def _check_prompt_limit(self, prompt_tokens: int, prompt_type: str) -> None:
+        """Odrzuca prompt przekraczający limit tokenów pojedynczego zapytania"""
+        if self.max_prompt_tokens and prompt_tokens > self.max_prompt_tokens:
+            BUDGET_REJECTIONS.labels("call", prompt_type).inc()
+            raise TokenBudgetExceeded("call", prompt_tokens, self.max_prompt_tokens)
+
+    def _reserve(self, prompt_tokens: int, prompt_type: str) -> Reservation | None:
+        """Rezerwuje tokeny promptu w limicie serwera, na którego konto idzie zapytanie"""
+        guild_id = current_guild()
+        if guild_id is None:
+            return None
+        try:
+            return self.budget.reserve(guild_id, prompt_tokens)
+        except TokenBudgetExceeded:
+            BUDGET_REJECTIONS.labels("guild", prompt_type).inc()
+            raise
+
+    def _settle(self, reservation: Reservation | None, used_tokens: int | None) -> None:
+        """Zastępuje rezerwację faktycznym zużyciem z odpowiedzi lub ją zwalnia, jeśli odpowiedzi nie było"""
+        if reservation is None:
+            return
+        if used_tokens is None:
+            self.budget.release(reservation)
+        else:
+            self.budget.settle(reservation, used_tokens)
+            GUILD_TOKENS.labels(str(reservation.guild_id)).inc(used_tokens)
 
     async def completion(
         self,
         messages: list[ChatCompletionMessageParam],
         model: str = "gpt-4o",
         jsonMode: bool = False,
-        
-        stream: bool = False
+        stream: bool = False,
+        tools: list[dict] | None = None,
+        prompt_type: str = "default",
+        prompt_tokens: int | None = None
     ):
-   
-        response = self.client.chat.completions.create(
-            model=model,
-            messages=messages,
-            
-        response_format= { "type": "json_object" } if jsonMode else { "type": "text" },
-        stream=stream
-        )
-        return response
\ No newline at end of file
+        """
+        Wysyła zapytanie do modelu
+
+        Przed wysłaniem liczy tokeny promptu, przycina go do limitu zapytania i rezerwuje tokeny
+        w limicie serwera Discorda (jeśli zapytanie idzie na konto serwera - token_budget.guild_scope).
+
+        Args:
+            prompt_tokens: Liczba tokenów promptu, jeśli wywołujący już ją zna (np. z prompt_room) -
+                prompt nie jest wtedy liczony ani przycinany, sprawdzany jest tylko limit
+
+        Raises:
+            TokenBudgetExceeded: Gdy prompt przekracza limit zapytania lub serwera - zapytanie nie jest wysyłane
+        """
+        # Narzędzia przekazujemy tylko gdy są podane - API nie przyjmuje pustej listy
+        extra = {"tools": tools, "tool_choice": "auto"} if tools else {}
+        stage = current_span()
+        with span("openai", model=model, prompt_type=prompt_type) as call_span:
+            messages, prompt_tokens = await self._fitted(messages, model, tools, prompt_type, prompt_tokens)
+            call_span.set(estimated_prompt_tokens=prompt_tokens)
+            reservation = self._reserve(prompt_tokens, prompt_type)
+            used_tokens = None
+            try:
+                # Semafor ogranicza liczbę zapytań w locie, reszta czeka bez blokowania pętli zdarzeń
+                async with self.semaphore:
+                    started = time.perf_counter()
+                    call_span.set(wait_ms=round((started - call_span.start) * 1000, 1))
+                    response = await self.client.chat.completions.create(
+                        model=model,
+                        messages=messages,
+                        response_format={ "type": "json_object" } if jsonMode else { "type": "text" },
+                        stream=stream,
+                        **extra
+                    )
+                    REQUEST_LATENCY.labels(model, prompt_type).observe(time.perf_counter() - started)
+                if stream:
+                    # Zużycia strumienia nie znamy - zostaje oszacowanie promptu
+                    used_tokens = prompt_tokens
+                else:
+                    used_tokens = self._record_usage(getattr(response, "usage", None), model, prompt_type,
+                                                     call_span, stage) or prompt_tokens
+            finally:
+                self._settle(reservation, used_tokens)
+        return response
+
+    async def completion_stream(
+        self,
+        messages: list[ChatCompletionMessageParam],
+        model: str = "gpt-4o",
+        prompt_type: str = "default",
+        prompt_tokens: int | None = None
+    ) -> AsyncIterator[str]:
+        """
+        Sprawdza limity tokenów i zwraca strumień fragmentów odpowiedzi modelu
+        
+        Limity są sprawdzane (jak w completion) już przy wywołaniu, więc odrzucone zapytanie kończy się
+        wyjątkiem, zanim wywołujący cokolwiek wyśle na Discorda. Slot semafora jest zajęty aż do końca
+        strumienia, a rezerwacja tokenów jest rozliczana przy jego zamknięciu (najlepiej przez contextlib.aclosing).
+
+        Args:
+            prompt_tokens: Liczba tokenów promptu, jeśli wywołujący już ją zna - jak w completion
+
+        Raises:
+            TokenBudgetExceeded: Gdy prompt przekracza limit zapytania lub serwera
+        """
+        stream = self._stream(messages, model, prompt_type, prompt_tokens)
+        # Pierwszy (pusty) fragment pojawia się po sprawdzeniu limitów i rezerwacji tokenów
+        await anext(stream)
+        return stream
+
+    async def _stream(self, messages: list[ChatCompletionMessageParam], model: str,
+                      prompt_type: str, prompt_tokens: int | None) -> AsyncIterator[str]:
+        # W generatorze nie ustawiamy bieżącego spanu - przeciekłby do wywołującego
+        stage = current_span()
+        call_span = start_span("openai", model=model, prompt_type=prompt_type, stream=True)
+        started = None
+        reservation = None
+        used_tokens = None
+        try:
+            messages, prompt_tokens = await self._fitted(messages, model, None, prompt_type, prompt_tokens)
+            call_span.set(estimated_prompt_tokens=prompt_tokens)
+            reservation = self._reserve(prompt_tokens, prompt_type)
+            yield ""
+            async with self.semaphore:
+                started = time.perf_counter()
+                call_span.set(wait_ms=round((started - call_span.start) * 1000, 1))
+                stream = await self.client.chat.completions.create(
+                    model=model,
+                    messages=messages,
+                    stream=True,
+                    stream_options={"include_usage": True}
+                )
+                async for chunk in stream:
+                    # Ostatni fragment nie ma choices, niesie tylko zużycie tokenów
+                    if getattr(chunk, "usage", None):
+                        used_tokens = self._record_usage(chunk.usage, model, prompt_type, call_span, stage)
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+        except Exception as e:
+            call_span.set(error=type(e).__name__)
+            raise
+        finally:
+            if started is not None:
+                REQUEST_LATENCY.labels(model, prompt_type).observe(time.perf_counter() - started)
+            self._settle(reservation, used_tokens)
+            end_span(call_span)
+
+    @staticmethod
+    def _record_usage(usage, model: str, prompt_type: str, call_span: Span, stage: Span | None) -> int | None:
+        """
+        Zapisuje zużycie tokenów w metrykach, na spanie zapytania i sumuje je na spanie etapu
+
+        Returns:
+            int | None: Łączna liczba tokenów promptu i odpowiedzi lub None, gdy odpowiedź nie podała zużycia
+        """
+        if usage is None:
+            return None
+        details = getattr(usage, "prompt_tokens_details", None)
+        tokens = {
+            "prompt_tokens": usage.prompt_tokens,
+            "completion_tokens": usage.completion_tokens,
+            "cached_tokens": getattr(details, "cached_tokens", None) or 0,
+        }
+        PROMPT_TOKENS.labels(model, prompt_type).inc(tokens["prompt_tokens"])
+        CACHED_TOKENS.labels(model, prompt_type).inc(tokens["cached_tokens"])
+        COMPLETION_TOKENS.labels(model, prompt_type).inc(tokens["completion_tokens"])
+        call_span.set(**tokens)
+        if stage is not None:
+            stage.add(**tokens)
+        return tokens["prompt_tokens"] + tokens["completion_tokens"]
+
+    @classmethod
+    async def close(cls) -> None:
+        """Zamyka wspólnego klienta i jego pulę połączeń"""
+        if cls._client is not None:
+            await cls._client.close()
+            cls._client = None
+
+
+def _message_text(message: ChatCompletionMessageParam) -> str:
+    """Zwraca tekst wiadomości do policzenia tokenów (treść, także wieloczęściowa, i wywołania narzędzi)"""
+    content = message.get("content")
+    if isinstance(content, list):
+        content = "".join(part.get("text", "") for part in content if isinstance(part, dict))
+    text = f"{message.get('role', '')}\n{content or ''}"
+    if message.get("tool_calls"):
+        text += json.dumps(message["tool_calls"], ensure_ascii=False, default=str)
+    return text
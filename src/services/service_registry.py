@@ -0,0 +1,65 @@
+import asyncio
+from typing import Callable
+from services.async_jira_service import AsyncJiraService
+from services.jira_service import JiraService
+from services.openai_service import OpenAIService
+from services.task_service import TaskService
+from services.translation_cache import TranslationCache
+
+
+class ServiceRegistry:
+    """
+    Rejestr długo żyjących serwisów per projekt.
+
+    JiraService (razem z klientem JIRA, jego sesją HTTP i metadanymi projektu)
+    oraz TaskService są tworzone raz, przy pierwszym użyciu, i współdzielone
+    między kolejnymi wzmiankami.
+    """
+    def __init__(self, openai_service: OpenAIService | None = None,
+                 jira_factory: Callable[[str], JiraService] = JiraService):
+        """
+        Args:
+            openai_service: Wspólny serwis OpenAI
+            jira_factory: Funkcja tworząca JiraService dla klucza projektu
+        """
+        self.openai_service = openai_service or OpenAIService()
+        self.jira_factory = jira_factory
+        # Jeden cache tłumaczeń (i jeden plik) dla wszystkich projektów - klucz zawiera skrót konfiguracji projektu
+        self.translation_cache = TranslationCache()
+        self._jira_services: dict[str, AsyncJiraService] = {}
+        self._task_services: dict[str, TaskService] = {}
+        self._lock = asyncio.Lock()
+
+    async def get_jira_service(self, project_key: str) -> AsyncJiraService:
+        """Zwraca (i przy pierwszym wywołaniu tworzy) JiraService dla projektu"""
+        async with self._lock:
+            if project_key not in self._jira_services:
+                # Tworzenie klienta JIRA to kilka blokujących zapytań - wykonujemy je poza pętlą zdarzeń
+                jira_service = await asyncio.to_thread(self.jira_factory, project_key)
+                self._jira_services[project_key] = AsyncJiraService(jira_service)
+            return self._jira_services[project_key]
+
+    async def get_task_service(self, project_key: str) -> TaskService:
+        """Zwraca (i przy pierwszym wywołaniu tworzy) TaskService dla projektu"""
+        jira_service = await self.get_jira_service(project_key)
+        async with self._lock:
+            if project_key not in self._task_services:
+                self._task_services[project_key] = TaskService(
+                    project_key,
+                    jira_service=jira_service,
+                    openai_service=self.openai_service,
+                    translation_cache=self.translation_cache
+                )
+            return self._task_services[project_key]
+
+    def cache_stats(self) -> dict[tuple[str, str], dict]:
+        """Zwraca statystyki cache, klucz = (nazwa cache, projekt)"""
+        stats = {("jql_translation", ""): self.translation_cache.stats()}
+        for key, service in self._jira_services.items():
+            stats[("jira_search", key)] = service.jira_service.search_cache.stats()
+            stats[("jira_metadata", key)] = service.jira_service.metadata_cache.stats()
+        return stats
+
+    def jira_stats(self) -> dict[str, dict]:
+        """Zwraca metryki pul wątków Jiry dla wszystkich projektów"""
+        return {key: service.stats() for key, service in self._jira_services.items()}
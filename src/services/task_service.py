@@ -1,107 +1,259 @@
+import asyncio
 import json
-from typing import Dict, Any
+from typing import Any, Awaitable, Dict
+from services.async_jira_service import AsyncJiraService
 from services.jira_service import JiraService
-from custom_types.models import IService, UpdateIssueParams, AddIssueParams
+from custom_types.models import Document, IService, UpdateIssueParams, AddIssueParams
 from prompts import addtasks_prompt, update_task_prompt, list_tasks_prompt
+from prompts.template import report_token_split
 from services.openai_service import OpenAIService
+from services.text_service import TextService
+from services.tracing_service import get_logger
+from services.translation_cache import TranslationCache
+from custom_types.utils import stable_hash
+from config.bot_config import JIRA_BULK_CREATE, JIRA_UPDATE_CONCURRENCY
 from config.jira_config import STATUSES, TASK_TYPES, EPICS, USERS
 
+logger = get_logger("tasks")
+
 class TaskService(IService):
-    def __init__(self, project_key: str):
+    def __init__(self, project_key: str,
+                 jira_service: AsyncJiraService | None = None,
+                 openai_service: OpenAIService | None = None,
+                 translation_cache: TranslationCache | None = None):
         self.project_key = project_key
-        self.jira_service = JiraService(self.project_key)
-        self.openai_service = OpenAIService()
+        self.jira_service = jira_service or AsyncJiraService(JiraService(self.project_key))
+        self.openai_service = openai_service or OpenAIService()
+        self.translation_cache = translation_cache or TranslationCache()
+        self.text_service = TextService()
+        self.list_config_hash = stable_hash(self.project_key, TASK_TYPES, USERS, EPICS, STATUSES)
 
     async def execute(self, query: str):
         # Parse JSON query
         query_dict: Dict[str, Any] = json.loads(query)
         
-        # Handle each operation type
+        # Tryb narzędzi - planer zwrócił gotowe wywołania, bez pośrednich zapytań do modelu
+        if "tool_calls" in query_dict:
+            return await self.execute_tool_calls(query_dict["tool_calls"])
+
+        # Każda niepusta intencja z planu jest wykonywana - niezależne intencje równolegle.
+        # Wyszukiwanie czeka na zapisy z tego samego planu, żeby widzieć ich efekt
+        writes = []
         if query_dict.get("add"):
-            add_tasks_response = await self.add_tasks(query_dict["add"])
-            response_dict = json.loads(add_tasks_response)
-            
-            created_docs = []
-            
-            # Iterujemy po wszystkich zadaniach do utworzenia
-            for task in response_dict.get("add", []):
-                # Używamy parent bezpośrednio, bez dodatkowego przetwarzania
-                add_params = AddIssueParams(**{
-                    "summary": task["summary"],
-                    "description": task.get("description"),
-                    "issuetype": task.get("issuetype", "Zadanie"),
-                    "priority": task.get("priority"),
-                    "assignee": task.get("assignee"),
-                    "reporter": task.get("reporter"),
-                    "parent": task.get("parent"),  # używamy parent bezpośrednio
-                    "add_to_sprint": task.get("add_to_sprint", False)
-                })
-                doc = self.jira_service.create_issue(add_params)
-                created_docs.append(doc)
-            
-            return created_docs
-            
+            writes.append(("add", asyncio.create_task(self._run_add(query_dict["add"]))))
         if query_dict.get("update"):
-            update_tasks_response = await self.update_tasks(query_dict["update"])
-            print(update_tasks_response)
-
-            response_dict = json.loads(update_tasks_response)
-            updated_docs = []
-            # Iterujemy po wszystkich elementach diff
-            for task_update in response_dict["diff"]:
-                # Convert dictionary to UpdateIssueParams
-                update_params = UpdateIssueParams(
-                    task_id=task_update["task_id"],
-                    **{k: v for k, v in task_update.items() if k in UpdateIssueParams.__dataclass_fields__ and k != "task_id"}
-                )
-                # Aktualizujemy każde zadanie i dodajemy do listy
-                updated_doc = self.jira_service.update_issue(update_params)
-                updated_docs.append(updated_doc)
-            
-            return updated_docs
-            
+            writes.append(("update", asyncio.create_task(self._run_update(query_dict["update"]))))
+        intents = list(writes)
         if query_dict.get("list"):
-            list_tasks_response = await self.list_tasks(query_dict["list"])
+            intents.append(("list", self._run_list(query_dict["list"], after=[task for _, task in writes])))
+        return await self._gather_docs(intents)
+
+    async def _run_add(self, query: str) -> list[Document]:
+        add_tasks_response = await self.add_tasks(query)
+        response_dict = json.loads(add_tasks_response)
+
+        # Iterujemy po wszystkich zadaniach do utworzenia
+        params_list = []
+        for task in response_dict.get("add", []):
+            # Używamy parent bezpośrednio, bez dodatkowego przetwarzania
+            params_list.append(AddIssueParams(**{
+                "summary": task["summary"],
+                "description": task.get("description"),
+                "issuetype": task.get("issuetype", "Zadanie"),
+                "priority": task.get("priority"),
+                "assignee": task.get("assignee"),
+                "reporter": task.get("reporter"),
+                "parent": task.get("parent"),  # używamy parent bezpośrednio
+                "add_to_sprint": task.get("add_to_sprint", False)
+            }))
+
+        return await self._create_issues(params_list)
+
+    async def _run_update(self, query: str) -> list[Document]:
+        update_tasks_response = await self.update_tasks(query)
+        logger.debug("Odpowiedź update_tasks: %s", update_tasks_response)
+
+        response_dict = json.loads(update_tasks_response)
+        return await self._update_issues(self._update_params(response_dict["diff"]))
+
+    async def _run_list(self, query: str, after: list[asyncio.Task] | None = None) -> list[Document]:
+        list_tasks_response = await self.list_tasks(query)
+        logger.debug("Odpowiedź list_tasks: %s", list_tasks_response)
+
+        response_dict = json.loads(list_tasks_response)
+        return await self._search_after(response_dict.get("jql"), after)
+
+    async def _search_after(self, jql: str | None, after: list[asyncio.Task] | None) -> list[Document]:
+        # Tłumaczenie na JQL biegnie równolegle z zapisami, samo wyszukiwanie dopiero po nich
+        if after:
+            await asyncio.wait(after)
+        return await self._search(jql)
+
+    async def _gather_docs(self, intents: list[tuple[str, Awaitable[list[Document]]]]) -> list[Document]:
+        """
+        Wykonuje intencje równolegle i łączy ich dokumenty w jedną listę
+
+        Args:
+            intents: Pary (nazwa intencji, zadanie zwracające listę dokumentów)
+
+        Returns:
+            Dokumenty w kolejności intencji. Błąd jednej intencji nie przerywa
+            pozostałych - w jej miejscu trafia dokument błędu.
+        """
+        results = await asyncio.gather(*(intent for _, intent in intents), return_exceptions=True)
+        docs: list[Document] = []
+        for (name, _), result in zip(intents, results):
+            if isinstance(result, BaseException):
+                if not isinstance(result, Exception):
+                    raise result
+                logger.warning("%s failed: %s", name, result)
+                docs.append(self.jira_service.create_error_document(name, str(result)))
+            else:
+                docs.extend(result)
+        return docs
 
-            print(list_tasks_response)
+    async def execute_tool_calls(self, tool_calls: list[dict]) -> list[Document]:
+        """
+        Wykonuje wywołania narzędzi zwrócone przez planer w trybie narzędzi
 
-            response_dict = json.loads(list_tasks_response)
-            docs = self.jira_service.list_issues(response_dict["jql"])
-            return docs
+        Args:
+            tool_calls: Lista {"name": nazwa narzędzia, "arguments": argumenty}
+
+        Returns:
+            Dokumenty utworzonych, zaktualizowanych i znalezionych zadań
+        """
+        # Zapisy startują od razu, wyszukiwania czekają na nie (jak w execute)
+        writes = []
+        searches = []
+        for call in tool_calls:
+            name = call.get("name")
+            arguments = call.get("arguments") or {}
+            if name == "create_issues":
+                params_list = [self._tool_add_params(issue) for issue in arguments.get("issues", [])]
+                writes.append((name, asyncio.create_task(self._create_issues(params_list))))
+            elif name == "update_issues":
+                params_list = self._update_params(arguments.get("updates", []))
+                writes.append((name, asyncio.create_task(self._update_issues(params_list))))
+            elif name == "search_jql":
+                searches.append((name, arguments.get("jql")))
+            else:
+                logger.warning("Unknown tool %s", name)
+        after = [task for _, task in writes]
+        return await self._gather_docs(
+            writes + [(name, self._search_after(jql, after)) for name, jql in searches]
+        )
+
+    @staticmethod
+    def _tool_add_params(issue: dict) -> AddIssueParams:
+        # Schemat narzędzia używa prostych wartości, JIRA oczekuje obiektów dla priorytetu i rodzica
+        return AddIssueParams(
+            summary=issue["summary"],
+            description=issue.get("description"),
+            issuetype=issue.get("issuetype", "Zadanie"),
+            priority={"name": issue["priority"]} if issue.get("priority") else None,
+            assignee=issue.get("assignee"),
+            reporter=issue.get("reporter"),
+            parent={"key": issue["parent"]} if issue.get("parent") else None,
+            add_to_sprint=issue.get("add_to_sprint", False)
+        )
+
+    @staticmethod
+    def _update_params(diff: list[dict]) -> list[UpdateIssueParams]:
+        # Convert dictionaries to UpdateIssueParams
+        return [
+            UpdateIssueParams(
+                task_id=task_update["task_id"],
+                **{k: v for k, v in task_update.items() if k in UpdateIssueParams.__dataclass_fields__ and k != "task_id"}
+            )
+            for task_update in diff
+        ]
+
+    async def _create_issues(self, params_list: list[AddIssueParams]) -> list[Document]:
+        # Kilka zadań tworzymy jednym zapytaniem bulk-create
+        if JIRA_BULK_CREATE and len(params_list) > 1:
+            return await self.jira_service.create_issues(params_list)
+        created_docs = []
+        for add_params in params_list:
+            doc = await self.jira_service.create_issue(add_params)
+            created_docs.append(doc)
+        return created_docs
+
+    async def _update_issues(self, params_list: list[UpdateIssueParams]) -> list[Document]:
+        # Aktualizacje są od siebie niezależne - wykonujemy je równolegle, zachowując kolejność wyników
+        semaphore = asyncio.Semaphore(JIRA_UPDATE_CONCURRENCY)
+        return list(await asyncio.gather(
+            *(self._update_issue(update_params, semaphore) for update_params in params_list)
+        ))
+
+    async def _search(self, jql: str | None) -> list[Document]:
+        # Pusty JQL oznacza, że model nie rozpoznał kryteriów wyszukiwania
+        if not jql:
+            return []
+        return [doc async for doc in self.jira_service.stream_issues(jql)]
+
+    async def _update_issue(self, params: UpdateIssueParams, semaphore: asyncio.Semaphore) -> Document:
+        async with semaphore:
+            try:
+                return await self.jira_service.update_issue(params)
+            except Exception as e:
+                logger.warning("Could not update issue %s: %s", params.task_id, e)
+                return self.jira_service.create_error_document(params.task_id, str(e))
 
     async def add_tasks(self, query: str):
         users = USERS
         epics = EPICS
         task_types = TASK_TYPES
         prompt = addtasks_prompt(self.project_key, task_types, users, epics)
+        report_token_split(prompt, self.text_service)
         response = await self.openai_service.completion(
             messages=[
-                {"role": "system", "content": prompt},
+                {"role": "system", "content": prompt.text},
                 {"role": "user", "content": query}
-            ]
+            ],
+            prompt_type=prompt.name
         )   
         return response.choices[0].message.content
 
     async def update_tasks(self, query: str):
         prompt = update_task_prompt(self.project_key, TASK_TYPES, USERS, EPICS)
+        report_token_split(prompt, self.text_service)
         response = await self.openai_service.completion(
             messages=[
-                {"role": "system", "content": prompt},
+                {"role": "system", "content": prompt.text},
                 {"role": "user", "content": query}
-            ]
+            ],
+            prompt_type=prompt.name
         )
         return response.choices[0].message.content
 
 
     async def list_tasks(self, query: str):
+        # Te same pytania o listę zadań tłumaczymy na JQL tylko raz
+        cache_key = TranslationCache.make_key(query, self.list_config_hash)
+        cached = self.translation_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
         prompt = list_tasks_prompt(self.project_key, TASK_TYPES, USERS, EPICS, STATUSES)
+        report_token_split(prompt, self.text_service)
         response = await self.openai_service.completion(
             messages=[
-                {"role": "system", "content": prompt},
+                {"role": "system", "content": prompt.text},
                 {"role": "user", "content": query}
-            ]
+            ],
+            prompt_type=prompt.name
         )
-        return response.choices[0].message.content
+        content = response.choices[0].message.content
+
+        # Zapamiętujemy tylko poprawne tłumaczenia z niepustym JQL
+        try:
+            jql = json.loads(content).get("jql")
+        except (ValueError, AttributeError):
+            jql = None
+        if jql:
+            self.translation_cache.set(cache_key, content)
+            self.translation_cache.schedule_save()
+        return content
 
 
 
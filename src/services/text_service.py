@@ -1,17 +1,92 @@
-from typing import List, Dict, Any, Optional
+from __future__ import annotations
+import asyncio
+import threading
+from typing import TYPE_CHECKING, Callable, Iterable, List, Dict, Any, Optional
 from dataclasses import dataclass
-from custom_types.models import Document
-import tiktoken
+from bisect import bisect_left
+from custom_types.models import DocMetadata, Document
 from uuid import uuid4
-from datetime import datetime
 import re
-from pydantic import BaseModel
+from services.tracing_service import get_logger
+
+logger = get_logger("text")
+
+if TYPE_CHECKING:
+    import tiktoken
 
 SPECIAL_TOKENS = {
     "<|im_start|>": 100264,
     "<|im_end|>": 100265,
     "<|im_sep|>": 100266
 }
+ALLOWED_SPECIAL = set(SPECIAL_TOKENS)
+# Średnia liczba znaków na token, używana do szacowania bez kodowania modelu
+CHARS_PER_TOKEN = 4
+
+# Wspólny dla całego procesu rejestr załadowanych kodowań, klucz = nazwa modelu
+_encodings: Dict[str, tiktoken.Encoding] = {}
+_encodings_lock = threading.Lock()
+# Modele, których kodowania nie udało się załadować - dla nich tokeny są szacowane (estimate_tokens)
+_unavailable_encodings: set[str] = set()
+
+
+def get_encoding(model_name: str) -> tiktoken.Encoding:
+    """
+    Zwraca kodowanie tiktoken dla modelu, ładując je przy pierwszym użyciu.
+    tiktoken jest importowany dopiero tutaj, więc sam import modułu go nie ładuje.
+    """
+    encoding = _encodings.get(model_name)
+    if encoding is None:
+        with _encodings_lock:
+            encoding = _encodings.get(model_name)
+            if encoding is None:
+                import tiktoken
+                encoding = tiktoken.encoding_for_model(model_name)
+                _encodings[model_name] = encoding
+    return encoding
+
+
+class EstimatedEncoding:
+    """
+    Przybliżone kodowanie bez plików BPE tiktoken: jeden token na CHARS_PER_TOKEN znaków
+
+    Pozwala uruchomić bota tam, gdzie kodowania nie da się pobrać (np. benchmarki bez dostępu do sieci).
+    """
+    name = "estimate"
+
+    def encode(self, text: str, allowed_special: Any = ()) -> List[int]:
+        return [0] * estimate_tokens(text)
+
+    def decode_with_offsets(self, tokens: List[int]) -> tuple[str, List[int]]:
+        # Treść nie jest odtwarzana - split korzysta tylko z pozycji początków tokenów
+        return "", [i * CHARS_PER_TOKEN for i in range(len(tokens))]
+
+
+def estimate_tokens(text: str) -> int:
+    """Szacuje liczbę tokenów z długości tekstu"""
+    return len(text) // CHARS_PER_TOKEN
+
+
+def use_estimated_encoding(models: Iterable[str] = ("gpt-4o",)) -> None:
+    """Rejestruje EstimatedEncoding dla modeli, więc get_encoding nie będzie ładować tiktoken"""
+    with _encodings_lock:
+        for model_name in models:
+            _encodings[model_name] = EstimatedEncoding()
+
+
+def warm_up_tokenizers(models: Iterable[str] = ("gpt-4o",)) -> threading.Thread:
+    """Ładuje kodowania dla podanych modeli w wątku w tle"""
+    def load():
+        for model_name in models:
+            try:
+                get_encoding(model_name)
+            except Exception as e:
+                logger.warning("Could not load tokenizer for %s: %s", model_name, e)
+
+    thread = threading.Thread(target=load, name="tokenizer-warmup", daemon=True)
+    thread.start()
+    return thread
+
 
 @dataclass
 class TokenizerState:
@@ -22,18 +97,46 @@ class TextService:
     def __init__(self, model_name: str = "gpt-4o"):
         self.state = TokenizerState(model_name=model_name)
 
+    @property
+    def tokenizer(self) -> tiktoken.Encoding:
+        if not self.state.tokenizer:
+            self.state.tokenizer = get_encoding(self.state.model_name)
+        return self.state.tokenizer
+
+    @property
+    def tokenizer_ready(self) -> bool:
+        """Czy kodowanie jest już załadowane (użycie tokenizer nie będzie go ładować)"""
+        return self.state.tokenizer is not None or self.state.model_name in _encodings
+
     def format_for_tokenization(self, text: str) -> str:
         return f"<|im_start|>user\n{text}<|im_end|>\n<|im_start|>assistant<|im_end|>"
 
     def count_tokens(self, text: str) -> int:
-        if not self.state.tokenizer:
-            raise ValueError("Tokenizer not initialized")
-        return len(self.state.tokenizer.encode(text, allowed_special=SPECIAL_TOKENS.keys()))
+        return len(self.tokenizer.encode(text, allowed_special=ALLOWED_SPECIAL))
+
+    async def token_counter(self) -> Callable[[str], int]:
+        """
+        Zwraca funkcję liczącą tokeny modelu
+
+        Gdy kodowania nie da się załadować (np. tiktoken nie może pobrać pliku BPE bez sieci),
+        zwraca estimate_tokens - liczenie tokenów na potrzeby budżetów promptu nie przerywa
+        obsługi wzmianki. Nieudane ładowanie nie jest ponawiane.
+        """
+        model_name = self.state.model_name
+        if model_name not in _unavailable_encodings:
+            try:
+                await self.initialize_tokenizer()
+                return self.count_tokens
+            except Exception as e:
+                _unavailable_encodings.add(model_name)
+                logger.warning("Could not load tokenizer for %s, estimating tokens: %s", model_name, e)
+        return estimate_tokens
 
     async def initialize_tokenizer(self, model: Optional[str] = None) -> None:
-        if not self.state.tokenizer or model != self.state.model_name:
-            model_name = model or self.state.model_name
-            self.state.tokenizer = tiktoken.encoding_for_model(model_name)
+        model_name = model or self.state.model_name
+        if not self.state.tokenizer or model_name != self.state.model_name:
+            # Pierwsze ładowanie kodowania czyta pliki BPE - robimy to poza pętlą zdarzeń
+            self.state.tokenizer = await asyncio.to_thread(get_encoding, model_name)
             self.state.model_name = model_name
 
     def extract_headers(self, text: str) -> Dict[str, List[str]]:
@@ -89,67 +192,89 @@ class TextService:
         
         return {"content": content, "urls": urls, "images": images}
 
-    def get_chunk(self, text: str, start: int, limit: int) -> Dict[str, Any]:
-        if not self.state.tokenizer:
-            raise ValueError("Tokenizer not initialized")
-            
-        # Oblicz overhead
-        overhead = (self.count_tokens(self.format_for_tokenization("")) - 
-                   self.count_tokens(""))
+    def encode_offsets(self, text: str) -> List[int]:
+        """
+        Tokenizuje cały tekst jeden raz i zwraca pozycje znaków, od których zaczynają się kolejne tokeny
+        """
+        tokens = self.tokenizer.encode(text, allowed_special=ALLOWED_SPECIAL)
+        _, offsets = self.tokenizer.decode_with_offsets(tokens)
+        return offsets
+
+    def get_chunk(self, text: str, start: int, limit: int,
+                  offsets: Optional[List[int]] = None,
+                  overhead: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Wyznacza fragment tekstu zaczynający się w start, mieszczący się w limicie tokenów
+
+        Granica jest wyznaczana na podstawie pozycji tokenów całego tekstu (offsets),
+        a potem weryfikowana jednym zliczeniem tokenów fragmentu, więc koszt jest liniowy
+        względem długości fragmentu. Przy podziale całego dokumentu offsets i overhead
+        należy policzyć raz (robi to split).
+        """
+        if offsets is None:
+            offsets = self.encode_offsets(text)
+        if overhead is None:
+            overhead = self.formatting_overhead()
         max_pos = len(text)
-        
-        # Wyszukiwanie binarne
-        low, high = start, max_pos
-        best_fit = start
-        
-        while low <= high:
-            mid = (low + high) // 2
-            candidate_text = text[start:mid]
-            tokens = self.count_tokens(candidate_text) + overhead
-            
-            if tokens <= limit:
-                best_fit = mid
-                low = mid + 1
-            else:
-                high = mid - 1
-                
+
+        def fits(end: int) -> bool:
+            return self.count_tokens(text[start:end]) + overhead <= limit
+
+        # Koniec fragmentu = początek tokenu odległego o budżet od pierwszego tokenu fragmentu
+        first_token = bisect_left(offsets, start)
+        end_token = first_token + max(limit - overhead, 0)
+        best_fit = offsets[end_token] if end_token < len(offsets) else max_pos
+
+        # Tokenizacja wycinka może różnić się od tokenizacji całości na jego brzegach - cofamy się o tokeny
+        while best_fit > start and not fits(best_fit):
+            end_token = bisect_left(offsets, best_fit) - 1
+            best_fit = offsets[end_token] if end_token >= 0 and offsets[end_token] > start else start
+
         def try_adjust_boundary(pos: int) -> int:
             next_newline = text.find('\n', pos)
             if next_newline != -1 and next_newline < max_pos:
                 candidate = next_newline + 1
-                candidate_text = text[start:candidate]
-                candidate_tokens = self.count_tokens(candidate_text) + overhead
-                if candidate_tokens <= limit:
+                if fits(candidate):
                     return candidate
                     
-            prev_newline = text.rindex('\n', start, pos) if '\n' in text[start:pos] else -1
+            prev_newline = text.rfind('\n', start, pos)
             if prev_newline > start:
                 candidate = prev_newline + 1
-                candidate_text = text[start:candidate]
-                candidate_tokens = self.count_tokens(candidate_text) + overhead
-                if candidate_tokens <= limit:
+                if fits(candidate):
                     return candidate
                     
             return pos
             
         final_end = try_adjust_boundary(best_fit)
+        # Limit mniejszy niż jeden token - bierzemy choć jeden znak, żeby podział szedł naprzód
+        if final_end <= start:
+            final_end = min(start + 1, max_pos)
         final_text = text[start:final_end]
         
         return {"chunk_text": final_text, "chunk_end": final_end}
 
+    def formatting_overhead(self) -> int:
+        """Liczba tokenów dodawanych przez format wiadomości czatu"""
+        return self.count_tokens(self.format_for_tokenization("")) - self.count_tokens("")
+
     async def split(self, text: str, limit: int, 
                    metadata_override: Optional[Dict[str, Any]] = None) -> List[Document]:
         if not text:
             raise ValueError("Text is required for splitting")
             
         await self.initialize_tokenizer()
+        metadata_override = metadata_override or {}
+
+        # Tekst tokenizujemy raz, granice fragmentów wyznaczamy na pozycjach tokenów
+        offsets = self.encode_offsets(text)
+        overhead = self.formatting_overhead()
         
         chunks: List[Document] = []
         position = 0
         current_headers: Dict[str, List[str]] = {}
         
         while position < len(text):
-            chunk_result = self.get_chunk(text, position, limit)
+            chunk_result = self.get_chunk(text, position, limit, offsets=offsets, overhead=overhead)
             chunk_text = chunk_result["chunk_text"]
             chunk_end = chunk_result["chunk_end"]
             
@@ -160,9 +285,8 @@ class TextService:
             url_data = self.extract_urls_and_images(chunk_text)
             
             # Tworzenie metadanych
-            doc_uuid = str(uuid4())
-            metadata = DocumentMetadata(
-                uuid=doc_uuid,
+            metadata = DocMetadata(
+                uuid=str(uuid4()),
                 tokens=self.count_tokens(chunk_text),
                 headers=current_headers,
                 urls=url_data["urls"],
@@ -170,22 +294,21 @@ class TextService:
                 type=metadata_override.get("type", "text"),
                 content_type=metadata_override.get("content_type", "chunk"),
                 source_uuid=metadata_override.get("source_uuid", ""),
-                conversation_uuid=metadata_override.get("conversation_uuid", "")
+                conversation_uuid=metadata_override.get("conversation_uuid", ""),
+                chunk_index=len(chunks)
             )
             
             # Tworzenie dokumentu
             document = Document(
-                uuid=doc_uuid,
-                source_uuid=metadata_override.get("source_uuid", ""),
-                conversation_uuid=metadata_override.get("conversation_uuid", ""),
                 text=url_data["content"],
-                metadata=metadata,
-                created_at=datetime.utcnow().isoformat(),
-                updated_at=datetime.utcnow().isoformat()
+                metadata=metadata
             )
             
             chunks.append(document)
             position = chunk_end
+
+        for document in chunks:
+            document.metadata.total_chunks = len(chunks)
             
         return chunks
 
@@ -216,7 +339,7 @@ async def example_usage():
     )
     
     for doc in documents:
-        print(f"Chunk UUID: {doc.uuid}")
+        print(f"Chunk UUID: {doc.metadata.uuid}")
         print(f"Tokens: {doc.metadata.tokens}")
         print(f"Headers: {doc.metadata.headers}")
         print(f"URLs: {doc.metadata.urls}")
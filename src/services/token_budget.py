@@ -0,0 +1,120 @@
+from __future__ import annotations
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Callable, Iterator
+
+# Serwer Discorda, na którego konto liczone są zapytania do modelu (ustawiany na czas obsługi wzmianki)
+_current_guild: ContextVar[int | None] = ContextVar("current_guild", default=None)
+
+
+def current_guild() -> int | None:
+    return _current_guild.get()
+
+
+@contextmanager
+def guild_scope(guild_id: int) -> Iterator[None]:
+    """
+    Przypisuje zapytania do modelu wykonywane w bloku do serwera Discorda
+
+    Zadania asyncio tworzone wewnątrz bloku dziedziczą serwer, bo kontekst jest kopiowany przy ich tworzeniu.
+    """
+    token = _current_guild.set(guild_id)
+    try:
+        yield
+    finally:
+        _current_guild.reset(token)
+
+
+class TokenBudgetExceeded(Exception):
+    """
+    Zapytanie do modelu przekroczyłoby limit tokenów i nie zostało wysłane
+
+    Attributes:
+        scope: "call" - limit promptu pojedynczego zapytania, "guild" - limit serwera w oknie czasowym
+        tokens: Liczba tokenów, którą zapytanie by osiągnęło
+        limit: Przekroczony limit
+        retry_after: Sekundy do otwarcia nowego okna (tylko dla limitu serwera)
+    """
+    def __init__(self, scope: str, tokens: int, limit: int,
+                 guild_id: int | None = None, retry_after: float | None = None):
+        self.scope = scope
+        self.tokens = tokens
+        self.limit = limit
+        self.guild_id = guild_id
+        self.retry_after = retry_after
+        if scope == "guild":
+            message = f"Guild {guild_id} token budget exceeded: {tokens} > {limit}"
+        else:
+            message = f"Prompt too large: {tokens} tokens > {limit}"
+        super().__init__(message)
+
+
+@dataclass(frozen=True)
+class Reservation:
+    guild_id: int
+    window: int
+    tokens: int
+
+
+class GuildTokenBudget:
+    """
+    Limit tokenów zużywanych przez serwer Discorda w stałych oknach czasowych
+
+    Przed zapytaniem rezerwowane są policzone tokeny promptu, a po odpowiedzi rezerwacja jest
+    zastępowana faktycznym zużyciem (prompt i odpowiedź). Dzięki temu równoległe zapytania
+    jednego serwera nie przekroczą razem limitu, mimo że każde sprawdza go osobno.
+    """
+    def __init__(self, limit: int, window: float, clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            limit: Tokeny na serwer w jednym oknie (0 = bez limitu, zużycie jest tylko zliczane)
+            window: Długość okna w sekundach
+            clock: Źródło czasu (monotoniczne)
+        """
+        self.limit = limit
+        self.window = window
+        self._clock = clock
+        self._usage: dict[int, tuple[int, int]] = {}  # serwer -> (numer okna, zużyte tokeny)
+        self._lock = threading.Lock()
+
+    def reserve(self, guild_id: int, tokens: int) -> Reservation:
+        """
+        Rezerwuje tokeny promptu przed wysłaniem zapytania
+
+        Raises:
+            TokenBudgetExceeded: Gdy rezerwacja przekroczyłaby limit serwera w bieżącym oknie
+        """
+        with self._lock:
+            now = self._clock()
+            window = int(now // self.window)
+            used = self._used(guild_id, window)
+            if self.limit and used + tokens > self.limit:
+                raise TokenBudgetExceeded("guild", used + tokens, self.limit, guild_id,
+                                          retry_after=(window + 1) * self.window - now)
+            self._usage[guild_id] = (window, used + tokens)
+            return Reservation(guild_id, window, tokens)
+
+    def settle(self, reservation: Reservation, tokens: int) -> None:
+        """Zastępuje rezerwację faktycznym zużyciem; po zmianie okna zużycie trafia do nowego okna"""
+        with self._lock:
+            window = int(self._clock() // self.window)
+            used = self._used(reservation.guild_id, window)
+            if reservation.window == window:
+                used -= reservation.tokens
+            self._usage[reservation.guild_id] = (window, max(0, used + tokens))
+
+    def release(self, reservation: Reservation) -> None:
+        """Zwalnia rezerwację zapytania, które nie dostało odpowiedzi"""
+        self.settle(reservation, 0)
+
+    def usage(self, guild_id: int) -> int:
+        """Zwraca tokeny zużyte przez serwer w bieżącym oknie"""
+        with self._lock:
+            return self._used(guild_id, int(self._clock() // self.window))
+
+    def _used(self, guild_id: int, window: int) -> int:
+        entry = self._usage.get(guild_id)
+        return entry[1] if entry is not None and entry[0] == window else 0
@@ -0,0 +1,156 @@
+from __future__ import annotations
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterator
+from uuid import uuid4
+
+from config.bot_config import LOG_LEVEL, TRACE_SAMPLE_RATE
+
+LOGGER_NAME = "jira_bot"
+
+_listener: logging.handlers.QueueListener | None = None
+_listener_lock = threading.Lock()
+
+
+def get_logger(name: str) -> logging.Logger:
+    """
+    Zwraca logger bota (jira_bot.<name>)
+
+    Wszystkie loggery bota piszą przez QueueHandler - wywołanie logowania tylko wkłada
+    rekord do kolejki, a zapis na stderr robi wątek QueueListenera.
+    """
+    _configure()
+    return logging.getLogger(f"{LOGGER_NAME}.{name}")
+
+
+def _configure() -> None:
+    global _listener
+    if _listener is not None:
+        return
+    with _listener_lock:
+        if _listener is not None:
+            return
+        records: queue.SimpleQueue = queue.SimpleQueue()
+        output = logging.StreamHandler(sys.stderr)
+        output.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+        root = logging.getLogger(LOGGER_NAME)
+        root.setLevel(LOG_LEVEL)
+        root.addHandler(logging.handlers.QueueHandler(records))
+        root.propagate = False
+        listener = logging.handlers.QueueListener(records, output, respect_handler_level=True)
+        listener.start()
+        _listener = listener
+
+
+def shutdown_logging() -> None:
+    """Zatrzymuje wątek zapisu, wcześniej opróżniając kolejkę rekordów"""
+    global _listener
+    with _listener_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+
+@dataclass
+class Span:
+    """Pojedynczy etap obsługi wzmianki (plan, zapytanie do modelu, wywołanie JIRA, wysyłka na Discord)"""
+    name: str
+    trace_id: str
+    parent_id: str | None
+    sampled: bool
+    attributes: dict[str, Any] = field(default_factory=dict)
+    span_id: str = field(default_factory=lambda: uuid4().hex[:16])
+    start: float = field(default_factory=time.perf_counter)
+    duration: float | None = None
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+    def add(self, **counters: int) -> None:
+        """Dodaje wartości do liczników (np. tokenów sumowanych z kilku zapytań)"""
+        for key, value in counters.items():
+            self.attributes[key] = self.attributes.get(key, 0) + value
+
+
+_current_span: ContextVar[Span | None] = ContextVar("current_span", default=None)
+_trace_logger: logging.Logger | None = None
+# Odbiorcy wszystkich zakończonych spanów, niezależnie od próbkowania (np. benchmark)
+_sinks: list[Callable[[Span], None]] = []
+
+
+def current_span() -> Span | None:
+    return _current_span.get()
+
+
+def add_span_sink(sink: Callable[[Span], None]) -> None:
+    """Dodaje funkcję wywoływaną dla każdego zakończonego spanu"""
+    _sinks.append(sink)
+
+
+def remove_span_sink(sink: Callable[[Span], None]) -> None:
+    _sinks.remove(sink)
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Span]:
+    """
+    Mierzy czas bloku jako span bieżącego śladu
+
+    Span bez rodzica rozpoczyna nowy ślad i losuje, czy zostanie zapisany (TRACE_SAMPLE_RATE).
+    Spany potomne dziedziczą tę decyzję. Zadania asyncio tworzone wewnątrz bloku
+    widzą span jako rodzica, bo kontekst jest kopiowany przy ich tworzeniu.
+    """
+    current = start_span(name, **attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.set(error=type(e).__name__)
+        raise
+    finally:
+        _current_span.reset(token)
+        end_span(current)
+
+
+def start_span(name: str, **attributes: Any) -> Span:
+    """
+    Rozpoczyna span potomny bieżącego, bez ustawiania go jako bieżący
+
+    Do użycia w generatorach asynchronicznych, w których zmiana zmiennej kontekstowej
+    przeciekałaby do wywołującego między kolejnymi elementami. Należy zakończyć przez end_span.
+    """
+    parent = _current_span.get()
+    if parent is None:
+        return Span(name, uuid4().hex[:16], None, random.random() < TRACE_SAMPLE_RATE, attributes)
+    return Span(name, parent.trace_id, parent.span_id, parent.sampled, attributes)
+
+
+def end_span(finished: Span) -> None:
+    finished.duration = time.perf_counter() - finished.start
+    for sink in _sinks:
+        sink(finished)
+    if finished.sampled:
+        _emit(finished)
+
+
+def _emit(finished: Span) -> None:
+    global _trace_logger
+    if _trace_logger is None:
+        _trace_logger = get_logger("trace")
+    _trace_logger.info(json.dumps({
+        "trace": finished.trace_id,
+        "span": finished.name,
+        "id": finished.span_id,
+        "parent": finished.parent_id,
+        "ms": round(finished.duration * 1000, 1),
+        **finished.attributes,
+    }, ensure_ascii=False, default=str))
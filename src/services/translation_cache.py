@@ -0,0 +1,113 @@
+import asyncio
+import json
+import os
+import re
+import tempfile
+import threading
+
+from config.bot_config import JQL_CACHE_PATH, JQL_CACHE_SAVE_INTERVAL, JQL_CACHE_SIZE
+from services.cache_service import TTLCache
+from services.tracing_service import get_logger
+
+logger = get_logger("translations")
+
+
+class TranslationCache:
+    """
+    Ograniczony (LRU) cache tłumaczeń zapytań planera na odpowiedzi modelu, zapisywany na dysk.
+
+    Klucz składa się ze skrótu konfiguracji (użytkownicy, epiki, statusy...) i znormalizowanego
+    zapytania, więc zmiana konfiguracji automatycznie unieważnia stare wpisy.
+
+    Nowe tłumaczenia są zapisywane zbiorczo, w tle (schedule_save), a przy zamykaniu bota - flush.
+
+    Args:
+        path: Ścieżka pliku JSON z zapisanymi tłumaczeniami (None = tylko w pamięci)
+        maxsize: Maksymalna liczba tłumaczeń
+        save_interval: Opóźnienie zapisu w tle w sekundach
+    """
+    def __init__(self, path: str | None = JQL_CACHE_PATH, maxsize: int = JQL_CACHE_SIZE,
+                 save_interval: float = JQL_CACHE_SAVE_INTERVAL):
+        self.path = path
+        self.cache = TTLCache(maxsize=maxsize)
+        self.save_interval = save_interval
+        # Wersja rośnie przy każdej zmianie; zapis jest potrzebny, gdy różni się od ostatnio zapisanej
+        self._version = 0
+        self._saved_version = 0
+        self._save_lock = threading.Lock()
+        self._save_task: asyncio.Task | None = None
+        self.load()
+
+    @staticmethod
+    def make_key(query: str, config_hash: str) -> str:
+        normalized = re.sub(r'\s+', ' ', query).strip().lower().rstrip('.!?')
+        return f"{config_hash}:{normalized}"
+
+    def get(self, key: str) -> str | None:
+        return self.cache.get(key)
+
+    def set(self, key: str, value: str) -> None:
+        self.cache.set(key, value)
+        self._version += 1
+
+    def load(self) -> None:
+        """Wczytuje tłumaczenia z pliku, jeśli istnieje"""
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning("Could not load translation cache %s: %s", self.path, e)
+            return
+        for key, value in data.items():
+            self.cache.set(key, value)
+
+    def save(self) -> None:
+        """
+        Zapisuje tłumaczenia do pliku (atomowo, przez plik tymczasowy)
+
+        Błąd zapisu jest wypisywany i nie przerywa pracy - niezapisane tłumaczenia trafią do następnego zapisu.
+        """
+        if not self.path:
+            return
+        with self._save_lock:
+            version = self._version
+            if version == self._saved_version:
+                return
+            temp_path = None
+            try:
+                directory = os.path.dirname(self.path) or "."
+                os.makedirs(directory, exist_ok=True)
+                with tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=directory, delete=False) as f:
+                    temp_path = f.name
+                    json.dump(dict(self.cache.items()), f, ensure_ascii=False)
+                os.replace(temp_path, self.path)
+            except OSError as e:
+                logger.warning("Could not save translation cache %s: %s", self.path, e)
+                if temp_path is not None and os.path.exists(temp_path):
+                    os.unlink(temp_path)
+                return
+            self._saved_version = version
+
+    def schedule_save(self) -> None:
+        """Planuje zapis w tle po save_interval sekundach; zmiany z tego czasu trafią do jednego zapisu"""
+        if not self.path or self._save_task is not None:
+            return
+        self._save_task = asyncio.get_running_loop().create_task(self._save_later())
+
+    async def _save_later(self) -> None:
+        await asyncio.sleep(self.save_interval)
+        self._save_task = None
+        await asyncio.to_thread(self.save)
+
+    async def flush(self) -> None:
+        """Zapisuje od razu niezapisane tłumaczenia, anulując zaplanowany zapis (przy zamykaniu bota)"""
+        if self._save_task is not None:
+            self._save_task.cancel()
+            self._save_task = None
+        await asyncio.to_thread(self.save)
+
+    def stats(self) -> dict:
+        """Zwraca liczniki trafień i chybień cache"""
+        return self.cache.stats()